@@ -7,6 +7,24 @@ from .db import users_collection, complaints_collection, admin_notes_collection
 from .auth_utils import verify_token, hash_password, verify_password, create_access_token, generate_otp, send_otp_email, get_otp_expiry
 from .db import otp_collection
 from .utils.json_utils import serialize_document
+from .jobs.job_queue import job_queue
+from .llm.cache import llm_cache
+from .llm.gemini_client import GeminiClient
+from .llm.metrics import llm_metrics
+from .llm.quick_answers import quick_answers
+from .llm.rate_limiter import rate_limiter
+from .llm.semantic_cache import chat_answer_cache
+from .llm.router import provider_router
+from .rag_modules.chat_intents import chat_intent_classifier
+from .rag_modules.department_router import department_router
+from .rag_modules.location_gazetteer import location_gazetteer
+from .rag_modules.priority_model import priority_model
+from .rag_modules.relevance_filter import relevance_filter
+from .rag_modules.urgency_model import urgency_model
+from .rag_modules.vector_backfill import backfill_runner, count_pending
+from .rag_config import Config
+from .registry import get_vector_store, services
+import asyncio
 import json
 from bson import ObjectId
 
@@ -511,3 +529,124 @@ async def update_admin_settings(
     # This would typically update configuration in database
     # For now, just return success
     return {"message": "Settings updated successfully"}
+
+@router.get("/llm/cache")
+async def get_llm_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get LLM response cache hit/miss counters per prompt type"""
+    return llm_cache.get_stats()
+
+@router.delete("/llm/cache")
+async def clear_llm_cache(current_admin: dict = Depends(get_current_admin)):
+    """Clear the in-memory and persistent LLM response cache"""
+    removed = llm_cache.clear()
+    return {"message": "LLM cache cleared", "persistent_entries_removed": removed}
+
+@router.get("/llm/chat-cache")
+async def get_chat_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the chat semantic cache hit rate, latency saved and most reused questions"""
+    return chat_answer_cache.get_stats()
+
+@router.delete("/llm/chat-cache")
+async def clear_chat_cache(entry_id: Optional[str] = None, current_admin: dict = Depends(get_current_admin)):
+    """Invalidate one cached chat answer by id, or all of them"""
+    removed = chat_answer_cache.invalidate(entry_id)
+    if entry_id and not removed:
+        raise HTTPException(status_code=404, detail="Chat cache entry not found")
+    return {"message": "Chat answer cache invalidated", "entries_removed": removed}
+
+@router.get("/llm/chat-intents")
+async def get_chat_intent_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get how many chat messages were answered as status/tracking/count questions without the LLM"""
+    return chat_intent_classifier.get_stats()
+
+@router.get("/llm/quick-answers")
+async def get_quick_answer_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the precomputed quick-response answers, their versions and how often they were served"""
+    return quick_answers.get_stats()
+
+@router.post("/llm/quick-answers/refresh")
+async def refresh_quick_answers(force: bool = True, current_admin: dict = Depends(get_current_admin)):
+    """Regenerate the quick-response answers in the background (only outdated ones with force=false)"""
+    started = quick_answers.start(force)
+    return {"message": "Quick answer refresh started" if started else "Quick answer refresh already running"}
+
+@router.get("/vector-store/backfill")
+async def get_vector_backfill_status(current_admin: dict = Depends(get_current_admin)):
+    """Get how many complaints have no vector store document yet and the state of the last backfill run"""
+    try:
+        return {"pending": await asyncio.to_thread(count_pending), **backfill_runner.get_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count complaints: {str(e)}")
+
+@router.post("/vector-store/backfill")
+async def run_vector_backfill(
+    limit: Optional[int] = None,
+    batch_size: int = Config.VECTOR_BATCH_SIZE,
+    current_admin: dict = Depends(get_current_admin),
+    vector_store = Depends(get_vector_store)
+):
+    """Start indexing complaints without a vector_db_id in the background (progress and docs/sec via GET)"""
+    if batch_size < 1 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=422, detail="limit and batch_size must be positive")
+    if not backfill_runner.start(vector_store, batch_size, limit):
+        raise HTTPException(status_code=409, detail="A vector store backfill is already running")
+    return {"message": "Vector store backfill started", **backfill_runner.get_stats()}
+
+@router.get("/services")
+async def get_service_status(current_admin: dict = Depends(get_current_admin)):
+    """Get which shared services are loaded, their load times, the warm-up encode time and resident memory"""
+    return services.get_stats()
+
+@router.get("/llm/metrics")
+async def get_llm_metrics(current_admin: dict = Depends(get_current_admin)):
+    """Get LLM latency percentiles, token usage, estimated cost, error/fallback rates and cache outcomes per provider, model and prompt type"""
+    return llm_metrics.summary()
+
+@router.get("/llm/providers")
+async def get_llm_provider_status(current_admin: dict = Depends(get_current_admin)):
+    """Get LLM provider latency, error rates, circuit breaker state and recent routing decisions"""
+    return provider_router.snapshot()
+
+@router.get("/llm/rate-limits")
+async def get_llm_rate_limit_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get per-provider rate limit budgets, wait-queue depth, wait times and throttled (429) calls"""
+    return rate_limiter.get_stats()
+
+@router.get("/llm/department-router")
+async def get_department_router_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the fraction of department decisions answered locally instead of by the LLM"""
+    return department_router.get_stats()
+
+@router.get("/llm/relevance-filter")
+async def get_relevance_filter_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get how many submissions the local relevance pre-filter accepted, rejected or escalated to the LLM"""
+    return relevance_filter.get_stats()
+
+@router.get("/llm/location-gazetteer")
+async def get_location_gazetteer_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the gazetteer size and the fraction of locations matched locally instead of extracted by the LLM"""
+    return location_gazetteer.get_stats()
+
+@router.get("/llm/urgency-model")
+async def get_urgency_model_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the loaded urgency model version and the fraction of urgency labels answered locally"""
+    return urgency_model.get_stats()
+
+@router.get("/llm/priority-model")
+async def get_priority_model_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get the loaded priority model version and the fraction of priority scores computed locally"""
+    return priority_model.get_stats()
+
+@router.get("/llm/batching")
+async def get_llm_batching_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get micro-batching statistics for the complaint analysis prompt"""
+    batcher = GeminiClient._analysis_batcher
+    return {"enabled": Config.LLM_BATCH_ENABLED, **(batcher.get_stats() if batcher else {})}
+
+@router.get("/jobs")
+async def get_job_queue_stats(current_admin: dict = Depends(get_current_admin)):
+    """Get background job queue counts and worker status"""
+    try:
+        return await asyncio.to_thread(job_queue.get_stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job stats: {str(e)}")
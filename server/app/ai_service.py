@@ -1,25 +1,100 @@
 import os
 import json
-import requests
 import asyncio
 import random
-from typing import Dict, Any, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+import httpx
 from .config import GROQ_API_KEY, FIREWORKS_API_KEY, GEMINI_API_KEY
+from .llm.cache import llm_cache
+from .llm.http_pool import get_http_client, request_timeout
+from .llm.metrics import llm_metrics
+from .llm.rate_limiter import estimate_tokens, rate_limiter
+from .llm.router import NoProviderAvailable, provider_router
+from .rag_config import Config
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CATEGORY_PROMPT = """
+Analyze the following complaint and categorize it into one of these categories:
+- Infrastructure (roads, bridges, buildings, public facilities)
+- Utilities (water, electricity, gas, internet)
+- Transportation (public transport, traffic, parking)
+- Public Safety (crime, emergency services, safety concerns)
+- Healthcare (hospitals, clinics, medical services)
+- Education (schools, colleges, educational facilities)
+- Environmental (pollution, waste management, green spaces)
+- Corruption (bribery, misconduct, transparency issues)
+- Administrative (documentation, permits, bureaucracy)
+- Other (anything that doesn't fit above categories)
+
+Title: {title}
+Description: {description}
+
+Return only the category name, nothing else.
+"""
+
+PRIORITY_PROMPT = """
+Calculate a priority score (0-100) for this complaint based on:
+- Urgency level: {urgency}
+- Category: {category}
+- Impact potential
+- Safety concerns
+- Number of people affected
+
+Title: {title}
+Description: {description}
+
+Consider these scoring guidelines:
+- Emergency/Safety issues: 80-100
+- High impact on many people: 70-90
+- Infrastructure critical issues: 60-80
+- Standard service requests: 40-60
+- Minor issues: 20-40
+- Low priority items: 0-30
+
+Return only a number between 0-100, nothing else.
+"""
+
+RESPONSE_PROMPT = """
+Generate a professional, helpful response for this government complaint:
+
+Category: {category}
+Urgency: {urgency}
+Title: {title}
+Description: {description}
+
+The response should:
+- Acknowledge the complaint professionally
+- Provide relevant information about the issue
+- Explain next steps in the resolution process
+- Give realistic timelines
+- Be empathetic and solution-oriented
+- Be concise (2-3 sentences maximum)
+
+Write as if you're a government official responding to a citizen.
+"""
+
+# Keyword heuristics shared by the fallback priority score and the local urgency model
+CRITICAL_KEYWORDS = ["emergency", "urgent", "danger", "broken", "leak", "fire", "accident"]
+IMPACT_KEYWORDS = ["many", "multiple", "all", "entire", "community", "neighborhood"]
+
+
 class AIService:
     """AI Service for complaint analysis and categorization using Groq and Fireworks APIs"""
     
-    def __init__(self):
+    def __init__(self, encoder=None):
+        # Sentence encoder for the local priority model (None keeps priority scoring remote)
+        self.encoder = encoder
+
         # API Keys from environment - NO HARDCODED KEYS FOR SECURITY
-        self.groq_api_key = GROQ_API_KEY
-        self.fireworks_api_key = FIREWORKS_API_KEY
-        self.gemini_api_key = GEMINI_API_KEY
+        stub_key = Config.LLM_STUB_API_KEY if Config.LLM_STUB_URL else None
+        self.groq_api_key = GROQ_API_KEY or stub_key
+        self.fireworks_api_key = FIREWORKS_API_KEY or stub_key
+        self.gemini_api_key = GEMINI_API_KEY or stub_key
         
         if not self.groq_api_key:
             logger.warning("GROQ_API_KEY not set in environment variables")
@@ -28,9 +103,16 @@ class AIService:
         if not self.gemini_api_key:
             logger.warning("GEMINI_API_KEY not set in environment variables")
         
-        # API URLs
-        self.groq_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.fireworks_url = "https://api.fireworks.ai/inference/v1/chat/completions"
+        # API URLs (pointed at the local stub when LLM_STUB_URL is set)
+        self.groq_url = f"{Config.GROQ_API_BASE}/openai/v1/chat/completions"
+        self.fireworks_url = f"{Config.FIREWORKS_API_BASE}/inference/v1/chat/completions"
+        self.gemini_url = f"{Config.GEMINI_API_BASE}/v1beta/models/gemini-pro"
+        
+        # OpenAI-compatible providers used for complaint analysis
+        self.providers = {
+            "groq": {"url": self.groq_url, "api_key": self.groq_api_key, "model": "llama-3.1-70b-versatile"},
+            "fireworks": {"url": self.fireworks_url, "api_key": self.fireworks_api_key, "model": "accounts/fireworks/models/llama-v3p1-70b-instruct"}
+        }
         
         # Department mappings
         self.departments = {
@@ -64,28 +146,104 @@ class AIService:
             "high": 2.0
         }
     
+    @staticmethod
+    def _request_budget(url: str, payload: Dict[str, Any]) -> Tuple[str, int]:
+        """Model name and estimated tokens of a provider request, for the rate limiter"""
+        if "model" in payload:
+            return payload["model"], estimate_tokens(payload["messages"], payload.get("max_tokens", 0))
+        model = url.split("/models/", 1)[-1].split(":", 1)[0]
+        return model, estimate_tokens(payload["contents"], payload.get("generationConfig", {}).get("maxOutputTokens", 0))
+
+    @staticmethod
+    def _prompt_tokens(payload: Dict[str, Any]) -> int:
+        """Estimated prompt tokens, for the metrics when the provider reports no usage"""
+        return estimate_tokens(payload.get("messages") or payload.get("contents"))
+
+    async def _post_json(self, provider: str, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST a JSON payload over the provider's pooled keep-alive client (within its rate limit) and return the decoded response"""
+        client = get_http_client(provider)
+        kwargs = {"timeout": request_timeout(timeout)} if timeout is not None else {}
+        model, tokens = self._request_budget(url, payload)
+
+        async def post() -> Dict[str, Any]:
+            # Every attempt is measured, including the ones the rate limiter retries
+            with llm_metrics.track(provider, model, self._prompt_tokens(payload)) as call:
+                response = await client.post(url, headers=headers, json=payload, **kwargs)
+                response.raise_for_status()
+                result = response.json()
+                call.observe(result)
+            return result
+
+        return await rate_limiter.run(provider, model, tokens, post, timeout)
+
+    async def _chat_completion(self,
+                               providers: List[str],
+                               prompt_type: str,
+                               template: str,
+                               variables: Dict[str, Any],
+                               temperature: float,
+                               max_tokens: int,
+                               timeout: Optional[float] = None) -> str:
+        """Run an OpenAI-compatible chat completion through the LLM cache and provider router and return the message text"""
+        candidates = [provider for provider in providers if self.providers[provider]["api_key"]]
+        if not candidates:
+            raise Exception(f"No API key configured for {', '.join(providers)}")
+
+        def completion(provider: str):
+            settings = self.providers[provider]
+
+            async def generate() -> str:
+                headers = {
+                    "Authorization": f"Bearer {settings['api_key']}",
+                    "Content-Type": "application/json"
+                }
+                data = {
+                    "model": settings["model"],
+                    "messages": [{"role": "user", "content": template.format(**variables)}],
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                }
+                result = await self._post_json(provider, settings["url"], headers, data, timeout)
+                return result['choices'][0]['message']['content'].strip()
+
+            return generate
+
+        # Cache entries are keyed on the candidate pool, whichever provider wins the race
+        return await llm_cache.get_or_generate(
+            provider="+".join(candidates),
+            model="+".join(self.providers[provider]["model"] for provider in candidates),
+            prompt_type=prompt_type,
+            template=template,
+            variables=variables,
+            generate=lambda: provider_router.call(prompt_type, {provider: completion(provider) for provider in candidates})
+        )
+
     async def analyze_complaint(self, title: str, description: str, urgency: str, location: str) -> Dict[str, Any]:
         """Analyze complaint and return AI recommendations using external APIs"""
         
         try:
-            # Step 1: Categorize the complaint using Groq
-            category = await self._categorize_complaint_groq(title, description)
-            
-            # Step 2: Calculate priority score using Fireworks
-            priority_score = await self._calculate_priority_score_fireworks(title, description, urgency, category)
+            # Step 1: Categorize the complaint (Groq, hedged to Fireworks) while embedding it for the local priority model
+            category, embedding = await asyncio.gather(
+                self._categorize_complaint_groq(title, description),
+                self._priority_embedding(title, description)
+            )
+            
+            # Step 2: Priority score (local model, else Fireworks first) and AI response (Groq first) both only need the category
+            (priority_score, priority_source), suggested_response = await asyncio.gather(
+                self._priority_score(title, description, urgency, category, embedding),
+                self._generate_response_groq(title, description, category, urgency)
+            )
             
             # Step 3: Assign department
             assigned_department = self.departments.get(category, self.departments["Other"])
             
-            # Step 4: Generate AI response using Groq
-            suggested_response = await self._generate_response_groq(title, description, category, urgency)
-            
-            # Step 5: Estimate resolution time
+            # Step 4: Estimate resolution time
             estimated_resolution = self._estimate_resolution_time(category, urgency, priority_score)
             
             return {
                 "category": category,
                 "priority_score": priority_score,
+                "priority_source": priority_source,
                 "assigned_department": assigned_department,
                 "suggested_response": suggested_response,
                 "estimated_resolution": estimated_resolution,
@@ -95,51 +253,22 @@ class AIService:
             
         except Exception as e:
             logger.error(f"AI analysis failed, using fallback: {str(e)}")
+            llm_metrics.record_fallback("analysis")
             # Fallback to original method
             return await self._analyze_complaint_fallback(title, description, urgency, location)
     
     async def _categorize_complaint_groq(self, title: str, description: str) -> str:
-        """Use Groq API to categorize the complaint"""
+        """Use Groq API (Fireworks as hedge/failover) to categorize the complaint"""
         try:
-            if not self.groq_api_key:
-                raise Exception("Groq API key not configured")
-                
-            prompt = f"""
-            Analyze the following complaint and categorize it into one of these categories:
-            - Infrastructure (roads, bridges, buildings, public facilities)
-            - Utilities (water, electricity, gas, internet)
-            - Transportation (public transport, traffic, parking)
-            - Public Safety (crime, emergency services, safety concerns)
-            - Healthcare (hospitals, clinics, medical services)
-            - Education (schools, colleges, educational facilities)
-            - Environmental (pollution, waste management, green spaces)
-            - Corruption (bribery, misconduct, transparency issues)
-            - Administrative (documentation, permits, bureaucracy)
-            - Other (anything that doesn't fit above categories)
-            
-            Title: {title}
-            Description: {description}
-            
-            Return only the category name, nothing else.
-            """
-            
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "llama-3.1-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-                "max_tokens": 50
-            }
-            
-            response = requests.post(self.groq_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            category = result['choices'][0]['message']['content'].strip()
+            category = await self._chat_completion(
+                providers=["groq", "fireworks"],
+                prompt_type="category",
+                template=CATEGORY_PROMPT,
+                variables=dict(title=title, description=description),
+                temperature=0.1,
+                max_tokens=50,
+                timeout=Config.LLM_TIMEOUT_CATEGORY
+            )
             
             # Validate category
             valid_categories = list(self.departments.keys())
@@ -153,113 +282,79 @@ class AIService:
                 return "Other"
                 
         except Exception as e:
-            logger.error(f"Groq categorization failed: {str(e)}")
+            logger.error(f"Categorization failed: {str(e)}")
+            llm_metrics.record_fallback("category")
             return self._categorize_complaint_fallback(title, description)
     
-    async def _calculate_priority_score_fireworks(self, title: str, description: str, urgency: str, category: str) -> int:
-        """Use Fireworks API to calculate priority score (0-100)"""
+    async def _priority_embedding(self, title: str, description: str) -> Optional[Any]:
+        """Sentence embedding for the local priority model, or None when the model is unavailable"""
+        from .rag_modules.priority_model import priority_model
+
+        if self.encoder is None or not priority_model.loaded or not Config.PRIORITY_MODEL_ENABLED:
+            return None
+        text = f"{title.strip()} {description.strip()}".strip()
         try:
-            if not self.fireworks_api_key:
-                raise Exception("Fireworks API key not configured")
-                
-            prompt = f"""
-            Calculate a priority score (0-100) for this complaint based on:
-            - Urgency level: {urgency}
-            - Category: {category}
-            - Impact potential
-            - Safety concerns
-            - Number of people affected
-            
-            Title: {title}
-            Description: {description}
-            
-            Consider these scoring guidelines:
-            - Emergency/Safety issues: 80-100
-            - High impact on many people: 70-90
-            - Infrastructure critical issues: 60-80
-            - Standard service requests: 40-60
-            - Minor issues: 20-40
-            - Low priority items: 0-30
-            
-            Return only a number between 0-100, nothing else.
-            """
-            
-            headers = {
-                "Authorization": f"Bearer {self.fireworks_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "accounts/fireworks/models/llama-v3p1-70b-instruct",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.2,
-                "max_tokens": 10
-            }
-            
-            response = requests.post(self.fireworks_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            score_text = result['choices'][0]['message']['content'].strip()
+            embedding = await asyncio.to_thread(self.encoder.encode, [text], normalize_embeddings=True)
+            return embedding[0]
+        except Exception as e:
+            logger.warning(f"Embedding for the priority model failed, using the remote model: {str(e)}")
+            return None
+
+    async def _priority_score(self, title: str, description: str, urgency: str, category: str, embedding: Optional[Any]) -> Tuple[int, str]:
+        """Priority score (0-100) and its source: the local model when it is confident, else the remote model"""
+        if embedding is not None:
+            from .rag_modules.priority_model import priority_model
+            try:
+                score, _, confident = priority_model.predict(embedding, f"{title.strip()} {description.strip()}", urgency, category)
+                if confident:
+                    return score, "local"
+            except Exception as e:
+                logger.warning(f"Local priority model failed, using the remote model: {str(e)}")
+        return await self._calculate_priority_score_fireworks(title, description, urgency, category)
+
+    async def _calculate_priority_score_fireworks(self, title: str, description: str, urgency: str, category: str) -> Tuple[int, str]:
+        """Use Fireworks API (Groq as hedge/failover) to calculate priority score (0-100); returns the score and its source"""
+        try:
+            score_text = await self._chat_completion(
+                providers=["fireworks", "groq"],
+                prompt_type="priority",
+                template=PRIORITY_PROMPT,
+                variables=dict(title=title, description=description, urgency=urgency, category=category),
+                temperature=0.2,
+                max_tokens=10,
+                timeout=Config.LLM_TIMEOUT_PRIORITY
+            )
             
             # Extract number from response
             import re
             numbers = re.findall(r'\d+', score_text)
             if numbers:
                 score = int(numbers[0])
-                return max(0, min(100, score))
+                return max(0, min(100, score)), "llm"
             else:
-                return self._calculate_priority_score_fallback(title, description, urgency, category)
+                return self._calculate_priority_score_fallback(title, description, urgency, category), "fallback"
                 
         except Exception as e:
-            logger.error(f"Fireworks priority calculation failed: {str(e)}")
-            return self._calculate_priority_score_fallback(title, description, urgency, category)
+            logger.error(f"Priority calculation failed: {str(e)}")
+            llm_metrics.record_fallback("priority")
+            return self._calculate_priority_score_fallback(title, description, urgency, category), "fallback"
     
     async def _generate_response_groq(self, title: str, description: str, category: str, urgency: str) -> str:
-        """Generate AI response using Groq"""
+        """Generate AI response using Groq (Fireworks as hedge/failover)"""
         try:
-            if not self.groq_api_key:
-                raise Exception("Groq API key not configured")
-                
-            prompt = f"""
-            Generate a professional, helpful response for this government complaint:
-            
-            Category: {category}
-            Urgency: {urgency}
-            Title: {title}
-            Description: {description}
-            
-            The response should:
-            - Acknowledge the complaint professionally
-            - Provide relevant information about the issue
-            - Explain next steps in the resolution process
-            - Give realistic timelines
-            - Be empathetic and solution-oriented
-            - Be concise (2-3 sentences maximum)
-            
-            Write as if you're a government official responding to a citizen.
-            """
-            
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "llama-3.1-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.3,
-                "max_tokens": 200
-            }
-            
-            response = requests.post(self.groq_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result['choices'][0]['message']['content'].strip()
+            return await self._chat_completion(
+                providers=["groq", "fireworks"],
+                prompt_type="response",
+                template=RESPONSE_PROMPT,
+                variables=dict(title=title, description=description, category=category, urgency=urgency),
+                temperature=0.3,
+                max_tokens=200,
+                timeout=Config.LLM_TIMEOUT_RESPONSE
+            )
             
         except Exception as e:
-            logger.error(f"Groq response generation failed: {str(e)}")
+            logger.error(f"Response generation failed: {str(e)}")
+            llm_metrics.record_fallback("response")
             return self._generate_response_fallback(category, urgency, 50)
     
     async def _analyze_complaint_fallback(self, title: str, description: str, urgency: str, location: str) -> Dict[str, Any]:
@@ -275,6 +370,7 @@ class AIService:
         return {
             "category": category,
             "priority_score": priority_score,
+            "priority_source": "fallback",
             "assigned_department": assigned_department,
             "suggested_response": suggested_response,
             "estimated_resolution": estimated_resolution,
@@ -318,13 +414,11 @@ class AIService:
         category_boost = category_scores.get(category, 0)
         
         # Keyword impact for critical issues
-        critical_keywords = ["emergency", "urgent", "danger", "broken", "leak", "fire", "accident"]
         text = (title + " " + description).lower()
-        critical_boost = sum(5 for keyword in critical_keywords if keyword in text)
+        critical_boost = sum(5 for keyword in CRITICAL_KEYWORDS if keyword in text)
         
         # Impact scale keywords
-        impact_keywords = ["many", "multiple", "all", "entire", "community", "neighborhood"]
-        impact_boost = sum(3 for keyword in impact_keywords if keyword in text)
+        impact_boost = sum(3 for keyword in IMPACT_KEYWORDS if keyword in text)
         
         total_score = base_score + urgency_boost + category_boost + critical_boost + impact_boost
         
@@ -416,24 +510,24 @@ class AIService:
             return f"{weeks} weeks"
     
     async def generate_chat_response(self, question: str, user_context: Dict[str, Any] = None) -> str:
-        """Generate AI chat response using Gemini API (fallback to Groq)"""
+        """Generate AI chat response using Gemini API (hedged to Groq when slow or failing)"""
+        calls = {}
+        if self.gemini_api_key:
+            calls["gemini"] = lambda: self._generate_chat_response_gemini(question, user_context)
+        if self.groq_api_key:
+            calls["groq"] = lambda: self._generate_chat_response_groq(question, user_context)
+
         try:
-            # Try Gemini API first
-            return await self._generate_chat_response_gemini(question, user_context)
-        except Exception as gemini_error:
-            logger.warning(f"Gemini API failed, falling back to Groq: {str(gemini_error)}")
-            try:
-                # Fallback to Groq
-                return await self._generate_chat_response_groq(question, user_context)
-            except Exception as groq_error:
-                logger.error(f"Both APIs failed: Gemini={gemini_error}, Groq={groq_error}")
-                return self._generate_fallback_chat_response(question)
+            if not calls:
+                raise Exception("No chat provider API key configured")
+            return await provider_router.call("chat", calls)
+        except Exception as e:
+            logger.error(f"All chat providers failed: {str(e)}")
+            llm_metrics.record_fallback("chat")
+            return self._generate_fallback_chat_response(question)
     
-    async def _generate_chat_response_gemini(self, question: str, user_context: Dict[str, Any] = None) -> str:
-        """Generate AI chat response using Gemini API"""
-        if not self.gemini_api_key:
-            raise Exception("Gemini API key not configured")
-            
+    def _gemini_chat_prompt(self, question: str, user_context: Dict[str, Any] = None) -> str:
+        """Build the GrievanceBot chat prompt sent to Gemini"""
         # Build user context information
         context_info = ""
         if user_context:
@@ -471,35 +565,38 @@ Response Guidelines:
 
 Provide a clear, helpful response:
 """
-        
-        # Gemini API endpoint
-        gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.gemini_api_key}"
-        
-        headers = {"Content-Type": "application/json"}
-        data = {
+        return prompt
+
+    def _gemini_chat_payload(self, question: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        return {
             "contents": [{
-                "parts": [{"text": prompt}]
+                "parts": [{"text": self._gemini_chat_prompt(question, user_context)}]
             }],
             "generationConfig": {
                 "temperature": 0.7,
                 "maxOutputTokens": 300
             }
         }
+
+    async def _generate_chat_response_gemini(self, question: str, user_context: Dict[str, Any] = None) -> str:
+        """Generate AI chat response using Gemini API"""
+        if not self.gemini_api_key:
+            raise Exception("Gemini API key not configured")
+
+        # Gemini API endpoint
+        gemini_url = f"{self.gemini_url}:generateContent?key={self.gemini_api_key}"
         
-        response = requests.post(gemini_url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
+        headers = {"Content-Type": "application/json"}
+        data = self._gemini_chat_payload(question, user_context)
         
-        result = response.json()
+        result = await self._post_json("gemini", gemini_url, headers, data, Config.LLM_TIMEOUT_CHAT)
         if 'candidates' in result and len(result['candidates']) > 0:
             return result['candidates'][0]['content']['parts'][0]['text'].strip()
         else:
             raise Exception("No response from Gemini API")
     
-    async def _generate_chat_response_groq(self, question: str, user_context: Dict[str, Any] = None) -> str:
-        """Generate AI chat response using Groq API"""
-        if not self.groq_api_key:
-            raise Exception("Groq API key not configured")
-            
+    def _groq_chat_prompt(self, question: str, user_context: Dict[str, Any] = None) -> str:
+        """Build the GrievanceBot chat prompt sent to Groq"""
         # Build user context information
         context_info = ""
         if user_context:
@@ -544,7 +641,9 @@ Provide a clear, helpful response:
         - Explain why each piece of information is important for proper processing
         - Guide users to provide clear, detailed descriptions for better department assignment
         """
-        
+        return prompt
+
+    def _groq_chat_request(self, question: str, user_context: Dict[str, Any] = None) -> Tuple[Dict[str, str], Dict[str, Any]]:
         headers = {
             "Authorization": f"Bearer {self.groq_api_key}",
             "Content-Type": "application/json"
@@ -552,16 +651,95 @@ Provide a clear, helpful response:
         
         data = {
             "model": "llama-3.1-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [{"role": "user", "content": self._groq_chat_prompt(question, user_context)}],
             "temperature": 0.3,
             "max_tokens": 300
         }
-        
-        response = requests.post(self.groq_url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
+        return headers, data
+
+    async def _generate_chat_response_groq(self, question: str, user_context: Dict[str, Any] = None) -> str:
+        """Generate AI chat response using Groq API"""
+        if not self.groq_api_key:
+            raise Exception("Groq API key not configured")
+
+        headers, data = self._groq_chat_request(question, user_context)
+        result = await self._post_json("groq", self.groq_url, headers, data, Config.LLM_TIMEOUT_CHAT)
         return result['choices'][0]['message']['content'].strip()
+
+    async def stream_chat_response(self, question: str, user_context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream the AI chat response as text chunks (Gemini, then Groq, then the canned fallback)"""
+        streams = {}
+        if self.gemini_api_key:
+            streams["gemini"] = lambda: self._stream_chat_response_gemini(question, user_context)
+        if self.groq_api_key:
+            streams["groq"] = lambda: self._stream_chat_response_groq(question, user_context)
+
+        try:
+            if not streams:
+                raise NoProviderAvailable("No chat provider API key configured")
+            async for chunk in provider_router.stream("chat_stream", streams):
+                yield chunk
+        except NoProviderAvailable as e:
+            logger.error(f"All chat providers failed: {str(e)}")
+            llm_metrics.record_fallback("chat_stream")
+            yield self._generate_fallback_chat_response(question)
+
+    async def _stream_sse_lines(self, provider: str, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """POST a streaming request over the provider's pooled client and yield the SSE ``data:`` payloads (up to ``[DONE]``)"""
+        client = get_http_client(provider)
+
+        async def open_stream() -> httpx.Response:
+            request = client.build_request("POST", url, headers=headers, json=payload, timeout=request_timeout(Config.LLM_TIMEOUT_CHAT))
+            response = await client.send(request, stream=True)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError:
+                await response.aclose()
+                raise
+            return response
+
+        # Only opening the stream is rate limited and retried; a 429 arrives before any chunk
+        model, tokens = self._request_budget(url, payload)
+        with llm_metrics.track(provider, model, self._prompt_tokens(payload), prompt_type="chat_stream") as call:
+            response = await rate_limiter.run(provider, model, tokens, open_stream, Config.LLM_TIMEOUT_CHAT)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        # End of an OpenAI-compatible stream; returning here lets the request be recorded as complete
+                        break
+                    try:
+                        call.observe(json.loads(data))
+                    except ValueError:
+                        pass
+                    yield data
+            finally:
+                await response.aclose()
+
+    async def _stream_chat_response_gemini(self, question: str, user_context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream an AI chat response from Gemini's streamGenerateContent SSE endpoint"""
+        gemini_url = f"{self.gemini_url}:streamGenerateContent?alt=sse&key={self.gemini_api_key}"
+        headers = {"Content-Type": "application/json"}
+
+        async for data in self._stream_sse_lines("gemini", gemini_url, headers, self._gemini_chat_payload(question, user_context)):
+            event = json.loads(data)
+            for candidate in event.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+    async def _stream_chat_response_groq(self, question: str, user_context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream an AI chat response from Groq's OpenAI-compatible streaming API"""
+        headers, data = self._groq_chat_request(question, user_context)
+        data["stream"] = True
+
+        async for payload in self._stream_sse_lines("groq", self.groq_url, headers, data):
+            choices = json.loads(payload).get("choices") or [{}]
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
     
     def _generate_fallback_chat_response(self, question: str) -> str:
         """Fallback chat responses when AI API fails"""
@@ -586,6 +764,3 @@ Provide a clear, helpful response:
         # General help
         else:
             return "I'm here to help! I can assist with complaint submission, status updates, resolution timelines, and general guidance. What specific information do you need about your complaint or our services?"
-
-# Create global instance  
-ai_service = AIService()
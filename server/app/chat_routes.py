@@ -1,13 +1,29 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+import numpy as np
 from .models import User
 from .auth_utils import get_current_user
 from .ai_service import AIService
 from .db import get_database
+from .llm.cache import normalize_text
+from .llm.quick_answers import QUICK_RESPONSES, quick_answers
+from .llm.semantic_cache import chat_answer_cache, is_shareable_question, render, to_template
+from .rag_config import Config
+from .rag_modules.chat_intents import COMPLAINT_ID_PATTERN, chat_intent_classifier
+from .rag_modules.pipeline import RAGPipeline
+from .rag_modules.vector_backfill import complaint_vector_id
+from .registry import get_ai_service, get_rag_pipeline, services
 import uuid
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 class ChatMessage(BaseModel):
@@ -32,83 +48,323 @@ class GuidedComplaintData(BaseModel):
 class ComplaintSubmissionRequest(BaseModel):
     complaint_data: dict
 
-# Initialize AI service
-ai_service = AIService()
+QUICK_ACTION_HINT = "\n\n🚀 **Quick Action**: I can help you submit this as an official complaint right now! Would you like me to guide you through the process step by step?"
+
+
+def _build_user_context(current_user: User) -> dict:
+    """Get the user's name and recent complaints for the chat prompt"""
+    complaints_collection = get_database().complaints
+
+    # Get user's recent complaints for context
+    recent_complaints = list(complaints_collection.find(
+        {"user_id": current_user["user_id"]}
+    ).sort("submitted_date", -1).limit(5))
+
+    return {
+        "user_id": current_user["user_id"],
+        "user_name": current_user.get("full_name"),
+        "recent_complaints": recent_complaints
+    }
+
+
+def _shared_context(current_user: User) -> dict:
+    """Chat prompt context for answers shared through the semantic cache: the user's name only"""
+    return {"user_id": current_user["user_id"], "user_name": current_user.get("full_name")}
+
+
+def _chat_encoder():
+    # The process-wide MiniLM model, shared with the complaint pipeline
+    return services.embedding_model
+
+
+def _embed_question(question: str) -> np.ndarray:
+    encoder = _chat_encoder()
+    return np.asarray(encoder.encode([normalize_text(question)], normalize_embeddings=True)[0], dtype=np.float32)
+
+
+def _embed_intent_question(question: str) -> np.ndarray:
+    chat_intent_classifier.ensure_built(_chat_encoder())
+    return _embed_question(question)
+
+
+STATUS_LABELS = {
+    "pending": "Pending review",
+    "processing": "Being analyzed",
+    "in_progress": "In progress",
+    "resolved": "Resolved",
+    "rejected": "Rejected"
+}
+STATUS_PROJECTION = {"id": 1, "title": 1, "status": 1, "assigned_department": 1, "estimated_resolution": 1,
+                     "submitted_date": 1, "last_updated": 1}
+
+
+def _status_label(status: Optional[str]) -> str:
+    status = (status or "pending").lower()
+    return STATUS_LABELS.get(status, status.replace("_", " ").capitalize())
+
+
+def _format_date(value) -> str:
+    return value.strftime("%d %b %Y") if isinstance(value, datetime) else "unknown"
+
+
+def _status_reply(complaint: dict) -> str:
+    lines = [f"📋 Your complaint **{complaint.get('id', '')}** ({complaint.get('title') or 'Untitled'}) is "
+             f"**{_status_label(complaint.get('status'))}**."]
+    if complaint.get("assigned_department"):
+        lines.append(f"Department: {complaint['assigned_department']}")
+    if complaint.get("estimated_resolution") and (complaint.get("status") or "").lower() not in ("resolved", "rejected"):
+        lines.append(f"Estimated resolution: {complaint['estimated_resolution']}")
+    lines.append(f"Submitted {_format_date(complaint.get('submitted_date'))}, "
+                 f"last updated {_format_date(complaint.get('last_updated') or complaint.get('submitted_date'))}.")
+    return "\n".join(lines)
+
+
+def _intent_reply(intent: dict, user_id: str) -> str:
+    """Templated answer to a status/tracking/count question from indexed lookups on the user's complaints"""
+    complaints_collection = get_database().complaints
+    no_complaints = "You haven't submitted any complaints yet. Would you like me to help you file one?"
+
+    if intent["intent"] == "status":
+        if intent["complaint_id"]:
+            complaint = complaints_collection.find_one({"id": intent["complaint_id"], "user_id": user_id}, STATUS_PROJECTION)
+            if complaint is None:
+                return (f"I couldn't find complaint **{intent['complaint_id']}** in your account. Please check the ID, "
+                        f"or open 'My Complaints' to see all of your complaints.")
+        else:
+            complaint = next(iter(complaints_collection.find({"user_id": user_id}, STATUS_PROJECTION)
+                                  .sort("submitted_date", -1).limit(1)), None)
+            if complaint is None:
+                return no_complaints
+        return _status_reply(complaint)
+
+    if intent["intent"] == "count":
+        counts = {
+            (group["_id"] or "pending"): group["count"]
+            for group in complaints_collection.aggregate([
+                {"$match": {"user_id": user_id}},
+                {"$group": {"_id": {"$toLower": "$status"}, "count": {"$sum": 1}}}
+            ])
+        }
+        total = sum(counts.values())
+        if not total:
+            return no_complaints
+        breakdown = ", ".join(f"{count} {_status_label(status).lower()}" for status, count in sorted(counts.items()))
+        return f"📊 You have submitted **{total}** complaint{'s' if total != 1 else ''}: {breakdown}."
+
+    recent = list(complaints_collection.find({"user_id": user_id}, STATUS_PROJECTION).sort("submitted_date", -1).limit(5))
+    if not recent:
+        return no_complaints
+    total = complaints_collection.count_documents({"user_id": user_id})
+    if total > len(recent):
+        lines = [f"📋 Your {len(recent)} most recent complaints (of {total}):"]
+    else:
+        lines = [f"📋 Your complaint{'s' if total != 1 else ''}:"]
+    for complaint in recent:
+        lines.append(f"• **{complaint.get('id', '')}** – {complaint.get('title') or 'Untitled'}: "
+                     f"{_status_label(complaint.get('status'))} (submitted {_format_date(complaint.get('submitted_date'))})")
+    if total > len(recent):
+        lines.append("Open 'My Complaints' to see all of them.")
+    return "\n".join(lines)
+
+
+async def _intent_answer(message: str, current_user: User) -> Optional[str]:
+    """Answer for status, tracking and count questions about the user's complaints, else None"""
+    if not Config.CHAT_INTENT_ENABLED or not chat_intent_classifier.is_candidate(message):
+        return None
+    embedding = None
+    if not COMPLAINT_ID_PATTERN.search(message):
+        try:
+            embedding = await asyncio.to_thread(_embed_intent_question, message)
+        except Exception as e:
+            logger.warning(f"Chat intent embedding failed, deferring to the LLM: {str(e)}")
+            return None
+    intent = chat_intent_classifier.classify(message, embedding)
+    if intent is None:
+        return None
+    return await asyncio.to_thread(_intent_reply, intent, current_user["user_id"])
+
+
+async def _cached_answer(message: str, current_user: User) -> Tuple[Optional[str], Optional[np.ndarray]]:
+    """Cached answer personalized for the user, else the question embedding to cache a fresh answer under.
+
+    Both are None when the question is personal (or the cache is off) and must be
+    answered from the user's full context.
+    """
+    if not Config.CHAT_SEMANTIC_CACHE_ENABLED:
+        return None, None
+    if not is_shareable_question(message):
+        chat_answer_cache.record_bypass()
+        return None, None
+    try:
+        embedding = await asyncio.to_thread(_embed_question, message)
+    except Exception as e:
+        logger.warning(f"Chat question embedding failed, skipping the answer cache: {str(e)}")
+        return None, None
+    hit = chat_answer_cache.lookup(embedding)
+    if hit is not None:
+        return render(hit[0], current_user.get("full_name")), None
+    return None, embedding
+
+
+async def _local_answer(message: str, current_user: User) -> Tuple[Optional[str], Optional[np.ndarray], bool]:
+    """Answer without a full LLM generation where possible.
+
+    Returns the answer (None when the LLM must answer), the question embedding
+    to cache a fresh answer under, and whether the answer came from the user's
+    own complaints.
+    """
+    # Quick-response chips are answered from memory
+    answer = quick_answers.answer(message)
+    if answer is not None:
+        return answer, None, False
+    # Status, tracking and count questions are answered from MongoDB
+    answer = await _intent_answer(message, current_user)
+    if answer is not None:
+        return answer, None, True
+    # Other general questions may be in the semantic cache
+    answer, embedding = await _cached_answer(message, current_user)
+    return answer, embedding, False
+
+
+def _remember_answer(message: str, embedding: np.ndarray, ai_response: str, current_user: User, started: float) -> None:
+    # Canned fallbacks mean every provider failed; the next asker should get a real answer
+    if not ai_response or ai_response == services.ai_service._generate_fallback_chat_response(message):
+        return
+    template = to_template(ai_response, current_user.get("full_name"))
+    chat_answer_cache.store(message, embedding, template, (time.perf_counter() - started) * 1000)
+
+
+def _complaint_form_offer(message: str) -> Optional[dict]:
+    """Pre-filled guided complaint data when the message looks like a complaint, else None"""
+    # Check if this looks like a complaint description
+    complaint_keywords = [
+        "problem", "issue", "broken", "not working", "damaged", "complaint",
+        "road", "water", "electricity", "garbage", "pollution", "noise",
+        "pothole", "streetlight", "drainage", "sewage", "corruption"
+    ]
+    
+    message_lower = message.lower()
+    seems_like_complaint = any(keyword in message_lower for keyword in complaint_keywords)
+
+    if seems_like_complaint and len(message.split()) > 5:  # Substantial message
+        # Pre-populate some data if possible
+        return {
+            "detected_description": message,
+            "suggested_category": _detect_category(message),
+            "step": "confirm"
+        }
+    return None
+
+
+def _save_chat_record(user_id: str, user_message: str, ai_response: str, complaint_form_data: Optional[dict]) -> dict:
+    chat_record = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "user_message": user_message,
+        "ai_response": ai_response,
+        "timestamp": datetime.utcnow(),
+        "has_complaint_form": complaint_form_data is not None,
+        "complaint_form_data": complaint_form_data
+    }
+    
+    get_database().chat_history.insert_one(chat_record)
+    return chat_record
+
 
 @router.post("/message", response_model=ChatResponse)
 async def send_chat_message(
     message: ChatMessage,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Send message to AI assistant with enhanced complaint detection"""
     try:
-        # Get user context (recent complaints, etc.)
-        db = get_database()
-        complaints_collection = db.complaints
-        
-        # Get user's recent complaints for context
-        recent_complaints = list(complaints_collection.find(
-            {"user_id": current_user["user_id"]}
-        ).sort("submitted_date", -1).limit(5))
-        
-        user_context = {
-            "user_id": current_user["user_id"],
-            "user_name": current_user.get("full_name"),
-            "recent_complaints": recent_complaints
-        }
-        
-        # Check if this looks like a complaint description
-        complaint_keywords = [
-            "problem", "issue", "broken", "not working", "damaged", "complaint",
-            "road", "water", "electricity", "garbage", "pollution", "noise",
-            "pothole", "streetlight", "drainage", "sewage", "corruption"
-        ]
-        
-        message_lower = message.message.lower()
-        seems_like_complaint = any(keyword in message_lower for keyword in complaint_keywords)
-        
-        # Generate AI response
-        ai_response = await ai_service.generate_chat_response(
-            message.message,
-            user_context
-        )
+        ai_response, embedding, from_complaints = await _local_answer(message.message, current_user)
+
+        if ai_response is None:
+            # Shared answers only see the user's name; personal questions get recent complaints too
+            user_context = _shared_context(current_user) if embedding is not None else _build_user_context(current_user)
+            started = time.perf_counter()
+
+            # Generate AI response
+            ai_response = await ai_service.generate_chat_response(
+                message.message,
+                user_context
+            )
+            if embedding is not None:
+                _remember_answer(message.message, embedding, ai_response, current_user, started)
         
         # If it seems like a complaint, offer guided submission
-        has_complaint_form = False
-        complaint_form_data = None
-        
-        if seems_like_complaint and len(message.message.split()) > 5:  # Substantial message
-            has_complaint_form = True
-            ai_response += "\n\n🚀 **Quick Action**: I can help you submit this as an official complaint right now! Would you like me to guide you through the process step by step?"
-            
-            # Pre-populate some data if possible
-            complaint_form_data = {
-                "detected_description": message.message,
-                "suggested_category": _detect_category(message.message),
-                "step": "confirm"
-            }
+        complaint_form_data = None if from_complaints else _complaint_form_offer(message.message)
+        if complaint_form_data:
+            ai_response += QUICK_ACTION_HINT
         
         # Save chat history
-        chat_collection = db.chat_history
-        chat_id = str(uuid.uuid4())
-        
-        chat_record = {
-            "id": chat_id,
-            "user_id": current_user["user_id"],
-            "user_message": message.message,
-            "ai_response": ai_response,
-            "timestamp": datetime.utcnow(),
-            "has_complaint_form": has_complaint_form,
-            "complaint_form_data": complaint_form_data
-        }
-        
-        chat_collection.insert_one(chat_record)
+        chat_record = _save_chat_record(current_user["user_id"], message.message, ai_response, complaint_form_data)
         
         return ChatResponse(**chat_record)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
 
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/message/stream")
+async def stream_chat_message(
+    message: ChatMessage,
+    current_user: User = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Stream the AI assistant's reply as Server-Sent Events.
+
+    Emits ``token`` events with text chunks as the provider produces them and a
+    final ``done`` event carrying the saved chat record (same shape as /chat/message).
+    """
+    try:
+        cached, embedding, from_complaints = await _local_answer(message.message, current_user)
+        user_context = None
+        if cached is None:
+            user_context = _shared_context(current_user) if embedding is not None else _build_user_context(current_user)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
+
+    async def event_stream():
+        chunks = []
+        try:
+            if cached is not None:
+                ai_response = cached
+                yield _sse_event("token", {"text": cached})
+            else:
+                started = time.perf_counter()
+                async for chunk in ai_service.stream_chat_response(message.message, user_context):
+                    chunks.append(chunk)
+                    yield _sse_event("token", {"text": chunk})
+
+                ai_response = "".join(chunks).strip()
+                if embedding is not None:
+                    _remember_answer(message.message, embedding, ai_response, current_user, started)
+            complaint_form_data = None if from_complaints else _complaint_form_offer(message.message)
+            if complaint_form_data:
+                ai_response += QUICK_ACTION_HINT
+                yield _sse_event("token", {"text": QUICK_ACTION_HINT})
+
+            chat_record = await asyncio.to_thread(
+                _save_chat_record, current_user["user_id"], message.message, ai_response, complaint_form_data
+            )
+            yield _sse_event("done", ChatResponse(**chat_record).dict())
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error processing chat message: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens reach the browser as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def _detect_category(message: str) -> str:
     """Detect likely complaint category from message content"""
     message_lower = message.lower()
@@ -134,13 +390,13 @@ def _detect_category(message: str) -> str:
 @router.post("/submit-guided-complaint")
 async def submit_guided_complaint(
     request: ComplaintSubmissionRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Submit complaint collected through guided chat process"""
     try:
-        from .complaint_routes import ComplaintCreate
-        from .ai_service import AIService
-        from .rag_modules.pipeline import RAGPipeline
+        from .complaint_routes import ComplaintCreate, _relevance_details
         
         complaint_data = request.complaint_data
         
@@ -158,9 +414,9 @@ async def submit_guided_complaint(
         complaint_id = f"CMP{uuid.uuid4().hex[:6].upper()}"
         submitted_time = datetime.utcnow()
         
-        # Process through RAG pipeline
-        rag_pipeline = RAGPipeline()
-        rag_result = rag_pipeline.process_text_complaint(
+        # Relevance comes from the RAG analysis; AIService's category/priority/response
+        # prompts only run for accepted submissions
+        rag_result = await rag_pipeline.process_text_complaint(
             title=complaint_data["title"],
             description=complaint_data["description"],
             metadata={
@@ -171,11 +427,12 @@ async def submit_guided_complaint(
                 "category_input": complaint_data["category"],
                 "urgency_input": complaint_data["urgency"],
                 "location_input": complaint_data["location"]
-            }
+            },
+            document_id=complaint_vector_id(complaint_id)
         )
-        
-        # AI Processing
-        ai_service = AIService()
+        if not rag_result.get("is_relevant", True):
+            raise HTTPException(status_code=422, detail=_relevance_details(rag_result))
+
         ai_analysis = await ai_service.analyze_complaint(
             title=complaint_data["title"],
             description=complaint_data["description"],
@@ -202,6 +459,7 @@ async def submit_guided_complaint(
             "status": "pending",
             "priority": priority_value,
             "priority_score": ai_analysis["priority_score"],
+            "priority_source": ai_analysis.get("priority_source"),
             "assigned_department": ai_analysis["assigned_department"],
             "ai_response": ai_analysis["suggested_response"],
             "ai_category": ai_analysis["category"],
@@ -215,7 +473,9 @@ async def submit_guided_complaint(
             "vector_db_id": rag_result["document_id"],
             "rag_summary": rag_result["summary"],
             "rag_department": rag_result["department"],
+            "rag_department_source": rag_result.get("department_source"),
             "rag_urgency": rag_result["urgency"],
+            "rag_urgency_source": rag_result.get("urgency_source"),
             "rag_location": rag_result["location"],
             "rag_color": rag_result["color"],
             "rag_emoji": rag_result["emoji"],
@@ -249,6 +509,8 @@ async def submit_guided_complaint(
         else:
             raise HTTPException(status_code=500, detail="Failed to submit complaint")
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting guided complaint: {str(e)}")
 
@@ -299,15 +561,4 @@ async def clear_chat_history(current_user: User = Depends(get_current_user)):
 @router.get("/quick-responses")
 async def get_quick_responses():
     """Get predefined quick response options"""
-    return {
-        "quick_responses": [
-            "What's the status of my complaint?",
-            "How long does it take to resolve complaints?",
-            "How do I submit a new complaint?",
-            "Which department handles my type of issue?",
-            "Can I update my complaint details?",
-            "How do I contact support?",
-            "What documents should I attach?",
-            "How is priority determined?"
-        ]
-    }
+    return {"quick_responses": QUICK_RESPONSES}
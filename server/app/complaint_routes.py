@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
 from datetime import datetime, date
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, ValidationError
 
-from .ai_service import AIService
 from .auth_utils import get_current_user
 from .db import get_database
+from .jobs.job_queue import job_queue
 from .models import AttachmentMeta, ComplaintCreate, ComplaintInDB, ComplaintResponse
 from .notification_routes import create_notification
+from .ai_service import AIService
+from .rag_config import Config
+from .rag_modules.location_gazetteer import location_gazetteer
 from .rag_modules.pipeline import RAGPipeline
+from .rag_modules.vector_backfill import complaint_vector_id
+from .registry import get_ai_service, get_rag_pipeline, services
 from .utils.document_storage import get_document_storage
 from .utils.pdf_generator import generate_complaint_document
 
@@ -22,6 +29,9 @@ router = APIRouter(prefix="/complaints", tags=["complaints"])
 ATTACHMENT_ROOT = Path(__file__).resolve().parent.parent / "uploads" / "complaints"
 ATTACHMENT_ROOT.mkdir(parents=True, exist_ok=True)
 
+# Job type processed by the background worker for async submissions
+ENRICHMENT_JOB = "enrich_complaint"
+
 
 class ComplaintUpdate(BaseModel):
     status: Optional[str] = None
@@ -29,10 +39,6 @@ class ComplaintUpdate(BaseModel):
     admin_notes: Optional[str] = None
 
 
-ai_service = AIService()
-rag_pipeline = RAGPipeline()
-
-
 def _sanitize_filename(filename: str) -> str:
     allowed = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_."
     sanitized = "".join(char if char in allowed else "_" for char in filename)
@@ -143,6 +149,144 @@ async def _store_attachments(complaint_id: str, uploads: Optional[List[UploadFil
     return stored
 
 
+async def _rag_analysis(
+    rag_pipeline: RAGPipeline,
+    complaint_id: str,
+    user_id: str,
+    user_email: Optional[str],
+    title: str,
+    description: str,
+    category: Optional[str],
+    urgency: Optional[str],
+    location: str,
+) -> Dict[str, Any]:
+    # Decides relevance; callers run _ai_analysis only for accepted submissions,
+    # so rejected text costs no Groq/Fireworks calls.
+    return await rag_pipeline.process_text_complaint(
+        title=title,
+        description=description,
+        metadata={
+            "complaint_id": complaint_id,
+            "user_id": user_id,
+            "user_email": user_email,
+            "category_input": category,
+            "urgency_input": urgency,
+            "location_input": location,
+        },
+        document_id=complaint_vector_id(complaint_id),
+    )
+
+
+async def _ai_analysis(
+    ai_service: AIService,
+    title: str,
+    description: str,
+    urgency: Optional[str],
+    location: str,
+) -> Dict[str, Any]:
+    return await ai_service.analyze_complaint(
+        title=title,
+        description=description,
+        urgency=urgency,
+        location=location,
+    )
+
+
+def _enrichment_fields(rag_result: Dict[str, Any], ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "category": rag_result.get("department") or ai_analysis["category"],
+        "priority_score": ai_analysis["priority_score"],
+        "priority_source": ai_analysis.get("priority_source"),
+        "assigned_department": ai_analysis["assigned_department"],
+        "ai_response": ai_analysis["suggested_response"],
+        "ai_category": ai_analysis["category"],
+        "ai_department": ai_analysis["assigned_department"],
+        "estimated_resolution": ai_analysis["estimated_resolution"],
+        "vector_db_id": rag_result.get("document_id"),
+        "rag_summary": rag_result.get("summary"),
+        "rag_department": rag_result.get("department"),
+        "rag_department_source": rag_result.get("department_source"),
+        "rag_urgency": rag_result.get("urgency"),
+        "rag_urgency_source": rag_result.get("urgency_source"),
+        "rag_location": rag_result.get("location"),
+        "rag_color": rag_result.get("color"),
+        "rag_emoji": rag_result.get("emoji"),
+        "rag_text_length": rag_result.get("text_length"),
+        "rag_metadata": rag_result.get("metadata", {}),
+    }
+
+
+def _relevance_details(rag_result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "message": "Your submission doesn't appear to describe a civic complaint that the government portal can address.",
+        "reason": rag_result.get("relevance_reason", "No justification provided"),
+        "confidence": rag_result.get("relevance_confidence", 0.0),
+        "category": rag_result.get("relevance_category", "unknown"),
+        "summary": rag_result.get("summary", ""),
+    }
+
+
+def _store_complaint_document(db, complaint_data: Dict[str, Any], upload: Optional[Dict[str, Any]]) -> None:
+    """Store the citizen's uploaded file, or a PDF generated from the form data, in GridFS."""
+    complaint_id = complaint_data["id"]
+    complaints_collection = db.complaints
+    try:
+        doc_storage = get_document_storage(db)
+
+        if upload:
+            # Store the first uploaded file as the main document
+            document_id = doc_storage.store_document(
+                file_data=upload["data"],
+                filename=upload["filename"] or "complaint_document",
+                content_type=upload["content_type"] or "application/octet-stream",
+                metadata={
+                    "complaint_id": complaint_id,
+                    "user_id": complaint_data["user_id"],
+                    "document_type": "uploaded"
+                }
+            )
+
+            # Update complaint with document reference
+            complaints_collection.update_one(
+                {"id": complaint_id},
+                {"$set": {
+                    "document_id": str(document_id),
+                    "document_type": "uploaded",
+                    "filename": upload["filename"]
+                }}
+            )
+            print(f"✅ Stored uploaded document for complaint {complaint_id}: {document_id}")
+        else:
+            # Generate PDF from form data
+            pdf_bytes = generate_complaint_document(complaint_data)
+
+            document_id = doc_storage.store_document(
+                file_data=pdf_bytes,
+                filename=f"complaint_{complaint_id}.pdf",
+                content_type="application/pdf",
+                metadata={
+                    "complaint_id": complaint_id,
+                    "user_id": complaint_data["user_id"],
+                    "document_type": "generated"
+                }
+            )
+
+            # Update complaint with document reference
+            complaints_collection.update_one(
+                {"id": complaint_id},
+                {"$set": {
+                    "document_id": str(document_id),
+                    "document_type": "generated"
+                }}
+            )
+            print(f"✅ Generated and stored PDF document for complaint {complaint_id}: {document_id}")
+    except Exception as doc_error:
+        # Log error but don't fail the complaint submission
+        print(f"❌ Error storing complaint document for {complaint_id}: {doc_error}")
+        import traceback
+        traceback.print_exc()
+
+
 @router.post("/new", response_model=dict)
 async def submit_complaint(
     title: str = Form(...),
@@ -154,9 +298,16 @@ async def submit_complaint(
     phone: Optional[str] = Form(None),
     email: Optional[str] = Form(None),
     attachments: Optional[List[UploadFile]] = File(None),
+    mode: Optional[str] = Query(None, description="'sync' or 'async'; defaults to COMPLAINT_SUBMISSION_MODE"),
     current_user: Dict[str, Any] = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     try:
+        submission_mode = (mode or Config.COMPLAINT_SUBMISSION_MODE).lower()
+        if submission_mode not in ("sync", "async"):
+            raise HTTPException(status_code=422, detail="Invalid submission mode. Use 'sync' or 'async'.")
+
         occurrence_date: Optional[date] = None
         if date_occurred:
             try:
@@ -186,7 +337,6 @@ async def submit_complaint(
 
         complaint_id = f"CMP{uuid.uuid4().hex[:6].upper()}"
         submitted_time = datetime.utcnow()
-        status_value = "pending"
 
         priority_map = {
             "urgent": "high",
@@ -197,78 +347,66 @@ async def submit_complaint(
         urgency_lower = (complaint_payload.urgency or "medium").lower()
         priority_value = priority_map.get(urgency_lower, "medium")
 
-        try:
-            rag_result = rag_pipeline.process_text_complaint(
-                title=complaint_payload.title,
-                description=complaint_payload.description,
-                metadata={
-                    "complaint_id": complaint_id,
-                    "user_id": current_user["user_id"],
-                    "user_email": current_user["email"],
-                    "category_input": complaint_payload.category,
-                    "urgency_input": complaint_payload.urgency,
-                    "location_input": complaint_payload.location,
-                },
-            )
-        except Exception as rag_error:
-            raise HTTPException(status_code=500, detail=f"RAG processing failed: {rag_error}")
-
-        if not rag_result.get("is_relevant", True):
-            raise HTTPException(
-                status_code=422,
-                detail={
-                    "message": "Your submission doesn't appear to describe a civic complaint that the government portal can address.",
-                    "reason": rag_result.get("relevance_reason", "No justification provided"),
-                    "confidence": rag_result.get("relevance_confidence", 0.0),
-                    "category": rag_result.get("relevance_category", "unknown"),
-                    "summary": rag_result.get("summary", ""),
-                },
-            )
-
-        ai_analysis = await ai_service.analyze_complaint(
-            title=complaint_payload.title,
-            description=complaint_payload.description,
-            urgency=complaint_payload.urgency,
-            location=complaint_payload.location,
-        )
-
-        stored_attachments = await _store_attachments(complaint_id, attachments)
-
-        complaint_document = ComplaintInDB(
+        base_fields = dict(
             id=complaint_id,
             user_id=current_user["user_id"],
             user_name=current_user.get("full_name"),
             user_email=current_user.get("email"),
             title=complaint_payload.title,
             description=complaint_payload.description,
-            category=rag_result.get("department") or ai_analysis["category"],
             location=complaint_payload.location,
             contact_phone=complaint_payload.contact_phone,
             contact_email=complaint_payload.contact_email,
             urgency=complaint_payload.urgency,
-            status=status_value,
             priority=priority_value,
-            priority_score=ai_analysis["priority_score"],
-            assigned_department=ai_analysis["assigned_department"],
-            ai_response=ai_analysis["suggested_response"],
-            ai_category=ai_analysis["category"],
-            ai_department=ai_analysis["assigned_department"],
-            estimated_resolution=ai_analysis["estimated_resolution"],
             submitted_date=submitted_time,
             last_updated=submitted_time,
             created_at=submitted_time,
             updated_at=submitted_time,
             date_occurred=occurrence_date,
+        )
+
+        if submission_mode == "async":
+            return await _submit_complaint_async(complaint_payload, base_fields, attachments)
+
+        status_value = "pending"
+
+        try:
+            rag_result = await _rag_analysis(
+                rag_pipeline,
+                complaint_id,
+                current_user["user_id"],
+                current_user["email"],
+                complaint_payload.title,
+                complaint_payload.description,
+                complaint_payload.category,
+                complaint_payload.urgency,
+                complaint_payload.location,
+            )
+        except Exception as rag_error:
+            raise HTTPException(status_code=500, detail=f"RAG processing failed: {rag_error}")
+
+        if not rag_result.get("is_relevant", True):
+            raise HTTPException(status_code=422, detail=_relevance_details(rag_result))
+
+        try:
+            ai_analysis = await _ai_analysis(
+                ai_service,
+                complaint_payload.title,
+                complaint_payload.description,
+                complaint_payload.urgency,
+                complaint_payload.location,
+            )
+        except Exception as ai_error:
+            raise HTTPException(status_code=500, detail=f"AI analysis failed: {ai_error}")
+
+        stored_attachments = await _store_attachments(complaint_id, attachments)
+
+        complaint_document = ComplaintInDB(
+            **base_fields,
+            **_enrichment_fields(rag_result, ai_analysis),
+            status=status_value,
             attachments=[AttachmentMeta(**item) for item in stored_attachments],
-            vector_db_id=rag_result.get("document_id"),
-            rag_summary=rag_result.get("summary"),
-            rag_department=rag_result.get("department"),
-            rag_urgency=rag_result.get("urgency"),
-            rag_location=rag_result.get("location"),
-            rag_color=rag_result.get("color"),
-            rag_emoji=rag_result.get("emoji"),
-            rag_text_length=rag_result.get("text_length"),
-            rag_metadata=rag_result.get("metadata", {}),
             status_history=[
                 {
                     "status": status_value,
@@ -282,71 +420,19 @@ async def submit_complaint(
 
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to submit complaint")
+        location_gazetteer.learn([complaint_document.location])
 
         # Generate and store PDF document for the complaint
-        try:
-            doc_storage = get_document_storage(db)
-            
-            # Determine if user uploaded a document or filled form
-            has_uploaded_file = bool(attachments and len(attachments) > 0)
-            
-            if has_uploaded_file:
-                # Store the first uploaded file as the main document
-                first_attachment = attachments[0]
-                file_data = await first_attachment.read()
-                await first_attachment.seek(0)
-                
-                document_id = doc_storage.store_document(
-                    file_data=file_data,
-                    filename=first_attachment.filename or "complaint_document",
-                    content_type=first_attachment.content_type or "application/octet-stream",
-                    metadata={
-                        "complaint_id": complaint_id,
-                        "user_id": current_user["user_id"],
-                        "document_type": "uploaded"
-                    }
-                )
-                
-                # Update complaint with document reference
-                complaints_collection.update_one(
-                    {"id": complaint_id},
-                    {"$set": {
-                        "document_id": str(document_id),
-                        "document_type": "uploaded",
-                        "filename": first_attachment.filename
-                    }}
-                )
-                print(f"✅ Stored uploaded document for complaint {complaint_id}: {document_id}")
-            else:
-                # Generate PDF from form data
-                complaint_data = complaint_document.dict()
-                pdf_bytes = generate_complaint_document(complaint_data)
-                
-                document_id = doc_storage.store_document(
-                    file_data=pdf_bytes,
-                    filename=f"complaint_{complaint_id}.pdf",
-                    content_type="application/pdf",
-                    metadata={
-                        "complaint_id": complaint_id,
-                        "user_id": current_user["user_id"],
-                        "document_type": "generated"
-                    }
-                )
-                
-                # Update complaint with document reference
-                complaints_collection.update_one(
-                    {"id": complaint_id},
-                    {"$set": {
-                        "document_id": str(document_id),
-                        "document_type": "generated"
-                    }}
-                )
-                print(f"✅ Generated and stored PDF document for complaint {complaint_id}: {document_id}")
-        except Exception as doc_error:
-            # Log error but don't fail the complaint submission
-            print(f"❌ Error storing complaint document for {complaint_id}: {doc_error}")
-            import traceback
-            traceback.print_exc()
+        upload = None
+        if attachments:
+            first_attachment = attachments[0]
+            upload = {
+                "data": await first_attachment.read(),
+                "filename": first_attachment.filename,
+                "content_type": first_attachment.content_type,
+            }
+            await first_attachment.seek(0)
+        _store_complaint_document(db, complaint_document.dict(), upload)
 
         await create_notification(
             user_id=current_user["user_id"],
@@ -387,6 +473,216 @@ async def submit_complaint(
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Error submitting complaint: {exc}")
 
+
+async def _submit_complaint_async(
+    complaint_payload: ComplaintCreate,
+    base_fields: Dict[str, Any],
+    attachments: Optional[List[UploadFile]],
+) -> JSONResponse:
+    """Persist the raw complaint as ``processing`` and leave the analysis to the enrichment worker."""
+    complaint_id = base_fields["id"]
+    stored_attachments = await _store_attachments(complaint_id, attachments)
+
+    complaint_document = ComplaintInDB(
+        **base_fields,
+        category=complaint_payload.category,
+        status="processing",
+        attachments=[AttachmentMeta(**item) for item in stored_attachments],
+        status_history=[
+            {
+                "status": "processing",
+                "timestamp": base_fields["submitted_date"],
+                "note": "Complaint received, RAG and AI analysis queued",
+            }
+        ],
+    )
+
+    result = get_database().complaints.insert_one(complaint_document.dict())
+    if not result.inserted_id:
+        raise HTTPException(status_code=500, detail="Failed to submit complaint")
+    location_gazetteer.learn([complaint_document.location])
+
+    upload = None
+    if stored_attachments:
+        upload = {
+            "path": str(ATTACHMENT_ROOT / complaint_id / stored_attachments[0]["filename"]),
+            "filename": attachments[0].filename,
+            "content_type": stored_attachments[0]["content_type"],
+        }
+
+    job_id = job_queue.enqueue(ENRICHMENT_JOB, {"complaint_id": complaint_id, "upload": upload})
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "complaint_id": complaint_id,
+            "id": complaint_id,
+            "status": "processing",
+            "job_id": job_id,
+            "status_url": f"/complaints/{complaint_id}",
+        },
+    )
+
+
+async def _run_enrichment_job(job: Dict[str, Any]) -> None:
+    """Background enrichment for complaints submitted in async mode.
+
+    Every step checks what an earlier (crashed or failed) attempt already did,
+    so retries never analyze, store or notify twice: the RAG result is saved
+    on the complaint before the AI analysis runs, and the vector document id
+    is derived from the complaint id, so re-indexing overwrites it.
+    """
+    payload = job["payload"]
+    complaint_id = payload["complaint_id"]
+    db = get_database()
+    complaints_collection = db.complaints
+
+    complaint = await asyncio.to_thread(complaints_collection.find_one, {"id": complaint_id})
+    if not complaint:
+        print(f"⚠️ Enrichment skipped, complaint {complaint_id} no longer exists")
+        return
+
+    if complaint.get("status") == "processing":
+        rag_result = complaint.get("pending_rag_result")
+        if rag_result is None:
+            rag_result = await _rag_analysis(
+                services.rag_pipeline,
+                complaint_id,
+                complaint["user_id"],
+                complaint.get("user_email"),
+                complaint["title"],
+                complaint["description"],
+                complaint.get("category"),
+                complaint.get("urgency"),
+                complaint["location"],
+            )
+        now = datetime.utcnow()
+
+        if not rag_result.get("is_relevant", True):
+            details = _relevance_details(rag_result)
+            await asyncio.to_thread(
+                complaints_collection.update_one,
+                {"id": complaint_id, "status": "processing"},
+                {
+                    "$set": {
+                        "status": "rejected",
+                        "rejection_details": details,
+                        "rag_summary": rag_result.get("summary"),
+                        "last_updated": now,
+                        "updated_at": now,
+                    },
+                    "$push": {"status_history": {
+                        "status": "rejected",
+                        "timestamp": now,
+                        "note": f"Rejected by relevance check: {details['reason']}",
+                    }},
+                },
+            )
+            await create_notification(
+                user_id=complaint["user_id"],
+                title="Complaint Not Accepted",
+                message=f"Your submission '{complaint['title']}' doesn't appear to describe a civic complaint the portal can address: {details['reason']}",
+                type="rejected",
+                related_complaint_id=complaint_id,
+                urgency=complaint.get("urgency"),
+            )
+            return
+
+        if "pending_rag_result" not in complaint:
+            # Checkpoint: a retry after a failed AI analysis skips the RAG analysis
+            await asyncio.to_thread(
+                complaints_collection.update_one,
+                {"id": complaint_id, "status": "processing"},
+                {"$set": {"pending_rag_result": rag_result}},
+            )
+
+        ai_analysis = await _ai_analysis(
+            services.ai_service,
+            complaint["title"],
+            complaint["description"],
+            complaint.get("urgency"),
+            complaint["location"],
+        )
+        await asyncio.to_thread(
+            complaints_collection.update_one,
+            {"id": complaint_id, "status": "processing"},
+            {
+                "$set": {
+                    **_enrichment_fields(rag_result, ai_analysis),
+                    "status": "pending",
+                    "last_updated": now,
+                    "updated_at": now,
+                },
+                "$unset": {"pending_rag_result": ""},
+                "$push": {"status_history": {
+                    "status": "pending",
+                    "timestamp": now,
+                    "note": "Complaint processed by RAG and AI analysis",
+                }},
+            },
+        )
+        complaint = await asyncio.to_thread(complaints_collection.find_one, {"id": complaint_id})
+
+    if complaint.get("status") == "rejected":
+        return
+
+    if not complaint.get("document_id"):
+        upload = payload.get("upload")
+        if upload:
+            upload = {**upload, "data": await asyncio.to_thread(Path(upload["path"]).read_bytes)}
+        await asyncio.to_thread(_store_complaint_document, db, complaint, upload)
+
+    # Claim the notification atomically so a retried job cannot send it twice
+    claimed = await asyncio.to_thread(
+        complaints_collection.update_one,
+        {"id": complaint_id, "ready_notified": {"$ne": True}},
+        {"$set": {"ready_notified": True}},
+    )
+    if claimed.modified_count:
+        await create_notification(
+            user_id=complaint["user_id"],
+            title="Complaint Submitted",
+            message=f"Your complaint '{complaint['title']}' has been processed by the RAG intelligence pipeline and is now with {complaint.get('assigned_department') or 'the relevant department'}.",
+            type="submitted",
+            related_complaint_id=complaint_id,
+            problem_type=(complaint.get("rag_department") or "general").lower().replace(" ", "_"),
+            department=complaint.get("rag_department"),
+            urgency=complaint.get("urgency"),
+        )
+
+
+async def _enrichment_failed(job: Dict[str, Any]) -> None:
+    """Out of retries: release the complaint to the normal queue for manual triage."""
+    complaint_id = job["payload"]["complaint_id"]
+    complaints_collection = get_database().complaints
+    now = datetime.utcnow()
+    result = await asyncio.to_thread(
+        complaints_collection.update_one,
+        {"id": complaint_id, "status": "processing"},
+        {
+            "$set": {"status": "pending", "last_updated": now, "updated_at": now},
+            "$push": {"status_history": {
+                "status": "pending",
+                "timestamp": now,
+                "note": "Automatic analysis failed, awaiting manual review",
+            }},
+        },
+    )
+    complaint = await asyncio.to_thread(complaints_collection.find_one, {"id": complaint_id})
+    if result.modified_count and complaint:
+        await create_notification(
+            user_id=complaint["user_id"],
+            title="Complaint Submitted",
+            message=f"Your complaint '{complaint['title']}' has been submitted and will be reviewed by our staff.",
+            type="submitted",
+            related_complaint_id=complaint_id,
+            urgency=complaint.get("urgency"),
+        )
+
+
+job_queue.register(ENRICHMENT_JOB, _run_enrichment_job, on_failure=_enrichment_failed)
+
 @router.get("/my-complaints", response_model=List[ComplaintResponse])
 async def get_my_complaints(
     current_user: Dict[str, Any] = Depends(get_current_user),
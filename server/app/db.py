@@ -11,6 +11,8 @@ users_collection = db["users"]
 otp_collection = db["otp_codes"]
 complaints_collection = db["complaints"]
 admin_notes_collection = db["admin_notes"]
+llm_cache_collection = db["llm_cache"]
+jobs_collection = db["jobs"]
 
 def get_database():
     """Get database instance"""
@@ -82,12 +84,18 @@ def ensure_indexes() -> None:
 
         complaints_collection.create_index("id", name="complaint_id_idx")
         complaints_collection.create_index("user_id", name="complaint_user_idx")
+        complaints_collection.create_index([("user_id", ASCENDING), ("submitted_date", DESCENDING)], name="complaint_user_date_idx")
         complaints_collection.create_index("status", name="complaint_status_idx")
         complaints_collection.create_index([("submitted_date", DESCENDING), ("created_at", DESCENDING)], name="complaint_date_idx")
         complaints_collection.create_index("category", name="complaint_category_idx")
 
         otp_collection.create_index("email", name="otp_email_idx")
         otp_collection.create_index("expires_at", expireAfterSeconds=0, name="otp_expiry_idx")
+
+        llm_cache_collection.create_index("expires_at", expireAfterSeconds=0, name="llm_cache_expiry_idx")
+
+        jobs_collection.create_index([("status", ASCENDING), ("run_at", ASCENDING)], name="job_claim_idx")
+        jobs_collection.create_index("lease_expires_at", name="job_lease_idx")
     except Exception as exc:  # pragma: no cover - defensive logging
         print(f"Database index creation warning: {exc}")
 
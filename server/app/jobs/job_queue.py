@@ -0,0 +1,216 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import random
+import socket
+import uuid
+
+from pymongo import ReturnDocument
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobQueue:
+    """Durable job queue backed by a MongoDB collection.
+
+    Workers claim a job atomically with ``find_one_and_update`` and hold a lease
+    that is renewed while the handler runs. A job whose worker died becomes
+    claimable again once its lease expires (visibility timeout). Failed jobs
+    are retried with exponential backoff until ``max_attempts``, after which
+    the handler's ``on_failure`` hook runs and the job is marked ``failed``.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self,
+                 collection_name: str = "jobs",
+                 lease_seconds: float = Config.JOB_LEASE_SECONDS,
+                 max_attempts: int = Config.JOB_MAX_ATTEMPTS,
+                 retry_base_seconds: float = Config.JOB_RETRY_BASE_SECONDS,
+                 poll_interval: float = Config.JOB_POLL_INTERVAL,
+                 concurrency: int = Config.JOB_WORKER_CONCURRENCY):
+        self.collection_name = collection_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_hooks: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._collection = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            from app.db import get_database
+            self._collection = get_database()[self.collection_name]
+        return self._collection
+
+    def register(self, job_type: str, handler: JobHandler, on_failure: Optional[JobHandler] = None) -> None:
+        """Register the coroutine that processes ``job_type`` jobs (and an optional dead-letter hook)."""
+        self._handlers[job_type] = handler
+        if on_failure is not None:
+            self._failure_hooks[job_type] = on_failure
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        self._get_collection().insert_one({
+            "_id": job_id,
+            "type": job_type,
+            "payload": payload,
+            "status": self.QUEUED,
+            "attempts": 0,
+            "run_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return self._get_collection().find_one_and_update(
+            {
+                "type": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": self.QUEUED, "run_at": {"$lte": now}},
+                    # Lease expired: the worker holding it crashed or hung
+                    {"status": self.RUNNING, "lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": self.RUNNING,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _renew_lease(self, job_id: str) -> None:
+        now = datetime.utcnow()
+        self._get_collection().update_one(
+            {"_id": job_id, "worker_id": self.worker_id, "status": self.RUNNING},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+        )
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None, run_at: Optional[datetime] = None) -> None:
+        update = {"status": status, "lease_expires_at": None, "updated_at": datetime.utcnow()}
+        if error is not None:
+            update["last_error"] = error
+        if run_at is not None:
+            update["run_at"] = run_at
+        self._get_collection().update_one({"_id": job_id, "worker_id": self.worker_id}, {"$set": update})
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew_lease, job_id)
+            except Exception as e:
+                logger.warning(f"Failed to renew lease for job {job_id}: {str(e)}")
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job["_id"]))
+        try:
+            await self._handlers[job["type"]](job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job["attempts"] >= self.max_attempts:
+                logger.error(f"Job {job['_id']} ({job['type']}) failed permanently after {job['attempts']} attempts: {error}")
+                hook = self._failure_hooks.get(job["type"])
+                if hook is not None:
+                    try:
+                        await hook(job)
+                    except Exception as hook_error:
+                        logger.error(f"Failure hook for job {job['_id']} raised: {str(hook_error)}")
+                await asyncio.to_thread(self._finish, job["_id"], self.FAILED, error)
+            else:
+                delay = self.retry_base_seconds * 2 ** (job["attempts"] - 1) * random.uniform(0.8, 1.2)
+                logger.warning(f"Job {job['_id']} ({job['type']}) attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}")
+                await asyncio.to_thread(
+                    self._finish, job["_id"], self.QUEUED, error, datetime.utcnow() + timedelta(seconds=delay)
+                )
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self._finish, job["_id"], self.DONE)
+
+    async def _worker_loop(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job claim failed: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. MongoDB unavailable while recording the outcome; the job is reclaimed once its lease expires
+                logger.error(f"Job {job['_id']} ({job['type']}) could not be completed: {str(e)}")
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop (called from the FastAPI lifespan)."""
+        if self._workers or not self._handlers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        logger.info(f"Started {self.concurrency} job workers ({self.worker_id}) for: {', '.join(self._handlers)}")
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they held are picked up again after their lease expires."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = {
+            entry["_id"]: entry["count"]
+            for entry in self._get_collection().aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+        return {
+            "worker_id": self.worker_id,
+            "workers": len(self._workers),
+            "job_types": list(self._handlers),
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+            "counts": {status: counts.get(status, 0) for status in (self.QUEUED, self.RUNNING, self.DONE, self.FAILED)}
+        }
+
+
+# Process-wide queue; handlers register at import time and workers start with the app
+job_queue = JobQueue()
@@ -0,0 +1,111 @@
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+import asyncio
+import logging
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent requests into one batched LLM call.
+
+    A batch is flushed once ``max_items`` requests are waiting or ``max_wait_ms``
+    after the first one arrived. ``run_batch`` receives the items in order and
+    returns results keyed by their index in the batch; any item it leaves out
+    (malformed or truncated batch response) or a failing batch call falls back
+    to ``run_single`` for just those items.
+    """
+
+    def __init__(self,
+                 name: str,
+                 run_batch: Callable[[List[T]], Awaitable[Dict[int, R]]],
+                 run_single: Callable[[T], Awaitable[R]],
+                 max_items: int = Config.LLM_BATCH_MAX_ITEMS,
+                 max_wait_ms: float = Config.LLM_BATCH_MAX_WAIT_MS):
+        self.name = name
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.max_items = max_items
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"requests": 0, "batches": 0, "batched_items": 0, "single_calls": 0, "fallback_items": 0}
+
+    async def submit(self, item: T) -> R:
+        """Queue ``item`` for the next batch and wait for its own result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self._stats["requests"] += 1
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            self._stats["single_calls"] += 1
+            await self._resolve_single(*batch[0])
+            return
+
+        self._stats["batches"] += 1
+        self._stats["batched_items"] += len(batch)
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            logger.warning(f"Batched {self.name} call for {len(batch)} items failed, falling back to per-item calls: {str(e)}")
+            results = {}
+
+        missing = []
+        for index, (item, future) in enumerate(batch):
+            if index in results:
+                if not future.done():
+                    future.set_result(results[index])
+            else:
+                missing.append((item, future))
+
+        if missing:
+            self._stats["fallback_items"] += len(missing)
+            if results:
+                logger.warning(f"Batched {self.name} response missed {len(missing)} of {len(batch)} items, re-asking individually")
+            await asyncio.gather(*(self._resolve_single(item, future) for item, future in missing))
+
+    async def _resolve_single(self, item: T, future: asyncio.Future) -> None:
+        try:
+            result = await self.run_single(item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": round(self._stats["batched_items"] / batches, 2) if batches else 0.0,
+            "max_items": self.max_items,
+            "max_wait_ms": self.max_wait_ms,
+            "waiting": len(self._pending)
+        }
@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def template_version(template: str) -> str:
+    """Short content hash of a prompt template; editing the template changes every cache key built from it."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_text(value: Any) -> str:
+    """Normalize prompt input so whitespace/unicode variants of the same complaint share a cache entry."""
+    text = unicodedata.normalize("NFKC", str(value))
+    return " ".join(text.split())
+
+
+class GenerationAbandoned(Exception):
+    """The caller generating a coalesced response was cancelled before it finished."""
+
+
+class LLMCache:
+    """Two-tier content-addressed cache for LLM responses.
+
+    Tier 1 is a bounded in-process LRU with TTL; tier 2 is a MongoDB collection
+    whose TTL index expires entries server-side. Keys hash the provider, model,
+    prompt type, prompt template version and normalized prompt variables.
+    """
+
+    def __init__(self,
+                 max_entries: int = Config.LLM_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = Config.LLM_CACHE_TTL_SECONDS,
+                 persistent: bool = Config.LLM_CACHE_PERSISTENT,
+                 collection_name: str = "llm_cache"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.collection_name = collection_name
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._collection = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt_type: str, template: str, variables: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [provider, model, prompt_type, template_version(template),
+             {name: normalize_text(value) for name, value in variables.items()}],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _record(self, prompt_type: str, outcome: str) -> None:
+        counters = self._stats.setdefault(prompt_type, {"memory_hits": 0, "persistent_hits": 0, "coalesced": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def _get_collection(self):
+        if self._collection is None:
+            from app.db import get_database
+            self._collection = get_database()[self.collection_name]
+        return self._collection
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._memory[key] = (time.monotonic() + ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _persistent_get(self, key: str) -> Optional[Tuple[str, float]]:
+        document = self._get_collection().find_one({"_id": key}, {"value": 1, "expires_at": 1})
+        if not document:
+            return None
+        remaining = (document["expires_at"] - datetime.utcnow()).total_seconds()
+        # The TTL monitor only runs once a minute, so expired documents can still be returned
+        if remaining <= 0:
+            return None
+        return document["value"], remaining
+
+    def _persistent_set(self, key: str, value: str, provider: str, model: str, prompt_type: str, template: str) -> None:
+        now = datetime.utcnow()
+        self._get_collection().replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "value": value,
+                "provider": provider,
+                "model": model,
+                "prompt_type": prompt_type,
+                "template_version": template_version(template),
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            },
+            upsert=True
+        )
+
+    async def get_or_generate(self,
+                              provider: str,
+                              model: str,
+                              prompt_type: str,
+                              template: str,
+                              variables: Dict[str, Any],
+                              generate: Callable[[], Awaitable[str]],
+                              cacheable: Optional[Callable[[str], bool]] = None) -> str:
+        """Return a cached response or call ``generate`` and cache its result.
+
+        Exceptions from ``generate`` propagate and are never cached, so callers keep
+        their own fallbacks. ``cacheable`` can reject responses (e.g. malformed JSON)
+        that should be retried next time instead of being stored.
+        """
+        key = self.make_key(provider, model, prompt_type, template, variables)
+
+        value = self._memory_get(key)
+        if value is not None:
+            self._record(prompt_type, "memory_hits")
+            return value
+
+        # Identical prompts already in flight share one provider call
+        if key in self._inflight:
+            self._record(prompt_type, "coalesced")
+            try:
+                return await asyncio.shield(self._inflight[key])
+            except GenerationAbandoned:
+                # The caller generating it was cancelled (client disconnect, hedge loser): take over
+                return await self.get_or_generate(provider, model, prompt_type, template, variables, generate, cacheable)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if self.persistent:
+                try:
+                    stored = await asyncio.to_thread(self._persistent_get, key)
+                except Exception as e:
+                    logger.warning(f"LLM cache lookup failed: {str(e)}")
+                    stored = None
+                if stored is not None:
+                    value, remaining = stored
+                    self._memory_set(key, value, min(remaining, self.ttl_seconds))
+                    self._record(prompt_type, "persistent_hits")
+                    future.set_result(value)
+                    return value
+
+            self._record(prompt_type, "misses")
+            value = await generate()
+
+            if value and (cacheable is None or cacheable(value)):
+                self._memory_set(key, value)
+                if self.persistent:
+                    try:
+                        await asyncio.to_thread(self._persistent_set, key, value, provider, model, prompt_type, template)
+                    except Exception as e:
+                        logger.warning(f"LLM cache write failed: {str(e)}")
+
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Only this caller is cancelled; coalesced waiters retry instead of failing with it
+            future.set_exception(GenerationAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other caller is waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per prompt type plus tier sizes."""
+        by_prompt_type = {}
+        for prompt_type, counters in self._stats.items():
+            total = sum(counters.values())
+            hits = total - counters["misses"]
+            by_prompt_type[prompt_type] = {**counters, "hit_rate": round(hits / total, 4) if total else 0.0}
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self.persistent,
+            "prompt_types": by_prompt_type
+        }
+
+    def clear(self, persistent: bool = True) -> int:
+        """Drop every cached entry; returns the number of persistent entries removed."""
+        self._memory.clear()
+        if persistent and self.persistent:
+            return self._get_collection().delete_many({}).deleted_count
+        return 0
+
+
+# Process-wide cache shared by GeminiClient and AIService
+llm_cache = LLMCache()
@@ -1,64 +1,355 @@
 import google.generativeai as genai
 from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import logging
+import time
+from app.llm.batcher import MicroBatcher
+from app.llm.cache import llm_cache
+from app.llm.http_pool import get_http_client
+from app.llm.metrics import CallMetrics, llm_metrics
+from app.llm.rate_limiter import rate_limiter
+from app.llm.router import provider_router
 from app.rag_config import Config
+from app.utils.document_processor import DocumentProcessor
 
 logger = logging.getLogger(__name__)
 
+# Completion size reserved against the Gemini token budget (the SDK calls set no output cap)
+RESPONSE_TOKEN_ESTIMATE = 512
+
+URGENCY_ALIASES = {
+    "HIGH": "High",
+    "EMERGENCY": "High",
+    "URGENT": "High",
+    "MEDIUM": "Medium",
+    "MODERATE": "Medium",
+    "LOW": "Low",
+}
+
+
+def _department_variables() -> Dict[str, str]:
+    """Prompt variables describing the configured departments."""
+    return {
+        "departments": ", ".join(Config.DEPARTMENTS),
+        "guidelines": "\n".join(
+            f"- {name}: {description}" for name, description in Config.DEPARTMENT_GUIDELINES.items()
+        )
+    }
+
+
+def _analysis_schema() -> Dict[str, Any]:
+    """Gemini response schema for one ANALYSIS_PROMPT answer, with enums from the configured labels."""
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "summary": {"type": "STRING"},
+            "urgency": {"type": "STRING", "format": "enum", "enum": list(Config.URGENCY_LEVELS)},
+            "department": {"type": "STRING", "format": "enum", "enum": list(Config.DEPARTMENTS)},
+            "location": {"type": "STRING"},
+            "is_relevant": {"type": "BOOLEAN"},
+            "confidence": {"type": "NUMBER"},
+            "category": {"type": "STRING"},
+            "reason": {"type": "STRING"}
+        },
+        "required": ["summary", "urgency", "department", "location", "is_relevant", "confidence", "category", "reason"]
+    }
+
+
+def _batch_analysis_schema() -> Dict[str, Any]:
+    """Response schema for BATCH_ANALYSIS_PROMPT: an array of analyses tagged with their submission id."""
+    item = _analysis_schema()
+    item["properties"] = {"id": {"type": "STRING"}, **item["properties"]}
+    item["required"] = ["id", *item["required"]]
+    return {"type": "ARRAY", "items": item}
+
+
+SUMMARY_PROMPT = """
+Please provide a concise summary of the following complaint or report.
+Focus on the main issue, location (if mentioned), and key details.
+Keep the summary under 100 words and make it clear and actionable.
+
+Complaint text:
+{text}
+
+Summary:
+"""
+
+URGENCY_PROMPT = """
+Analyze the following complaint and classify its urgency level based on these criteria:
+
+HIGH: Emergency situations, immediate safety risks, critical infrastructure failures,
+      health hazards, accidents, or situations requiring immediate attention.
+
+MEDIUM: Important issues that need attention within days/weeks, moderate inconvenience,
+        non-critical infrastructure problems, or issues affecting multiple people.
+
+LOW: Minor issues, routine maintenance requests, suggestions for improvement,
+     or non-urgent matters that can be addressed in regular workflow.
+
+Complaint text:
+{text}
+
+Respond with only one word: HIGH, MEDIUM, or LOW
+"""
+
+LOCATION_PROMPT = """
+Analyze the following complaint and extract the specific location mentioned.
+Look for:
+- Street names, road names, avenue names
+- Landmarks, buildings, institutions
+- Intersections, cross streets
+- Area names, neighborhood names
+- Specific addresses or address ranges
+
+If multiple locations are mentioned, focus on the primary location where the issue occurs.
+If no specific location is found, return "Location not specified".
+
+Complaint text:
+{text}
+
+Respond with only the extracted location in a clear, concise format (e.g., "Main Street between 5th Avenue and 7th Avenue" or "City Park near the playground").
+"""
+
+DEPARTMENT_PROMPT = """
+Analyze the following complaint and determine which department should handle it.
+
+Available departments:
+{departments}
+
+Guidelines:
+{guidelines}
+
+Complaint text:
+{text}
+
+Respond with only the exact department name from the list above.
+"""
+
+ANALYSIS_PROMPT = """
+You are triaging a submission to a government public service complaint portal.
+Analyze the text below and respond STRICTLY as minified JSON in the format:
+{{"summary": "<summary>", "urgency": "<High|Medium|Low>", "department": "<department>", "location": "<location>", "is_relevant": <true/false>, "confidence": <0 to 1>, "category": "<short label>", "reason": "<one sentence justification>"}}
+
+summary: concise summary under 100 words focusing on the main issue, location (if mentioned), and key details.
+
+urgency:
+HIGH: Emergency situations, immediate safety risks, critical infrastructure failures,
+      health hazards, accidents, or situations requiring immediate attention.
+MEDIUM: Important issues that need attention within days/weeks, moderate inconvenience,
+        non-critical infrastructure problems, or issues affecting multiple people.
+LOW: Minor issues, routine maintenance requests, suggestions for improvement,
+     or non-urgent matters that can be addressed in regular workflow.
+
+department: exactly one of {departments}
+Guidelines:
+{guidelines}
+
+location: the primary street, landmark, intersection, area or address where the issue occurs,
+or "Location not specified" if none is mentioned.
+
+is_relevant: true only for civic/government complaints (public infrastructure, utilities, safety,
+sanitation, transport, governance, corruption, healthcare, education). false for resumes,
+biographies, advertisements, job inquiries, promotional content, irrelevant chatter or content
+without an actionable issue for a public department.
+
+Text:
+{text}
+"""
+
+CHUNK_SUMMARY_PROMPT = """
+The text below is part {part} of {total} of a long document submitted to a government complaint portal.
+Summarize this part in under 120 words. Keep every concrete detail needed to triage the complaint:
+the problems reported, locations, dates, safety hazards and the number of people affected.
+If this part contains nothing relevant to a complaint (signature lists, boilerplate, annex tables),
+respond with exactly: No relevant content
+
+Text:
+{text}
+
+Summary:
+"""
+
+BATCH_ANALYSIS_PROMPT = """
+You are triaging several submissions to a government public service complaint portal.
+Analyze every submission independently, exactly as you would if it were the only one.
+Respond STRICTLY as a minified JSON array with one object per submission, in the format:
+[{{"id": "<submission id>", "summary": "<summary>", "urgency": "<High|Medium|Low>", "department": "<department>", "location": "<location>", "is_relevant": <true/false>, "confidence": <0 to 1>, "category": "<short label>", "reason": "<one sentence justification>"}}]
+
+id: copied unchanged from the submission.
+
+summary: concise summary under 100 words focusing on the main issue, location (if mentioned), and key details.
+
+urgency:
+HIGH: Emergency situations, immediate safety risks, critical infrastructure failures,
+      health hazards, accidents, or situations requiring immediate attention.
+MEDIUM: Important issues that need attention within days/weeks, moderate inconvenience,
+        non-critical infrastructure problems, or issues affecting multiple people.
+LOW: Minor issues, routine maintenance requests, suggestions for improvement,
+     or non-urgent matters that can be addressed in regular workflow.
+
+department: exactly one of {departments}
+Guidelines:
+{guidelines}
+
+location: the primary street, landmark, intersection, area or address where the issue occurs,
+or "Location not specified" if none is mentioned.
+
+is_relevant: true only for civic/government complaints (public infrastructure, utilities, safety,
+sanitation, transport, governance, corruption, healthcare, education). false for resumes,
+biographies, advertisements, job inquiries, promotional content, irrelevant chatter or content
+without an actionable issue for a public department.
+
+Submissions (JSON array of {{"id", "text"}}):
+{items}
+"""
+
+RELEVANCE_PROMPT = """
+You are validating whether the following text is a civic/government complaint that should be handled by a public service portal.
+Consider the following as VALID complaints:
+- Issues with public infrastructure, utilities, safety, sanitation, transport, governance, corruption, healthcare, education.
+- Any report requiring government/municipal attention.
+
+Consider the following as INVALID submissions:
+- Personal resumes, biographies, advertisements, job inquiries, promotional content.
+- Irrelevant chatter, jokes, essays, or content not asking for civic/government action.
+- Content that lacks any actionable issue for a public department.
+
+Analyze the text and respond STRICTLY as minified JSON in the format:
+{{"is_relevant": <true/false>, "confidence": <0 to 1>, "category": "<short label>", "reason": "<one sentence justification>"}}
+
+Text:
+{text}
+"""
+
+
 class GeminiClient:
     """Client for Google Gemini API operations."""
+
+    # Shared by every instance so concurrent requests land in the same batch
+    _analysis_batcher: Optional[MicroBatcher] = None
     
     def __init__(self):
-        if not Config.GOOGLE_API_KEY:
+        self.api_key = Config.GOOGLE_API_KEY or (Config.LLM_STUB_API_KEY if Config.LLM_STUB_URL else None)
+        if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
         
-        genai.configure(api_key=Config.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
-    
-    def summarize_complaint(self, text: str) -> str:
-        """Generate a concise summary of the complaint."""
-        prompt = f"""
-        Please provide a concise summary of the following complaint or report. 
-        Focus on the main issue, location (if mentioned), and key details.
-        Keep the summary under 100 words and make it clear and actionable.
-        
-        Complaint text:
-        {text}
-        
-        Summary:
+        # The SDK cannot be pointed at a plain-HTTP endpoint, so the stub is reached over REST
+        self.model = None
+        if not Config.LLM_STUB_URL:
+            genai.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+
+        if GeminiClient._analysis_batcher is None:
+            GeminiClient._analysis_batcher = MicroBatcher("analysis", self._analyze_batch, self._analyze_single)
+
+    async def _call_model(self, prompt_type: str, prompt: str, response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """Send one prompt to Gemini; with a ``response_schema`` the reply is constrained to matching JSON."""
+        generation_config = None
+        if response_schema is not None:
+            generation_config = {"response_mime_type": "application/json", "response_schema": response_schema}
+
+        async def call_gemini() -> str:
+            with llm_metrics.track("gemini", Config.GEMINI_MODEL, DocumentProcessor.estimate_tokens(prompt)) as call:
+                if self.model is None:
+                    return await self._generate_rest(prompt, call, response_schema)
+                response = await self.model.generate_content_async(prompt, generation_config=generation_config)
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    call.set_usage(usage.prompt_token_count, usage.candidates_token_count)
+                text = response.text or ""
+                call.observe_text(text)
+                return text
+
+        async def limited_call() -> str:
+            return await rate_limiter.run(
+                "gemini", Config.GEMINI_MODEL, DocumentProcessor.estimate_tokens(prompt) + RESPONSE_TOKEN_ESTIMATE, call_gemini
+            )
+
+        # Single provider: the router contributes the circuit breaker and latency stats
+        return await provider_router.call(prompt_type, {"gemini": limited_call}, hedge=False)
+
+    async def _generate_rest(self,
+                             prompt: str,
+                             call: Optional[CallMetrics] = None,
+                             response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """generateContent over the pooled HTTP client (used when LLM_STUB_URL is set)."""
+        url = f"{Config.GEMINI_API_BASE}/v1beta/models/{Config.GEMINI_MODEL}:generateContent"
+        payload: Dict[str, Any] = {"contents": [{"parts": [{"text": prompt}]}]}
+        if response_schema is not None:
+            payload["generationConfig"] = {"responseMimeType": "application/json", "responseSchema": response_schema}
+        response = await get_http_client("gemini").post(url, params={"key": self.api_key}, json=payload)
+        response.raise_for_status()
+        result = response.json()
+        if call is not None:
+            call.observe(result)
+        candidates = result.get("candidates") or []
+        if not candidates:
+            return ""
+        return "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+
+    async def _generate(self,
+                        prompt_type: str,
+                        template: str,
+                        cacheable=None,
+                        batcher: Optional[MicroBatcher] = None,
+                        response_schema: Optional[Dict[str, Any]] = None,
+                        **variables: str) -> str:
+        """Render a prompt template and return Gemini's response text, served from the LLM cache when possible.
+
+        With a ``batcher`` cache misses are queued for a batched prompt instead of being sent individually.
         """
-        
+        async def generate() -> str:
+            if batcher is not None:
+                return await batcher.submit(variables["text"])
+            return await self._call_model(prompt_type, template.format(**variables), response_schema)
+
+        return await llm_cache.get_or_generate(
+            provider="gemini",
+            model=Config.GEMINI_MODEL,
+            prompt_type=prompt_type,
+            template=template,
+            variables=variables,
+            generate=generate,
+            cacheable=cacheable
+        )
+
+    async def _analyze_single(self, text: str) -> str:
+        return await self._call_model(
+            "analysis", ANALYSIS_PROMPT.format(text=text, **_department_variables()), _analysis_schema()
+        )
+
+    async def _analyze_batch(self, texts: List[str]) -> Dict[int, str]:
+        """Analyze several complaints with one prompt; returns each item's analysis JSON keyed by batch index."""
+        items = json.dumps([{"id": str(index), "text": text} for index, text in enumerate(texts)], ensure_ascii=False)
+        raw_text = await self._call_model(
+            "analysis_batch", BATCH_ANALYSIS_PROMPT.format(items=items, **_department_variables()), _batch_analysis_schema()
+        )
+
+        results = {}
+        for entry in self._parse_json_array(raw_text):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.pop("id"))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(texts) and index not in results:
+                results[index] = json.dumps(entry, ensure_ascii=False)
+        return results
+
+    async def summarize_complaint(self, text: str) -> str:
+        """Generate a concise summary of the complaint."""
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return (await self._generate("summary", SUMMARY_PROMPT, text=text)).strip()
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
             raise
     
-    def classify_urgency(self, text: str) -> str:
-        """Classify the urgency level of the complaint."""
-        prompt = f"""
-        Analyze the following complaint and classify its urgency level based on these criteria:
-        
-        HIGH: Emergency situations, immediate safety risks, critical infrastructure failures, 
-              health hazards, accidents, or situations requiring immediate attention.
-        
-        MEDIUM: Important issues that need attention within days/weeks, moderate inconvenience,
-                non-critical infrastructure problems, or issues affecting multiple people.
-        
-        LOW: Minor issues, routine maintenance requests, suggestions for improvement,
-             or non-urgent matters that can be addressed in regular workflow.
-        
-        Complaint text:
-        {text}
-        
-        Respond with only one word: HIGH, MEDIUM, or LOW
-        """
-        
+    async def _llm_urgency(self, text: str) -> Optional[str]:
+        """Urgency answered by the LLM, or None when the call fails."""
         try:
-            response = self.model.generate_content(prompt)
-            urgency = response.text.strip().upper()
+            urgency = (await self._generate("urgency", URGENCY_PROMPT, text=text)).strip().upper()
             
             # Map to our standard format
             if urgency in ["HIGH", "EMERGENCY", "URGENT"]:
@@ -69,31 +360,17 @@ class GeminiClient:
                 return "Low"
         except Exception as e:
             logger.error(f"Error classifying urgency: {str(e)}")
-            return "Medium"  # Default to medium if classification fails
+            llm_metrics.record_fallback("urgency")
+            return None
+
+    async def classify_urgency(self, text: str) -> str:
+        """Classify the urgency level of the complaint."""
+        return await self._llm_urgency(text) or "Medium"  # Default to medium if classification fails
     
-    def extract_location(self, text: str) -> str:
+    async def extract_location(self, text: str) -> str:
         """Extract location information from the complaint."""
-        prompt = f"""
-        Analyze the following complaint and extract the specific location mentioned.
-        Look for:
-        - Street names, road names, avenue names
-        - Landmarks, buildings, institutions
-        - Intersections, cross streets
-        - Area names, neighborhood names
-        - Specific addresses or address ranges
-        
-        If multiple locations are mentioned, focus on the primary location where the issue occurs.
-        If no specific location is found, return "Location not specified".
-        
-        Complaint text:
-        {text}
-        
-        Respond with only the extracted location in a clear, concise format (e.g., "Main Street between 5th Avenue and 7th Avenue" or "City Park near the playground").
-        """
-        
         try:
-            response = self.model.generate_content(prompt)
-            location = response.text.strip()
+            location = (await self._generate("location", LOCATION_PROMPT, text=text)).strip()
             
             # Clean up the response
             if location.lower() in ["none", "not specified", "no location", "unknown"]:
@@ -102,119 +379,285 @@ class GeminiClient:
             return location
         except Exception as e:
             logger.error(f"Error extracting location: {str(e)}")
+            llm_metrics.record_fallback("location")
             return "Location not specified"
     
-    def detect_department(self, text: str) -> str:
-        """Detect the most relevant department for the complaint."""
-        departments_str = ", ".join(Config.DEPARTMENTS)
-        
-        prompt = f"""
-        Analyze the following complaint and determine which department should handle it.
-        
-        Available departments:
-        {departments_str}
-        
-        Guidelines:
-        - Transport Department: Roads, traffic, vehicles, parking, public transport
-        - Municipality: General civic issues, permits, local governance
-        - Sanitation Department: Waste management, cleaning, garbage collection
-        - Health Department: Public health, hospitals, disease control, food safety
-        - Water Department: Water supply, drainage, sewage, plumbing
-        - Electricity Department: Power supply, electrical issues, street lights
-        - Public Works Department: Construction, infrastructure, building maintenance
-        - Environment Department: Pollution, environmental protection, green spaces
-        - Education Department: Schools, educational facilities, academic issues
-        - Police Department: Crime, law enforcement, public safety, traffic violations
-        
-        Complaint text:
-        {text}
-        
-        Respond with only the exact department name from the list above.
-        """
-        
+    async def _llm_department(self, text: str) -> Optional[str]:
+        """Department answered by the LLM, or None when the call fails or names no known department."""
         try:
-            response = self.model.generate_content(prompt)
-            department = response.text.strip()
+            department = (await self._generate("department", DEPARTMENT_PROMPT, text=text, **_department_variables())).strip()
             
             # Validate the response is in our department list
-            if department in Config.DEPARTMENTS:
-                return department
-            else:
-                # Try to find a close match
-                for dept in Config.DEPARTMENTS:
-                    if dept.lower() in department.lower() or department.lower() in dept.lower():
-                        return dept
-                
-                # Default fallback
-                return "Municipality"
+            matched = self._match_department(department)
+            if matched is None:
+                llm_metrics.record_fallback("department")
+            return matched
         except Exception as e:
             logger.error(f"Error detecting department: {str(e)}")
-            return "Municipality"  # Default department
+            llm_metrics.record_fallback("department")
+            return None
+
+    async def detect_department(self, text: str) -> str:
+        """Detect the most relevant department for the complaint."""
+        return await self._llm_department(text) or "Municipality"  # Default department
     
-    def process_complaint(self, text: str) -> Dict[str, Any]:
-        """Process a complaint to extract summary, urgency, department, and location."""
+    @staticmethod
+    def _match_department(department: Any) -> Optional[str]:
+        """Map a model answer onto one of the configured departments."""
+        if not isinstance(department, str) or not department.strip():
+            return None
+        department = department.strip()
+        if department in Config.DEPARTMENTS:
+            return department
+        for dept in Config.DEPARTMENTS:
+            if dept.lower() in department.lower() or department.lower() in dept.lower():
+                return dept
+        return None
+
+    @staticmethod
+    def _parse_json_object(raw_text: str) -> Dict[str, Any]:
+        """Extract and decode the first JSON object in a model response."""
+        raw_text = (raw_text or "").strip()
+        json_start = raw_text.find("{")
+        json_end = raw_text.rfind("}")
+        if json_start != -1 and json_end != -1:
+            raw_text = raw_text[json_start:json_end + 1]
+        parsed = json.loads(raw_text)
+        if not isinstance(parsed, dict):
+            raise ValueError("Expected a JSON object")
+        return parsed
+
+    @staticmethod
+    def _parse_json_array(raw_text: str) -> List[Any]:
+        """Extract and decode the first JSON array in a model response."""
+        raw_text = (raw_text or "").strip()
+        json_start = raw_text.find("[")
+        json_end = raw_text.rfind("]")
+        if json_start != -1 and json_end != -1:
+            raw_text = raw_text[json_start:json_end + 1]
+        parsed = json.loads(raw_text)
+        if not isinstance(parsed, list):
+            raise ValueError("Expected a JSON array")
+        return parsed
+
+    @classmethod
+    def _is_json_object(cls, raw_text: str) -> bool:
         try:
-            # Generate summary
-            summary = self.summarize_complaint(text)
-            
-            # Classify urgency
-            urgency = self.classify_urgency(text)
-            
-            # Detect department
-            department = self.detect_department(text)
-            
-            # Extract location
-            location = self.extract_location(text)
-            
-            # Get color information
-            urgency_info = Config.URGENCY_LEVELS.get(urgency, Config.URGENCY_LEVELS["Medium"])
-            
-            result = {
-                "summary": summary,
-                "urgency": urgency,
-                "color": urgency_info["color"],
-                "emoji": urgency_info["emoji"],
-                "department": department,
-                "location": location
+            cls._parse_json_object(raw_text)
+            return True
+        except ValueError:
+            return False
+
+    async def condense_long_document(self, text: str) -> str:
+        """Map-reduce a long document into a summary short enough for the classification prompts.
+
+        The text is split into token-bounded chunks that are summarized concurrently;
+        the merged chunk summaries are reduced again until they fit under
+        ``Config.LONG_DOCUMENT_SUMMARY_TARGET_CHARS``.
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(Config.LONG_DOCUMENT_CONCURRENCY)
+        original_length = len(text)
+        rounds = 0
+
+        while len(text) > Config.LONG_DOCUMENT_SUMMARY_TARGET_CHARS and rounds < 3:
+            rounds += 1
+            chunks = DocumentProcessor.chunk_text(
+                text, Config.LONG_DOCUMENT_CHUNK_TOKENS, Config.LONG_DOCUMENT_CHUNK_OVERLAP_TOKENS
+            )
+
+            async def summarize_chunk(index: int, chunk: str) -> str:
+                async with semaphore:
+                    return await self._generate(
+                        "chunk_summary", CHUNK_SUMMARY_PROMPT, part=str(index + 1), total=str(len(chunks)), text=chunk
+                    )
+
+            summaries = await asyncio.gather(
+                *(summarize_chunk(index, chunk) for index, chunk in enumerate(chunks)), return_exceptions=True
+            )
+
+            parts = []
+            for chunk, summary in zip(chunks, summaries):
+                if isinstance(summary, Exception):
+                    logger.warning(f"Chunk summary failed, keeping the chunk's opening text: {str(summary)}")
+                    parts.append(chunk[:500])
+                elif summary.strip() and "no relevant content" not in summary.lower():
+                    parts.append(summary.strip())
+
+            condensed = " ".join(parts)
+            if not condensed or len(condensed) >= len(text):
+                # Summaries are not shrinking the text; keep the head instead of looping
+                condensed = (condensed or text)[:Config.LONG_DOCUMENT_SUMMARY_TARGET_CHARS]
+            text = condensed
+
+        logger.info(
+            "Condensed long document from %d to %d chars in %d round(s), %.0f ms",
+            original_length,
+            len(text),
+            rounds,
+            (time.perf_counter() - started) * 1000
+        )
+        return text
+
+    async def process_complaint(self,
+                                text: str,
+                                include_relevance: bool = False,
+                                known: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Process a complaint to extract summary, urgency, department, and location.
+
+        With ``include_relevance`` the result also carries a ``relevance`` entry in
+        the format returned by :meth:`assess_relevance`. Fields in ``known`` were
+        already answered locally and are not asked of the LLM. ``sources`` records
+        where the urgency and department came from ("llm", "local" or "fallback"
+        when the LLM failed), so locally trained models only learn from LLM answers.
+        """
+        started = time.perf_counter()
+        known = known or {}
+        if Config.ANALYSIS_MODE == "multi":
+            result = await self._process_complaint_multi(text, include_relevance, known)
+        else:
+            result = await self._process_complaint_single(text, include_relevance, known)
+
+        logger.info(
+            "Processed complaint in %.0f ms (mode=%s): %s urgency, %s, Location: %s",
+            (time.perf_counter() - started) * 1000,
+            Config.ANALYSIS_MODE,
+            result["urgency"],
+            result["department"],
+            result["location"]
+        )
+        return result
+
+    @staticmethod
+    def _validate_relevance(analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the relevance fields of a structured analysis, or None if they are invalid."""
+        if not isinstance(analysis.get("is_relevant"), bool):
+            return None
+        try:
+            confidence = float(analysis.get("confidence"))
+        except (TypeError, ValueError):
+            return None
+        return {
+            "is_relevant": analysis["is_relevant"],
+            "confidence": max(0.0, min(1.0, confidence)),
+            "category": str(analysis.get("category") or "unknown"),
+            "reason": str(analysis.get("reason") or "No justification provided")
+        }
+
+    def _build_result(self, summary: str, urgency: str, department: str, location: str) -> Dict[str, Any]:
+        urgency_info = Config.URGENCY_LEVELS.get(urgency, Config.URGENCY_LEVELS["Medium"])
+        return {
+            "summary": summary,
+            "urgency": urgency,
+            "color": urgency_info["color"],
+            "emoji": urgency_info["emoji"],
+            "department": department,
+            "location": location
+        }
+
+    async def _process_complaint_single(self, text: str, include_relevance: bool, known: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze a complaint with one schema-constrained prompt, re-asking only for invalid fields."""
+        try:
+            analysis = self._parse_json_object(await self._generate(
+                "analysis",
+                ANALYSIS_PROMPT,
+                cacheable=self._is_json_object,
+                batcher=self._analysis_batcher if Config.LLM_BATCH_ENABLED else None,
+                response_schema=_analysis_schema(),
+                text=text,
+                **_department_variables()
+            ))
+        except Exception as e:
+            logger.error(f"Structured complaint analysis failed, falling back to per-field calls: {str(e)}")
+            llm_metrics.record_fallback("analysis")
+            analysis = {}
+
+        # Collect the per-field prompts needed to repair invalid fields and run them together
+        fallbacks = {}
+
+        summary = analysis.get("summary")
+        if not isinstance(summary, str) or not summary.strip():
+            fallbacks["summary"] = self.summarize_complaint(text)
+
+        sources = {"urgency": "local" if known.get("urgency") else "llm"}
+        urgency = known.get("urgency") or URGENCY_ALIASES.get(str(analysis.get("urgency", "")).strip().upper())
+        if urgency not in Config.URGENCY_LEVELS:
+            fallbacks["urgency"] = self._llm_urgency(text)
+
+        sources["department"] = "local" if known.get("department") else "llm"
+        department = known.get("department") or self._match_department(analysis.get("department"))
+        if not department:
+            fallbacks["department"] = self._llm_department(text)
+
+        location = known.get("location") or analysis.get("location")
+        if not isinstance(location, str) or not location.strip():
+            fallbacks["location"] = self.extract_location(text)
+        elif location.strip().lower() in ["none", "not specified", "no location", "unknown"]:
+            location = "Location not specified"
+
+        relevance = (known.get("relevance") or self._validate_relevance(analysis)) if include_relevance else None
+        if include_relevance and relevance is None:
+            fallbacks["relevance"] = self.assess_relevance(text)
+
+        if fallbacks:
+            logger.warning("Structured analysis fell back to per-field calls for: %s", ", ".join(fallbacks))
+            repaired = dict(zip(fallbacks, await asyncio.gather(*fallbacks.values())))
+            summary = repaired.get("summary", summary)
+            urgency = repaired.get("urgency", urgency)
+            if urgency is None:
+                urgency, sources["urgency"] = "Medium", "fallback"
+            department = repaired.get("department", department)
+            if department is None:
+                department, sources["department"] = "Municipality", "fallback"
+            location = repaired.get("location", location)
+            relevance = repaired.get("relevance", relevance)
+
+        result = self._build_result(summary.strip(), urgency, department, location.strip())
+        result["sources"] = sources
+        if include_relevance:
+            result["relevance"] = relevance
+
+        return result
+
+    async def _process_complaint_multi(self, text: str, include_relevance: bool, known: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a complaint with one LLM call per extracted field."""
+        try:
+            async def resolved(value):
+                return value
+
+            # Every field (and the relevance check) is an independent prompt unless answered locally
+            calls = [
+                self.summarize_complaint(text),
+                resolved(known["urgency"]) if known.get("urgency") else self._llm_urgency(text),
+                resolved(known["department"]) if known.get("department") else self._llm_department(text),
+                resolved(known["location"]) if known.get("location") else self.extract_location(text)
+            ]
+            if include_relevance:
+                calls.append(resolved(known["relevance"]) if known.get("relevance") else self.assess_relevance(text))
+
+            summary, urgency, department, location, *relevance = await asyncio.gather(*calls)
+            sources = {
+                "urgency": "local" if known.get("urgency") else "llm" if urgency else "fallback",
+                "department": "local" if known.get("department") else "llm" if department else "fallback"
             }
-            
-            logger.info(f"Processed complaint: {urgency} urgency, {department}, Location: {location}")
+            result = self._build_result(summary, urgency or "Medium", department or "Municipality", location)
+            result["sources"] = sources
+
+            if include_relevance:
+                result["relevance"] = relevance[0]
+
             return result
             
         except Exception as e:
             logger.error(f"Error processing complaint: {str(e)}")
             raise
 
-    def assess_relevance(self, text: str) -> Dict[str, Any]:
+    async def assess_relevance(self, text: str) -> Dict[str, Any]:
         """Determine if the submitted content represents a civic/government complaint."""
-        prompt = f"""
-        You are validating whether the following text is a civic/government complaint that should be handled by a public service portal.
-        Consider the following as VALID complaints:
-        - Issues with public infrastructure, utilities, safety, sanitation, transport, governance, corruption, healthcare, education.
-        - Any report requiring government/municipal attention.
-
-        Consider the following as INVALID submissions:
-        - Personal resumes, biographies, advertisements, job inquiries, promotional content.
-        - Irrelevant chatter, jokes, essays, or content not asking for civic/government action.
-        - Content that lacks any actionable issue for a public department.
-
-        Analyze the text and respond STRICTLY as minified JSON in the format:
-        {{"is_relevant": <true/false>, "confidence": <0 to 1>, "category": "<short label>", "reason": "<one sentence justification>"}}
-
-        Text:
-        {text}
-        """
-
         try:
-            response = self.model.generate_content(prompt)
-            raw_text = (response.text or "").strip()
-
-            json_start = raw_text.find("{")
-            json_end = raw_text.rfind("}")
-            if json_start != -1 and json_end != -1:
-                raw_text = raw_text[json_start:json_end + 1]
-
-            relevance = json.loads(raw_text)
+            relevance = self._parse_json_object(await self._generate(
+                "relevance", RELEVANCE_PROMPT, cacheable=self._is_json_object, text=text
+            ))
             relevance["is_relevant"] = bool(relevance.get("is_relevant", False))
             relevance["confidence"] = float(relevance.get("confidence", 0))
             relevance.setdefault("category", "unknown")
@@ -222,6 +665,7 @@ class GeminiClient:
             return relevance
         except Exception as e:
             logger.error(f"Error assessing relevance: {str(e)}")
+            llm_metrics.record_fallback("relevance")
             # Fallback heuristic: treat text as relevant but low confidence
             return {
                 "is_relevant": True,
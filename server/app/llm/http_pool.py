@@ -0,0 +1,60 @@
+from typing import Dict, Optional
+import logging
+
+import httpx
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Providers reached over REST; Gemini's SDK in GeminiClient keeps its own gRPC channel
+PROVIDERS = ("groq", "fireworks", "gemini")
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=Config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.LLM_HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(Config.LLM_HTTP_TIMEOUT, connect=Config.LLM_HTTP_CONNECT_TIMEOUT),
+        headers={"Content-Type": "application/json"}
+    )
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Return the process-wide pooled keep-alive client for a provider, creating it on first use."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _build_client(provider)
+        _clients[provider] = client
+    return client
+
+
+def open_http_clients() -> None:
+    """Create the pooled clients up front (called from the FastAPI lifespan)."""
+    for provider in PROVIDERS:
+        get_http_client(provider)
+    logger.info(
+        "Opened pooled LLM HTTP clients for %s (max_connections=%d, keepalive=%d)",
+        ", ".join(PROVIDERS),
+        Config.LLM_HTTP_MAX_CONNECTIONS,
+        Config.LLM_HTTP_MAX_KEEPALIVE
+    )
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client and release its connections."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def request_timeout(seconds: Optional[float]) -> Optional[httpx.Timeout]:
+    """Per-call timeout override keeping the pool's connect timeout."""
+    if seconds is None:
+        return None
+    return httpx.Timeout(seconds, connect=min(seconds, Config.LLM_HTTP_CONNECT_TIMEOUT))
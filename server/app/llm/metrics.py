@@ -0,0 +1,299 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000)
+OUTCOMES = ("ok", "error", "timeout", "rate_limited", "cancelled")
+
+# Prompt type of the LLM call in progress, set by ProviderRouter for everything it launches
+current_prompt_type: ContextVar[str] = ContextVar("llm_prompt_type", default="unknown")
+
+
+def classify_outcome(error: Optional[BaseException]) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)) or type(error).__name__ == "DeadlineExceeded":
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (429, 503):
+        return "rate_limited"
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return "rate_limited"
+    return "error"
+
+
+def usage_from_response(payload: Any) -> Optional[Tuple[int, int]]:
+    """(prompt tokens, completion tokens) reported in an OpenAI-compatible or Gemini response, if any."""
+    if not isinstance(payload, dict):
+        return None
+    usage = payload.get("usage") or (payload.get("x_groq") or {}).get("usage")
+    if isinstance(usage, dict) and "prompt_tokens" in usage:
+        return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+    usage = payload.get("usageMetadata")
+    if isinstance(usage, dict):
+        return int(usage.get("promptTokenCount") or 0), int(usage.get("candidatesTokenCount") or 0)
+    return None
+
+
+def response_text(payload: Any) -> str:
+    """Generated text of an OpenAI-compatible or Gemini response (or stream event)."""
+    if not isinstance(payload, dict):
+        return ""
+    text = ""
+    for choice in payload.get("choices") or []:
+        message = choice.get("message") or choice.get("delta") or {}
+        text += message.get("content") or ""
+    for candidate in (payload.get("candidates") or [])[:1]:
+        text += "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+    return text
+
+
+class CallMetrics:
+    """Token counts of one provider request; reported usage wins over the estimates."""
+
+    def __init__(self, prompt_tokens_estimate: int):
+        self.prompt_tokens = prompt_tokens_estimate
+        self.completion_tokens = 0
+        self.reported = False
+
+    def set_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.reported = True
+
+    def observe(self, payload: Any) -> None:
+        """Take the token usage from a decoded response (or stream event), else estimate it from the text."""
+        usage = usage_from_response(payload)
+        if usage is not None:
+            self.set_usage(*usage)
+        else:
+            self.observe_text(response_text(payload))
+
+    def observe_text(self, text: str) -> None:
+        """Estimate completion tokens from generated text when the provider reports no usage."""
+        if not self.reported:
+            self.completion_tokens += (len(text) + 3) // 4
+
+
+class SeriesStats:
+    """Counters and latency histogram for one provider/model/prompt type."""
+
+    def __init__(self):
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+
+    def observe(self, latency_ms: float, outcome: str, prompt_tokens: int, completion_tokens: int, cost: float) -> None:
+        self.outcomes[outcome] += 1
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.latency_sum_ms += latency_ms
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost
+
+    @property
+    def calls(self) -> int:
+        return sum(self.outcomes.values())
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile interpolated within its histogram bucket (None without samples)."""
+        total = self.calls
+        if not total:
+            return None
+        rank = percentile / 100 * total
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+                if index == len(LATENCY_BUCKETS_MS):
+                    return float(lower)
+                return lower + (LATENCY_BUCKETS_MS[index] - lower) * (rank - seen) / count
+            seen += count
+        return float(LATENCY_BUCKETS_MS[-1])
+
+
+class LLMMetrics:
+    """Process-wide instrumentation of LLM provider calls.
+
+    Every provider request is recorded under (provider, model, prompt type)
+    with its latency, outcome, prompt/completion tokens and estimated cost.
+    Canned fallbacks (every provider failed) are counted per prompt type.
+    ``summary`` is the admin JSON view and ``prometheus`` the text exposition
+    served at ``/metrics``.
+    """
+
+    def __init__(self,
+                 pricing: Dict[str, Dict[str, float]] = Config.LLM_PRICING,
+                 enabled: bool = Config.METRICS_ENABLED):
+        self.pricing = pricing
+        self.enabled = enabled
+        self._series: Dict[Tuple[str, str, str], SeriesStats] = {}
+        self._fallbacks: Dict[str, int] = {}
+        self.started_at = time.time()
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD cost from per-million-token prices (0 for models without a price)."""
+        price = self.pricing.get(model)
+        if not price:
+            return 0.0
+        return (prompt_tokens * price.get("input", 0.0) + completion_tokens * price.get("output", 0.0)) / 1_000_000
+
+    @contextmanager
+    def track(self, provider: str, model: str, prompt_tokens_estimate: int = 0,
+              prompt_type: Optional[str] = None) -> Iterator[CallMetrics]:
+        """Time one provider request and record it when the block exits (including by exception).
+
+        The prompt type defaults to the task the provider router is running.
+        """
+        call = CallMetrics(prompt_tokens_estimate)
+        prompt_type = prompt_type or current_prompt_type.get()
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield call
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.record(provider, model, prompt_type, (time.perf_counter() - started) * 1000,
+                        classify_outcome(error), call.prompt_tokens, call.completion_tokens)
+
+    def record(self, provider: str, model: str, prompt_type: str, latency_ms: float, outcome: str,
+               prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        if not self.enabled:
+            return
+        series = self._series.get((provider, model, prompt_type))
+        if series is None:
+            series = self._series[(provider, model, prompt_type)] = SeriesStats()
+        series.observe(latency_ms, outcome, prompt_tokens, completion_tokens, self.cost(model, prompt_tokens, completion_tokens))
+
+    def record_fallback(self, prompt_type: str) -> None:
+        """A caller served its canned/heuristic fallback because no provider answered."""
+        if not self.enabled:
+            return
+        self._fallbacks[prompt_type] = self._fallbacks.get(prompt_type, 0) + 1
+
+    @staticmethod
+    def _cache_outcomes() -> Dict[str, Dict[str, Any]]:
+        """LLM cache lookups per prompt type (memory/persistent hits, coalesced, misses and hit rate)."""
+        from app.llm.cache import llm_cache
+        return llm_cache.get_stats()["prompt_types"]
+
+    def summary(self) -> Dict[str, Any]:
+        calls: List[Dict[str, Any]] = []
+        providers: Dict[str, Dict[str, Any]] = {}
+        prompt_types: Dict[str, Dict[str, Any]] = {}
+        for (provider, model, prompt_type), series in sorted(self._series.items()):
+            p50, p95, p99 = (series.percentile(p) for p in (50, 95, 99))
+            calls.append({
+                "provider": provider,
+                "model": model,
+                "prompt_type": prompt_type,
+                "calls": series.calls,
+                **series.outcomes,
+                "latency_avg_ms": round(series.latency_sum_ms / series.calls, 1) if series.calls else None,
+                "latency_p50_ms": round(p50, 1) if p50 is not None else None,
+                "latency_p95_ms": round(p95, 1) if p95 is not None else None,
+                "latency_p99_ms": round(p99, 1) if p99 is not None else None,
+                "prompt_tokens": series.prompt_tokens,
+                "completion_tokens": series.completion_tokens,
+                "cost_usd": round(series.cost_usd, 6)
+            })
+            for key, totals in ((provider, providers), (prompt_type, prompt_types)):
+                entry = totals.setdefault(key, {"calls": 0, "errors": 0, "timeouts": 0, "prompt_tokens": 0,
+                                                "completion_tokens": 0, "cost_usd": 0.0})
+                entry["calls"] += series.calls
+                entry["errors"] += series.outcomes["error"] + series.outcomes["rate_limited"]
+                entry["timeouts"] += series.outcomes["timeout"]
+                entry["prompt_tokens"] += series.prompt_tokens
+                entry["completion_tokens"] += series.completion_tokens
+                entry["cost_usd"] += series.cost_usd
+
+        cache = self._cache_outcomes()
+        for prompt_type in set(self._fallbacks) | set(cache):
+            prompt_types.setdefault(prompt_type, {"calls": 0, "errors": 0, "timeouts": 0, "prompt_tokens": 0,
+                                                  "completion_tokens": 0, "cost_usd": 0.0})
+        for prompt_type, entry in prompt_types.items():
+            entry["fallbacks"] = self._fallbacks.get(prompt_type, 0)
+            entry["cache"] = cache.get(prompt_type)
+        for totals in (providers, prompt_types):
+            for entry in totals.values():
+                entry["cost_usd"] = round(entry["cost_usd"], 6)
+                entry["error_rate"] = round((entry["errors"] + entry["timeouts"]) / entry["calls"], 4) if entry["calls"] else 0.0
+
+        return {
+            "since": self.started_at,
+            "total_cost_usd": round(sum(series.cost_usd for series in self._series.values()), 6),
+            "providers": providers,
+            "prompt_types": prompt_types,
+            "calls": calls
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of the counters and latency histograms."""
+        def labels(**values: str) -> str:
+            return "{" + ",".join(f'{name}={json.dumps(str(value))}' for name, value in values.items()) + "}"
+
+        lines = [
+            "# HELP llm_requests_total LLM provider requests by outcome.",
+            "# TYPE llm_requests_total counter"
+        ]
+        for (provider, model, prompt_type), series in sorted(self._series.items()):
+            for outcome, count in series.outcomes.items():
+                lines.append(f"llm_requests_total{labels(provider=provider, model=model, prompt_type=prompt_type, outcome=outcome)} {count}")
+
+        lines += ["# HELP llm_request_duration_seconds LLM provider request latency.",
+                  "# TYPE llm_request_duration_seconds histogram"]
+        for (provider, model, prompt_type), series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS_MS) + ["+Inf"], series.buckets):
+                cumulative += count
+                le = bound if bound == "+Inf" else bound / 1000
+                lines.append(f"llm_request_duration_seconds_bucket{labels(provider=provider, model=model, prompt_type=prompt_type, le=le)} {cumulative}")
+            base = labels(provider=provider, model=model, prompt_type=prompt_type)
+            lines.append(f"llm_request_duration_seconds_sum{base} {series.latency_sum_ms / 1000:.6f}")
+            lines.append(f"llm_request_duration_seconds_count{base} {series.calls}")
+
+        lines += ["# HELP llm_tokens_total Prompt and completion tokens (reported by the provider or estimated).",
+                  "# TYPE llm_tokens_total counter"]
+        for (provider, model, prompt_type), series in sorted(self._series.items()):
+            for kind, count in (("prompt", series.prompt_tokens), ("completion", series.completion_tokens)):
+                lines.append(f"llm_tokens_total{labels(provider=provider, model=model, prompt_type=prompt_type, kind=kind)} {count}")
+
+        lines += ["# HELP llm_cost_usd_total Estimated LLM spend in US dollars.", "# TYPE llm_cost_usd_total counter"]
+        for (provider, model, prompt_type), series in sorted(self._series.items()):
+            lines.append(f"llm_cost_usd_total{labels(provider=provider, model=model, prompt_type=prompt_type)} {series.cost_usd:.6f}")
+
+        lines += ["# HELP llm_fallbacks_total Canned fallbacks served because no provider answered.",
+                  "# TYPE llm_fallbacks_total counter"]
+        for prompt_type, count in sorted(self._fallbacks.items()):
+            lines.append(f"llm_fallbacks_total{labels(prompt_type=prompt_type)} {count}")
+
+        lines += ["# HELP llm_cache_requests_total LLM response cache lookups by outcome.",
+                  "# TYPE llm_cache_requests_total counter"]
+        for prompt_type, counters in sorted(self._cache_outcomes().items()):
+            for outcome, count in counters.items():
+                if outcome == "hit_rate":
+                    continue
+                lines.append(f"llm_cache_requests_total{labels(prompt_type=prompt_type, outcome=outcome)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics shared by AIService, GeminiClient and ProviderRouter
+llm_metrics = LLMMetrics()
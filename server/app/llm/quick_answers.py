@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import re
+import time
+
+from app.llm.cache import normalize_text, template_version
+from app.llm.semantic_cache import is_shareable_question
+
+logger = logging.getLogger(__name__)
+
+# Chips offered by GET /chat/quick-responses
+QUICK_RESPONSES = [
+    "What's the status of my complaint?",
+    "How long does it take to resolve complaints?",
+    "How do I submit a new complaint?",
+    "Which department handles my type of issue?",
+    "Can I update my complaint details?",
+    "How do I contact support?",
+    "What documents should I attach?",
+    "How is priority determined?"
+]
+
+
+def quick_key(message: str) -> str:
+    """Match key for a chip: case, whitespace and punctuation variants of the same prompt compare equal."""
+    return " ".join(re.sub(r"[^\w']+", " ", normalize_text(message).lower()).split())
+
+
+class QuickAnswerStore:
+    """Precomputed answers to the quick-response chips, served from memory.
+
+    Each answer is generated once with the chat prompt (without user context)
+    and stored in the ``quick_answers`` collection with a version hash of the
+    chip text and the chat prompt templates. At startup the stored answers are
+    loaded and any whose version no longer matches are regenerated in the
+    background; the previous answer keeps being served until its replacement
+    is ready. Chips about the user's own complaints are not precomputed.
+    """
+
+    def __init__(self, prompts: List[str] = QUICK_RESPONSES, collection_name: str = "quick_answers"):
+        self.prompts = prompts
+        self.collection_name = collection_name
+        self._answers: Dict[str, Dict[str, Any]] = {}
+        self._ai_service = None
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"served": 0, "generated": 0, "generation_failures": 0}
+
+    def _get_ai_service(self):
+        if self._ai_service is None:
+            from app.registry import services
+            self._ai_service = services.ai_service
+        return self._ai_service
+
+    def _get_collection(self):
+        if self._collection is None:
+            from app.db import get_database
+            self._collection = get_database()[self.collection_name]
+        return self._collection
+
+    @property
+    def precomputed_prompts(self) -> List[str]:
+        return [prompt for prompt in self.prompts if is_shareable_question(prompt)]
+
+    def version(self, prompt: str) -> str:
+        """Changes whenever the chip text or either chat prompt template changes."""
+        ai_service = self._get_ai_service()
+        return template_version(
+            prompt + ai_service._gemini_chat_prompt("{question}") + ai_service._groq_chat_prompt("{question}")
+        )
+
+    def answer(self, message: str) -> Optional[str]:
+        """The precomputed answer when ``message`` is one of the chips, else None."""
+        entry = self._answers.get(quick_key(message))
+        if entry is None:
+            return None
+        self._stats["served"] += 1
+        return entry["answer"]
+
+    def _load(self) -> None:
+        for document in self._get_collection().find({"_id": {"$in": [quick_key(p) for p in self.precomputed_prompts]}}):
+            self._answers[document["_id"]] = document
+
+    def _save(self, entry: Dict[str, Any]) -> None:
+        self._get_collection().replace_one({"_id": entry["_id"]}, entry, upsert=True)
+
+    async def _generate(self, prompt: str, version: str) -> bool:
+        ai_service = self._get_ai_service()
+        started = time.perf_counter()
+        answer = await ai_service.generate_chat_response(prompt, None)
+        # The canned fallback means every provider failed; keep the previous answer instead
+        if not answer or answer == ai_service._generate_fallback_chat_response(prompt):
+            self._stats["generation_failures"] += 1
+            logger.warning(f"Could not precompute the quick answer for {prompt!r}")
+            return False
+        entry = {
+            "_id": quick_key(prompt),
+            "prompt": prompt,
+            "answer": answer,
+            "version": version,
+            "generated_at": datetime.utcnow(),
+            "generation_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        self._answers[entry["_id"]] = entry
+        self._stats["generated"] += 1
+        try:
+            await asyncio.to_thread(self._save, entry)
+        except Exception as e:
+            logger.warning(f"Could not store the quick answer for {prompt!r}: {str(e)}")
+        return True
+
+    async def refresh(self, force: bool = False) -> int:
+        """Regenerate missing and outdated answers (all of them with ``force``); returns how many were regenerated."""
+        if not self._answers:
+            try:
+                await asyncio.to_thread(self._load)
+            except Exception as e:
+                logger.warning(f"Could not load stored quick answers: {str(e)}")
+
+        stale = []
+        for prompt in self.precomputed_prompts:
+            version = self.version(prompt)
+            entry = self._answers.get(quick_key(prompt))
+            if force or entry is None or entry["version"] != version:
+                stale.append(self._generate(prompt, version))
+        if not stale:
+            return 0
+        regenerated = sum(await asyncio.gather(*stale))
+        logger.info(f"Precomputed {regenerated}/{len(stale)} quick answers")
+        return regenerated
+
+    def start(self, force: bool = False) -> bool:
+        """Refresh in a background task (called from the lifespan and the admin endpoint); False if one is running."""
+        if self._task is not None and not self._task.done():
+            return False
+        self._task = asyncio.create_task(self.refresh(force))
+        return True
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        answers = []
+        for prompt in self.prompts:
+            entry = self._answers.get(quick_key(prompt))
+            answers.append({
+                "prompt": prompt,
+                "precomputed": entry is not None,
+                "version": entry["version"] if entry else None,
+                "current": entry is not None and entry["version"] == self.version(prompt),
+                "generated_at": entry["generated_at"] if entry else None
+            })
+        return {
+            **self._stats,
+            "refreshing": self._task is not None and not self._task.done(),
+            "answers": answers
+        }
+
+
+# Process-wide store, refreshed at startup and on admin request
+quick_answers = QuickAnswerStore()
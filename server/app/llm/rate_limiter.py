@@ -0,0 +1,274 @@
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = (429, 503)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot get a provider slot before its deadline (or the wait queue is full)."""
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` units, refilled continuously at ``rate`` units per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available (0 when they are available now)."""
+        self._refill(now)
+        # A request larger than the bucket would never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class ProviderLimiter:
+    """Request and token budgets for one provider/model with a bounded FIFO wait queue.
+
+    Waiters are served in arrival order (``asyncio.Lock`` is fair), so a large
+    request cannot be starved by a stream of small ones. A 429/503 from the
+    provider puts the limiter into cooldown until its ``Retry-After`` passes.
+    """
+
+    def __init__(self,
+                 name: str,
+                 requests_per_minute: float,
+                 tokens_per_minute: float,
+                 max_queue: int = Config.LLM_RATE_LIMIT_MAX_QUEUE,
+                 max_samples: int = 200):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue = max_queue
+        # Burst capacity of one minute's budget, refilled continuously
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute > 0 else None
+        self.cooldown_until = 0.0
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+        self._wait_samples: Deque[float] = deque(maxlen=max_samples)
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "tokens_reserved": 0,
+            "rejected_queue_full": 0,
+            "rejected_deadline": 0,
+            "throttled": 0,
+            "retries": 0,
+            "max_queue_depth": 0
+        }
+
+    def _wait_time(self, amount: float, now: float) -> float:
+        waits = [max(0.0, self.cooldown_until - now)]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(amount, now))
+        return max(waits)
+
+    async def acquire(self, amount: float, deadline: float) -> float:
+        """Wait for a request slot and ``amount`` tokens; returns the time spent waiting.
+
+        ``deadline`` is a ``time.monotonic()`` timestamp. Raises
+        :class:`RateLimitExceeded` when the queue is full or the slot would only
+        free up after the deadline.
+        """
+        if self.waiting >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise RateLimitExceeded(f"{self.name} wait queue is full ({self.max_queue} waiting)")
+
+        started = time.monotonic()
+        self.waiting += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self.waiting)
+        try:
+            try:
+                await asyncio.wait_for(self._lock.acquire(), max(0.0, deadline - started))
+            except asyncio.TimeoutError:
+                self._stats["rejected_deadline"] += 1
+                raise RateLimitExceeded(f"{self.name} queue did not drain before the request deadline")
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(amount, now)
+                    if wait <= 0:
+                        break
+                    if now + wait > deadline:
+                        self._stats["rejected_deadline"] += 1
+                        raise RateLimitExceeded(f"{self.name} has no capacity for {wait:.1f}s, past the request deadline")
+                    await asyncio.sleep(wait)
+                if self.requests is not None:
+                    self.requests.consume(1)
+                if self.tokens is not None:
+                    self.tokens.consume(amount)
+            finally:
+                self._lock.release()
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self._wait_samples.append(waited)
+        self._stats["admitted"] += 1
+        self._stats["tokens_reserved"] += int(amount)
+        if waited > 0.001:
+            self._stats["queued"] += 1
+        return waited
+
+    def penalize(self, delay: float) -> None:
+        """The provider rejected a request: hold every caller back for ``delay`` seconds."""
+        self._stats["throttled"] += 1
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+        if self.requests is not None:
+            self.requests.drain()
+
+    def record_retry(self) -> None:
+        self._stats["retries"] += 1
+
+    def _wait_percentile(self, percentile: float) -> Optional[float]:
+        if not self._wait_samples:
+            return None
+        ordered = sorted(self._wait_samples)
+        return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self._wait_percentile(50)
+        p95 = self._wait_percentile(95)
+        return {
+            **self._stats,
+            "queue_depth": self.waiting,
+            "wait_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "wait_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "cooldown_remaining_s": round(max(0.0, self.cooldown_until - time.monotonic()), 2),
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "available_requests": round(self.requests.tokens, 1) if self.requests is not None else None,
+            "available_tokens": round(self.tokens.tokens) if self.tokens is not None else None
+        }
+
+
+def retry_after_seconds(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """(rate limited?, Retry-After seconds) for an HTTP or Gemini SDK error."""
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code not in RETRYABLE_STATUSES:
+            return False, None
+        value = error.response.headers.get("retry-after")
+        if not value:
+            return True, None
+        try:
+            return True, max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return True, max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return True, None
+    # google.api_core.exceptions raised by the Gemini SDK
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"), None
+
+
+class RateLimiter:
+    """Process-wide registry of per-provider/model limiters plus the retry loop around provider calls."""
+
+    def __init__(self,
+                 limits: Dict[str, Dict[str, float]] = Config.LLM_RATE_LIMITS,
+                 max_wait: float = Config.LLM_RATE_LIMIT_MAX_WAIT,
+                 max_retries: int = Config.LLM_RATE_LIMIT_MAX_RETRIES,
+                 backoff_base: float = Config.LLM_RATE_LIMIT_BACKOFF_BASE,
+                 backoff_max: float = Config.LLM_RATE_LIMIT_BACKOFF_MAX):
+        self.limits = limits
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        name = f"{provider}/{model}"
+        if name not in self._limiters:
+            limits = self.limits.get(provider, {})
+            self._limiters[name] = ProviderLimiter(name, limits.get("rpm", 0), limits.get("tpm", 0))
+        return self._limiters[name]
+
+    async def run(self,
+                  provider: str,
+                  model: str,
+                  tokens: float,
+                  call: Callable[[], Awaitable[T]],
+                  max_wait: Optional[float] = None) -> T:
+        """Run ``call`` once the provider's budget allows, retrying 429/503 responses with backoff.
+
+        ``tokens`` is the request's estimated prompt plus completion tokens. The
+        wait for a slot, including backoff between retries, is bounded by
+        ``max_wait`` seconds; past that :class:`RateLimitExceeded` (or the
+        provider's last error) is raised so the caller can fail over.
+        """
+        limiter = self.limiter(provider, model)
+        deadline = time.monotonic() + (max_wait if max_wait is not None else self.max_wait)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens, deadline)
+            try:
+                return await call()
+            except Exception as e:
+                limited, retry_after = retry_after_seconds(e)
+                if not limited:
+                    raise
+                delay = retry_after if retry_after is not None else min(
+                    self.backoff_max, self.backoff_base * 2 ** attempt * random.uniform(0.8, 1.2)
+                )
+                limiter.penalize(delay)
+                attempt += 1
+                if attempt > self.max_retries or time.monotonic() + delay > deadline:
+                    logger.warning(f"{limiter.name} rate limited, giving up after {attempt} attempts: {str(e)}")
+                    raise
+                limiter.record_retry()
+                logger.info(f"{limiter.name} rate limited, retrying in {delay:.1f}s (attempt {attempt})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limiters": {name: limiter.get_stats() for name, limiter in self._limiters.items()},
+            "settings": {
+                "limits": self.limits,
+                "max_wait": self.max_wait,
+                "max_retries": self.max_retries,
+                "backoff_base": self.backoff_base,
+                "backoff_max": self.backoff_max
+            }
+        }
+
+
+def estimate_tokens(payload: Any, max_output_tokens: int = 0) -> int:
+    """Rough request size for the token budget: about four characters per token plus the completion cap."""
+    return len(str(payload)) // 4 + max_output_tokens
+
+
+# Process-wide limiter shared by AIService and GeminiClient
+rate_limiter = RateLimiter()
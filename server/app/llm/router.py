@@ -0,0 +1,331 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+import asyncio
+import logging
+import time
+
+from app.llm.metrics import current_prompt_type
+from app.llm.rate_limiter import RateLimitExceeded
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class NoProviderAvailable(Exception):
+    """Raised when every candidate provider is unavailable or failed."""
+
+
+class ProviderHealth:
+    """Latency/error statistics and circuit breaker state for one provider."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, max_samples: int):
+        self.name = name
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.successes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            "state": self.state,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+class ProviderRouter:
+    """Latency-aware routing across LLM providers.
+
+    Tracks EWMA latency and error rate per provider, opens a circuit breaker on
+    providers that keep failing, and hedges: when the chosen provider has not
+    answered within its own latency percentile, the next candidate is started
+    in parallel and the first successful answer wins.
+    """
+
+    def __init__(self,
+                 ewma_alpha: float = Config.LLM_ROUTER_EWMA_ALPHA,
+                 failure_threshold: int = Config.LLM_BREAKER_FAILURE_THRESHOLD,
+                 open_seconds: float = Config.LLM_BREAKER_OPEN_SECONDS,
+                 hedge_percentile: float = Config.LLM_HEDGE_PERCENTILE,
+                 hedge_default_delay: float = Config.LLM_HEDGE_DEFAULT_DELAY,
+                 hedge_min_delay: float = Config.LLM_HEDGE_MIN_DELAY,
+                 slow_factor: float = Config.LLM_ROUTER_SLOW_FACTOR,
+                 max_samples: int = 200):
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.slow_factor = slow_factor
+        self.max_samples = max_samples
+        self._health: Dict[str, ProviderHealth] = {}
+        self._decisions: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+    def health(self, provider: str) -> ProviderHealth:
+        if provider not in self._health:
+            self._health[provider] = ProviderHealth(provider, self.max_samples)
+        return self._health[provider]
+
+    def _allow(self, provider: str) -> bool:
+        health = self.health(provider)
+        if health.state == ProviderHealth.OPEN:
+            if time.monotonic() - health.opened_at < self.open_seconds:
+                return False
+            health.state = ProviderHealth.HALF_OPEN
+            health.probe_in_flight = False
+        if health.state == ProviderHealth.HALF_OPEN:
+            # Only a single probe request goes through while half-open
+            if health.probe_in_flight:
+                return False
+            health.probe_in_flight = True
+        return True
+
+    def _record_success(self, provider: str, latency: float) -> None:
+        health = self.health(provider)
+        health.samples.append(latency)
+        health.latency_ewma = latency if health.latency_ewma is None else (
+            self.ewma_alpha * latency + (1 - self.ewma_alpha) * health.latency_ewma
+        )
+        health.error_rate = (1 - self.ewma_alpha) * health.error_rate
+        health.consecutive_failures = 0
+        health.successes += 1
+        if health.state != ProviderHealth.CLOSED:
+            logger.info(f"Circuit breaker for {provider} closed")
+        health.state = ProviderHealth.CLOSED
+        health.probe_in_flight = False
+
+    def _record_failure(self, provider: str, error: BaseException) -> None:
+        health = self.health(provider)
+        health.error_rate = self.ewma_alpha + (1 - self.ewma_alpha) * health.error_rate
+        health.consecutive_failures += 1
+        health.failures += 1
+        health.last_error = f"{type(error).__name__}: {error}"
+        health.probe_in_flight = False
+        if health.state == ProviderHealth.HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+            if health.state != ProviderHealth.OPEN:
+                logger.warning(f"Circuit breaker for {provider} opened after {health.consecutive_failures} failures")
+            health.state = ProviderHealth.OPEN
+            health.opened_at = time.monotonic()
+
+    def _rank(self, providers: List[str]) -> List[str]:
+        """Keep the preferred order unless a provider is degraded or much slower than an alternative."""
+        healthy = [p for p in providers if self.health(p).error_rate < 0.5]
+        degraded = [p for p in providers if p not in healthy]
+        if len(healthy) > 1:
+            primary = self.health(healthy[0])
+            fastest = min(healthy, key=lambda p: self.health(p).latency_ewma or float("inf"))
+            fastest_latency = self.health(fastest).latency_ewma
+            if (fastest != healthy[0] and primary.latency_ewma and fastest_latency
+                    and fastest_latency * self.slow_factor < primary.latency_ewma):
+                healthy.remove(fastest)
+                healthy.insert(0, fastest)
+        return healthy + degraded
+
+    def _hedge_delay(self, provider: str) -> float:
+        health = self.health(provider)
+        if len(health.samples) < 10:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, health.latency_percentile(self.hedge_percentile))
+
+    async def _attempt(self, task: str, provider: str, call: Callable[[], Awaitable[T]], timeout: Optional[float]) -> T:
+        # Each attempt runs in its own asyncio task, so the prompt type stays local to it
+        current_prompt_type.set(task)
+        started = time.monotonic()
+        try:
+            result = await (asyncio.wait_for(call(), timeout) if timeout else call())
+        except (asyncio.CancelledError, RateLimitExceeded):
+            # Lost a hedge race or never got a rate-limit slot: neither a success nor a provider failure
+            self.health(provider).probe_in_flight = False
+            raise
+        except Exception as e:
+            self._record_failure(provider, e)
+            raise
+        self._record_success(provider, time.monotonic() - started)
+        return result
+
+    async def call(self,
+                   task: str,
+                   calls: Dict[str, Callable[[], Awaitable[T]]],
+                   hedge: bool = True,
+                   timeout: Optional[float] = None) -> T:
+        """Run ``task`` on the best available provider, hedging to the next one when it is slow.
+
+        ``calls`` maps provider names, in order of preference, to zero-argument
+        coroutine factories. Raises :class:`NoProviderAvailable` when every
+        provider is short-circuited or failed.
+        """
+        started = time.monotonic()
+        ranked = self._rank(list(calls))
+        queue = list(ranked)
+        skipped: List[str] = []
+
+        pending: Dict[asyncio.Task, str] = {}
+        errors: Dict[str, str] = {}
+        launched: List[str] = []
+
+        def launch_next() -> bool:
+            while queue:
+                provider = queue.pop(0)
+                if self._allow(provider):
+                    launched.append(provider)
+                    task_ = asyncio.ensure_future(self._attempt(task, provider, calls[provider], timeout))
+                    pending[task_] = provider
+                    return True
+                skipped.append(provider)
+            return False
+
+        launch_next()
+        try:
+            while pending:
+                wait_timeout = None
+                if hedge and queue and len(pending) == 1:
+                    wait_timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(list(pending), timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The running attempt exceeded its latency percentile: hedge to the next provider
+                    launch_next()
+                    continue
+
+                for finished in done:
+                    provider = pending.pop(finished)
+                    if finished.exception() is None:
+                        self._log_decision(task, ranked, skipped, launched, provider, errors, started)
+                        return finished.result()
+                    errors[provider] = str(finished.exception())
+
+                if not pending:
+                    launch_next()
+        finally:
+            for leftover in pending:
+                leftover.cancel()
+
+        self._log_decision(task, ranked, skipped, launched, None, errors, started)
+        details = [f"{p}: {e}" for p, e in errors.items()] + [f"{p}: circuit open" for p in skipped]
+        raise NoProviderAvailable(f"No provider available for {task}: " + "; ".join(details))
+
+    async def stream(self,
+                     task: str,
+                     streams: Dict[str, Callable[[], AsyncIterator[str]]],
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Stream ``task`` from the best available provider, failing over until the first chunk arrives.
+
+        Once a chunk has been yielded the caller has already forwarded it, so a
+        later error ends the stream instead of restarting on another provider.
+        ``timeout`` bounds the wait for the first chunk.
+        """
+        started = time.monotonic()
+        ranked = self._rank(list(streams))
+        skipped: List[str] = []
+        launched: List[str] = []
+        errors: Dict[str, str] = {}
+
+        for provider in ranked:
+            if not self._allow(provider):
+                skipped.append(provider)
+                continue
+            launched.append(provider)
+            attempt_started = time.monotonic()
+            iterator = streams[provider]()
+            try:
+                try:
+                    first = await (asyncio.wait_for(iterator.__anext__(), timeout) if timeout else iterator.__anext__())
+                except StopAsyncIteration:
+                    raise ValueError("Empty response stream")
+            except asyncio.CancelledError:
+                self.health(provider).probe_in_flight = False
+                await iterator.aclose()
+                raise
+            except RateLimitExceeded as e:
+                self.health(provider).probe_in_flight = False
+                errors[provider] = str(e)
+                await iterator.aclose()
+                continue
+            except Exception as e:
+                self._record_failure(provider, e)
+                errors[provider] = str(e)
+                await iterator.aclose()
+                continue
+
+            try:
+                yield first
+                async for chunk in iterator:
+                    yield chunk
+            except Exception as e:
+                self._record_failure(provider, e)
+                errors[provider] = str(e)
+                logger.warning(f"{provider} stream for {task} broke after the first chunk: {str(e)}")
+                self._log_decision(task, ranked, skipped, launched, None, errors, started)
+                return
+            finally:
+                # Also reached when the consumer disconnects mid-stream
+                self.health(provider).probe_in_flight = False
+                await iterator.aclose()
+
+            self._record_success(provider, time.monotonic() - attempt_started)
+            self._log_decision(task, ranked, skipped, launched, provider, errors, started)
+            return
+
+        self._log_decision(task, ranked, skipped, launched, None, errors, started)
+        details = [f"{p}: {e}" for p, e in errors.items()] + [f"{p}: circuit open" for p in skipped]
+        raise NoProviderAvailable(f"No provider available for {task}: " + "; ".join(details))
+
+    def _log_decision(self, task: str, ranked: List[str], skipped: List[str], launched: List[str],
+                      winner: Optional[str], errors: Dict[str, str], started: float) -> None:
+        self._decisions.appendleft({
+            "task": task,
+            "order": ranked,
+            "skipped": skipped,
+            "launched": launched,
+            "hedged": len(launched) > 1,
+            "winner": winner,
+            "errors": errors,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Breaker state, latency/error statistics and the most recent routing decisions."""
+        return {
+            "providers": {name: health.snapshot() for name, health in self._health.items()},
+            "settings": {
+                "failure_threshold": self.failure_threshold,
+                "open_seconds": self.open_seconds,
+                "hedge_percentile": self.hedge_percentile,
+                "hedge_default_delay": self.hedge_default_delay
+            },
+            "recent_decisions": list(self._decisions)
+        }
+
+
+# Process-wide router shared by AIService and GeminiClient
+provider_router = ProviderRouter()
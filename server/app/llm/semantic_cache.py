@@ -0,0 +1,201 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Questions about the asker's own complaints depend on their records and are never shared
+PERSONAL_PATTERN = re.compile(
+    r"\b(status|track(ing)?|progress|where is|what happened to|any updates?|complaint (id|number)|cmp[0-9a-f]{6})\b",
+    re.IGNORECASE
+)
+QUESTION_WORDS = {"how", "what", "which", "who", "whom", "when", "where", "why", "can", "could", "do", "does",
+                  "is", "are", "should", "will", "would", "may", "tell", "explain"}
+
+# Template slots filled in per user when a cached answer is served
+SLOTS = ("user_name", "first_name")
+
+
+def is_shareable_question(question: str, max_words: int = Config.CHAT_SEMANTIC_CACHE_MAX_WORDS) -> bool:
+    """Whether the answer to ``question`` is the same for every citizen.
+
+    Only short general questions qualify; problem descriptions and questions
+    about the asker's own complaints are answered from their context every time.
+    """
+    words = question.split()
+    if not words or len(words) > max_words or PERSONAL_PATTERN.search(question):
+        return False
+    return question.rstrip().endswith("?") or words[0].lower().strip(",.!") in QUESTION_WORDS
+
+
+def _slot_values(user_name: Optional[str]) -> Dict[str, str]:
+    name = (user_name or "").strip()
+    return {"user_name": name, "first_name": name.split()[0] if name else ""}
+
+
+def to_template(answer: str, user_name: Optional[str]) -> str:
+    """Replace the asker's name in a generated answer with template slots."""
+    values = _slot_values(user_name)
+    # Longest value first so the full name is not split into a first-name slot
+    for slot, value in sorted(values.items(), key=lambda item: -len(item[1])):
+        if len(value) >= 2:
+            answer = re.sub(rf"\b{re.escape(value)}\b", "{" + slot + "}", answer)
+    return answer
+
+
+def render(template: str, user_name: Optional[str]) -> str:
+    """Fill the template slots for the current user ("there" / nothing when the name is unknown)."""
+    values = _slot_values(user_name)
+    if not values["user_name"]:
+        template = template.replace("{user_name}", "there")
+        return re.sub(r"\{first_name\}[,!]?\s*", "", template)
+    for slot in SLOTS:
+        template = template.replace("{" + slot + "}", values[slot])
+    return template
+
+
+class SemanticChatCache:
+    """Answers to general chat questions, looked up by embedding similarity.
+
+    Questions are embedded with the sentence-transformer model and compared by
+    cosine similarity against every cached question (one matrix-vector product);
+    the closest one at or above ``threshold`` is a hit. Entries expire after
+    ``ttl_seconds`` and the least recently used one is evicted beyond
+    ``max_entries``. Answers are stored with the asker's name replaced by
+    template slots, so a hit is personalized without another LLM call.
+    """
+
+    def __init__(self,
+                 threshold: float = Config.CHAT_SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: float = Config.CHAT_SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = Config.CHAT_SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "evicted": 0, "expired": 0, "invalidated": 0}
+        self._latency_saved_ms = 0.0
+        self._lookup_ms = 0.0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._entries if entry is not None)
+
+    def record_bypass(self) -> None:
+        self._stats["bypassed"] += 1
+
+    def lookup(self, embedding: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Cached answer template and similarity of the nearest live question, or None on a miss."""
+        started = time.perf_counter()
+        with self._lock:
+            hit = self._lookup(embedding, time.monotonic())
+            if hit is None:
+                self._stats["misses"] += 1
+            else:
+                entry, similarity = hit
+                entry["hits"] += 1
+                self._stats["hits"] += 1
+                self._latency_saved_ms += entry["generation_ms"]
+            self._lookup_ms += (time.perf_counter() - started) * 1000
+        return (hit[0]["answer"], hit[1]) if hit else None
+
+    def _lookup(self, embedding: np.ndarray, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        if self._embeddings is None:
+            return None
+        similarities = self._embeddings @ embedding
+        for slot in np.argsort(-similarities):
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                return None
+            entry = self._entries[slot]
+            if entry is None:
+                continue
+            if entry["expires_at"] <= now:
+                self._drop(slot)
+                self._stats["expired"] += 1
+                continue
+            entry["last_used"] = now
+            return entry, similarity
+        return None
+
+    def store(self, question: str, embedding: np.ndarray, answer: str, generation_ms: float) -> str:
+        """Cache ``answer`` (a template) for ``question``; returns the entry id."""
+        now = time.monotonic()
+        entry = {
+            "id": uuid.uuid4().hex[:12],
+            "question": question,
+            "answer": answer,
+            "generation_ms": generation_ms,
+            "hits": 0,
+            "created_at": time.time(),
+            "expires_at": now + self.ttl_seconds,
+            "last_used": now
+        }
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+            slot = self._free_slot(now)
+            self._entries[slot] = entry
+            self._embeddings[slot] = embedding
+            self._stats["stored"] += 1
+        return entry["id"]
+
+    def _free_slot(self, now: float) -> int:
+        oldest = None
+        for slot, entry in enumerate(self._entries):
+            if entry is None:
+                return slot
+            if entry["expires_at"] <= now:
+                self._stats["expired"] += 1
+                return slot
+            if oldest is None or entry["last_used"] < self._entries[oldest]["last_used"]:
+                oldest = slot
+        self._stats["evicted"] += 1
+        return oldest
+
+    def _drop(self, slot: int) -> None:
+        self._entries[slot] = None
+        # A zero vector never reaches the similarity threshold
+        self._embeddings[slot] = 0.0
+
+    def invalidate(self, entry_id: Optional[str] = None) -> int:
+        """Drop one entry by id, or every entry when ``entry_id`` is None; returns how many were removed."""
+        removed = 0
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and (entry_id is None or entry["id"] == entry_id):
+                    self._drop(slot)
+                    removed += 1
+            self._stats["invalidated"] += removed
+        return removed
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        live = sorted((entry for entry in self._entries if entry is not None), key=lambda entry: -entry["hits"])
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self._latency_saved_ms, 1),
+            "avg_lookup_ms": round(self._lookup_ms / lookups, 3) if lookups else None,
+            "entries": len(live),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "top_questions": [
+                {"id": entry["id"], "question": entry["question"], "hits": entry["hits"],
+                 "generation_ms": round(entry["generation_ms"], 1)}
+                for entry in live[:top]
+            ]
+        }
+
+
+# Process-wide cache for /chat/message and /chat/message/stream
+chat_answer_cache = SemanticChatCache()
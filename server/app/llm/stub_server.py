@@ -0,0 +1,443 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Stub paths are "/<provider><upstream path>", e.g. /groq/openai/v1/chat/completions
+UPSTREAMS = {
+    "groq": "https://api.groq.com",
+    "fireworks": "https://api.fireworks.ai",
+    "gemini": "https://generativelanguage.googleapis.com"
+}
+
+MODES = ("stub", "record", "replay")
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    # Per-request randomness is derived from the seed and the request itself, so a
+    # rerun of the same workload sees the same latencies and injected errors
+    "seed": 42,
+    "stream_chunk_ms": 15,
+    # Replayed requests sleep for their recorded latency ("recorded") or draw from the scenario ("scenario")
+    "replay_latency": "recorded",
+    # What replay does on a cassette miss: "error" (404) or "canned"
+    "replay_miss": "error",
+    "providers": {
+        "groq": {"latency": {"distribution": "lognormal", "median_ms": 350, "sigma": 0.35}},
+        "fireworks": {"latency": {"distribution": "lognormal", "median_ms": 600, "sigma": 0.45}},
+        "gemini": {"latency": {"distribution": "lognormal", "median_ms": 800, "sigma": 0.5}}
+    },
+    # Canned answer overrides: the first rule whose regex matches the prompt wins
+    "answers": []
+}
+
+PROVIDER_DEFAULTS: Dict[str, Any] = {
+    "latency": {"distribution": "fixed", "ms": 0},
+    "error_rate": 0.0,
+    "error_statuses": [429, 500, 503],
+    "retry_after": 1,
+    "timeout_rate": 0.0,
+    "timeout_seconds": 120
+}
+
+# Keyword heuristics for canned classifications: (keywords, department, category, urgency)
+CANNED_ROUTES = [
+    (("fire", "accident", "collapse", "electrocut", "gas leak", "emergency"), "Police Department", "Public Safety", "HIGH"),
+    (("water", "pipe", "sewage", "drain", "flood"), "Water Department", "Utilities", "HIGH"),
+    (("electric", "power", "street light", "streetlight", "transformer"), "Electricity Department", "Utilities", "MEDIUM"),
+    (("garbage", "waste", "trash", "litter", "dump"), "Sanitation Department", "Environmental", "MEDIUM"),
+    (("pothole", "road", "traffic", "bus", "parking"), "Transport Department", "Infrastructure", "MEDIUM"),
+    (("hospital", "clinic", "disease", "mosquito", "food"), "Health Department", "Healthcare", "HIGH"),
+    (("school", "teacher", "college"), "Education Department", "Education", "LOW"),
+    (("pollution", "smoke", "noise", "tree", "park"), "Environment Department", "Environmental", "LOW"),
+    (("bribe", "corrupt", "theft", "crime", "police"), "Police Department", "Corruption", "HIGH")
+]
+IRRELEVANT_KEYWORDS = ("resume", "curriculum vitae", "hiring", "discount", "buy now", "joke")
+LOCATION_PATTERN = re.compile(
+    r"\b(?:on|at|near|in)\s+((?:[A-Z0-9][\w'-]*\s+){0,3}"
+    r"(?:Street|Road|Avenue|Lane|Nagar|Colony|Park|Market|Square|Junction|Block|Sector)\b)"
+)
+
+
+def _request_key(provider: str, path: str, query: Dict[str, str], body: Any) -> str:
+    """Cassette key: provider, upstream path, query and body, without API keys."""
+    params = {name: value for name, value in sorted(query.items()) if name != "key"}
+    material = json.dumps([provider, path, params, body], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _sample_latency(spec: Dict[str, Any], rng: random.Random) -> float:
+    """Latency in seconds drawn from a fixed, uniform, normal or lognormal distribution."""
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "uniform":
+        ms = rng.uniform(spec.get("min_ms", 0), spec.get("max_ms", 0))
+    elif distribution == "normal":
+        ms = rng.gauss(spec.get("mean_ms", 0), spec.get("stddev_ms", 0))
+    elif distribution == "lognormal":
+        ms = spec.get("median_ms", 0) * rng.lognormvariate(0, spec.get("sigma", 0))
+    else:
+        ms = spec.get("ms", 0)
+    return max(0.0, min(ms, spec.get("max_ms", ms))) / 1000
+
+
+def _classify(text: str) -> Tuple[str, str, str]:
+    lowered = text.lower()
+    for keywords, department, category, urgency in CANNED_ROUTES:
+        if any(keyword in lowered for keyword in keywords):
+            return department, category, urgency
+    return "Municipality", "Other", "LOW"
+
+
+def _location(text: str) -> str:
+    match = LOCATION_PATTERN.search(text)
+    return match.group(1).strip() if match else "Location not specified"
+
+
+def _summary(text: str) -> str:
+    words = text.split()
+    return " ".join(words[:40]) + ("..." if len(words) > 40 else "")
+
+
+def _analysis(text: str) -> Dict[str, Any]:
+    department, category, urgency = _classify(text)
+    relevant = not any(keyword in text.lower() for keyword in IRRELEVANT_KEYWORDS)
+    return {
+        "summary": _summary(text),
+        "urgency": urgency,
+        "department": department,
+        "location": _location(text),
+        "is_relevant": relevant,
+        "confidence": 0.9,
+        "category": category.lower(),
+        "reason": "Civic issue for a public department." if relevant else "Not a civic complaint."
+    }
+
+
+def _after(prompt: str, marker: str) -> str:
+    index = prompt.rfind(marker)
+    return prompt[index + len(marker):].strip() if index >= 0 else prompt
+
+
+def canned_answer(prompt: str, rules: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Deterministic answer shaped like the real model's reply to one of the portal's prompts."""
+    for rule in rules or []:
+        if re.search(rule["match"], prompt, re.IGNORECASE | re.DOTALL):
+            return rule["response"]
+
+    if "Submissions (JSON array of" in prompt:
+        try:
+            items = json.loads(_after(prompt, "):"))
+        except ValueError:
+            items = []
+        return json.dumps([{"id": item.get("id"), **_analysis(item.get("text", ""))} for item in items])
+    if '{"summary": "<summary>"' in prompt:
+        return json.dumps(_analysis(_after(prompt, "Text:")))
+    if '{"is_relevant": <true/false>' in prompt:
+        analysis = _analysis(_after(prompt, "Text:"))
+        return json.dumps({key: analysis[key] for key in ("is_relevant", "confidence", "category", "reason")})
+    if "of a long document" in prompt:
+        return _summary(_after(prompt, "Text:").rsplit("Summary:", 1)[0])
+    if "concise summary of the following complaint" in prompt:
+        return _summary(_after(prompt, "Complaint text:").rsplit("Summary:", 1)[0])
+
+    # The complaint runs from its marker to the next blank line (scoring guidelines follow it)
+    complaint = _after(prompt, "Complaint text:" if "Complaint text:" in prompt else "Title:").split("\n\n", 1)[0]
+    department, category, urgency = _classify(complaint)
+    if "Respond with only one word: HIGH, MEDIUM, or LOW" in prompt:
+        return urgency
+    if "extract the specific location" in prompt:
+        return _location(complaint)
+    if "Respond with only the exact department name" in prompt:
+        return department
+    if "Return only the category name" in prompt:
+        return category
+    if "priority score (0-100)" in prompt:
+        return {"HIGH": "85", "MEDIUM": "60", "LOW": "35"}[urgency]
+    if "Generate a professional, helpful response" in prompt:
+        return (f"Thank you for reporting this issue. It has been forwarded to the {department}, "
+                f"which will review it and share an update within the standard resolution timeline.")
+    if "You are GrievanceBot" in prompt:
+        question = _after(prompt, "User Question:").split("\n", 1)[0].strip()
+        return (f"I can help with that. You asked: \"{question}\". You can submit a complaint from the "
+                f"dashboard, or describe the issue here and I will guide you through the details.")
+    return "OK"
+
+
+def _openai_prompt(body: Dict[str, Any]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+
+
+def _gemini_prompt(body: Dict[str, Any]) -> str:
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+class Cassette:
+    """Recorded provider responses, one JSONL file per provider in ``directory``."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+
+    def load(self) -> int:
+        self._entries.clear()
+        self._cursor.clear()
+        if not os.path.isdir(self.directory):
+            return 0
+        count = 0
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".jsonl"):
+                continue
+            with open(os.path.join(self.directory, filename), encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+                        count += 1
+        return count
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Recorded response for ``key``; repeated recordings of one request are replayed in turn."""
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = index + 1
+        return entries[index % len(entries)]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{entry['provider']}.jsonl"), "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._entries.setdefault(entry["key"], []).append(entry)
+
+
+class StubProvider:
+    """Serves Groq/Fireworks (OpenAI-compatible) and Gemini REST requests without the real APIs.
+
+    ``stub`` answers from canned responses after a latency drawn from the scenario and
+    injects errors and timeouts at the configured rates; ``record`` proxies to the real
+    provider and appends each response to the cassette; ``replay`` serves the cassette.
+    """
+
+    def __init__(self, mode: str = "stub", scenario: Optional[Dict[str, Any]] = None, cassette_dir: str = "./cassettes"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown stub mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.scenario = self._merge(scenario or {})
+        self.cassette = Cassette(cassette_dir)
+        if mode == "replay":
+            logger.info(f"Loaded {self.cassette.load()} recorded responses from {cassette_dir}")
+        self._occurrences: Dict[str, int] = {}
+        self._upstream: Optional[httpx.AsyncClient] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _merge(scenario: Dict[str, Any]) -> Dict[str, Any]:
+        merged = copy.deepcopy(DEFAULT_SCENARIO)
+        providers = scenario.get("providers", {})
+        merged.update({key: value for key, value in scenario.items() if key != "providers"})
+        for provider in UPSTREAMS:
+            merged["providers"][provider] = {
+                **PROVIDER_DEFAULTS,
+                **merged["providers"].get(provider, {}),
+                **providers.get(provider, {})
+            }
+        return merged
+
+    def set_scenario(self, scenario: Dict[str, Any]) -> None:
+        self.scenario = self._merge(scenario)
+        self._occurrences.clear()
+
+    def _count(self, provider: str, name: str) -> None:
+        stats = self._stats.setdefault(provider, {})
+        stats[name] = stats.get(name, 0) + 1
+
+    def _rng(self, key: str) -> random.Random:
+        occurrence = self._occurrences.get(key, 0)
+        self._occurrences[key] = occurrence + 1
+        return random.Random(f"{self.scenario['seed']}:{key}:{occurrence}")
+
+    async def handle(self, provider: str, path: str, request: Request) -> Response:
+        body = await request.json()
+        query = dict(request.query_params)
+        key = _request_key(provider, path, query, body)
+        self._count(provider, "requests")
+
+        if self.mode == "record":
+            return await self._record(provider, path, query, body, key, request)
+        if self.mode == "replay":
+            entry = self.cassette.lookup(key)
+            if entry is not None:
+                self._count(provider, "replay_hits")
+                return await self._replay(provider, entry, self._rng(key))
+            self._count(provider, "replay_misses")
+            if self.scenario["replay_miss"] != "canned":
+                return self._error(provider, 404, f"No recorded response for {provider} {path}")
+        return await self._stub(provider, path, body, self._rng(key))
+
+    async def _stub(self, provider: str, path: str, body: Dict[str, Any], rng: random.Random) -> Response:
+        settings = self.scenario["providers"][provider]
+        await asyncio.sleep(_sample_latency(settings["latency"], rng))
+
+        roll = rng.random()
+        if roll < settings["timeout_rate"]:
+            self._count(provider, "timeouts_injected")
+            await asyncio.sleep(settings["timeout_seconds"])
+            return self._error(provider, 504, "Injected timeout")
+        if roll < settings["timeout_rate"] + settings["error_rate"]:
+            status = rng.choice(settings["error_statuses"])
+            self._count(provider, "errors_injected")
+            headers = {"Retry-After": str(settings["retry_after"])} if status == 429 else None
+            return self._error(provider, status, "Injected error", headers)
+
+        gemini = provider == "gemini"
+        prompt = _gemini_prompt(body) if gemini else _openai_prompt(body)
+        answer = canned_answer(prompt, self.scenario["answers"])
+        model = path.rsplit("/", 1)[-1].split(":")[0] if gemini else body.get("model", "stub")
+
+        if path.endswith(":streamGenerateContent") or body.get("stream"):
+            return StreamingResponse(self._stream(answer, gemini, model), media_type="text/event-stream")
+        if gemini:
+            return JSONResponse({
+                "candidates": [{"content": {"parts": [{"text": answer}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(answer) // 4}
+            })
+        return JSONResponse({
+            "id": f"chatcmpl-stub-{rng.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4}
+        })
+
+    async def _stream(self, answer: str, gemini: bool, model: str) -> AsyncIterator[str]:
+        delay = self.scenario["stream_chunk_ms"] / 1000
+        for index, word in enumerate(re.findall(r"\S+\s*", answer)):
+            if index:
+                await asyncio.sleep(delay)
+            if gemini:
+                event = {"candidates": [{"content": {"parts": [{"text": word}], "role": "model"}, "index": 0}]}
+            else:
+                event = {"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            yield f"data: {json.dumps(event)}\n\n"
+        if not gemini:
+            yield "data: [DONE]\n\n"
+
+    async def _record(self, provider: str, path: str, query: Dict[str, str], body: Any, key: str, request: Request) -> Response:
+        if self._upstream is None:
+            self._upstream = httpx.AsyncClient(timeout=httpx.Timeout(Config.LLM_HTTP_TIMEOUT * 4))
+        headers = {
+            name: value for name, value in request.headers.items()
+            if name.lower() in ("authorization", "x-goog-api-key", "content-type")
+        }
+        started = time.perf_counter()
+        # Streams are buffered while recording and re-chunked on replay
+        response = await self._upstream.post(f"{UPSTREAMS[provider]}{path}", params=query, headers=headers, json=body)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self.cassette.append({
+            "key": key,
+            "provider": provider,
+            "path": path,
+            "query": {name: value for name, value in query.items() if name != "key"},
+            "request": body,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": response.text,
+            "latency_ms": round(latency_ms, 1),
+            "recorded_at": datetime.utcnow().isoformat()
+        })
+        self._count(provider, "recorded")
+        return Response(response.content, status_code=response.status_code,
+                        media_type=response.headers.get("content-type"))
+
+    async def _replay(self, provider: str, entry: Dict[str, Any], rng: random.Random) -> Response:
+        if self.scenario["replay_latency"] == "recorded":
+            await asyncio.sleep(entry["latency_ms"] / 1000)
+        else:
+            await asyncio.sleep(_sample_latency(self.scenario["providers"][provider]["latency"], rng))
+
+        if entry["content_type"].startswith("text/event-stream"):
+            async def events() -> AsyncIterator[str]:
+                for index, event in enumerate(part for part in entry["body"].split("\n\n") if part.strip()):
+                    if index:
+                        await asyncio.sleep(self.scenario["stream_chunk_ms"] / 1000)
+                    yield event + "\n\n"
+            return StreamingResponse(events(), status_code=entry["status"], media_type="text/event-stream")
+        return Response(entry["body"], status_code=entry["status"], media_type=entry["content_type"])
+
+    @staticmethod
+    def _error(provider: str, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+        if provider == "gemini":
+            error = {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}
+        else:
+            error = {"message": message, "type": "rate_limit_exceeded" if status == 429 else "server_error", "code": status}
+        return JSONResponse({"error": error}, status_code=status, headers=headers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "cassette_dir": self.cassette.directory, "providers": self._stats}
+
+    def reset_stats(self) -> None:
+        self._stats.clear()
+        self._occurrences.clear()
+
+    async def close(self) -> None:
+        if self._upstream is not None:
+            await self._upstream.aclose()
+            self._upstream = None
+
+
+def create_stub_app(stub: StubProvider) -> FastAPI:
+    """FastAPI app exposing ``/<provider>/...`` provider routes and ``/_stub`` controls."""
+    app = FastAPI(title="LLM provider stub")
+
+    @app.get("/_stub/stats")
+    async def stub_stats():
+        return stub.get_stats()
+
+    @app.delete("/_stub/stats")
+    async def reset_stub_stats():
+        stub.reset_stats()
+        return {"message": "Stub stats reset"}
+
+    @app.put("/_stub/scenario")
+    async def update_scenario(request: Request):
+        stub.set_scenario(await request.json())
+        return stub.scenario
+
+    @app.post("/{provider}/{path:path}")
+    async def provider_call(provider: str, path: str, request: Request):
+        if provider not in UPSTREAMS:
+            return JSONResponse({"error": {"message": f"Unknown provider {provider}"}}, status_code=404)
+        try:
+            return await stub.handle(provider, f"/{path}", request)
+        except Exception as e:
+            logger.error(f"Stub failed to serve {provider} /{path}: {str(e)}")
+            return stub._error(provider, 502, f"Stub error: {str(e)}")
+
+    @app.on_event("shutdown")
+    async def close_upstream():
+        await stub.close()
+
+    return app
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .auth_routes import router as auth_router
 from .complaint_routes import router as complaint_router
@@ -6,11 +9,45 @@ from .notification_routes import router as notification_router
 from .chat_routes import router as chat_router
 from .admin_routes import router as admin_router
 from .rag_routes import router as rag_router
+from .llm.http_pool import open_http_clients, close_http_clients
+from .llm.metrics import llm_metrics
+from .llm.quick_answers import quick_answers
+from .rag_modules.vector_backfill import backfill_runner
+from .rag_modules.priority_model import priority_model
+from .rag_modules.urgency_model import urgency_model
+from .jobs.job_queue import job_queue
+from .registry import services
+from .rag_config import Config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared keep-alive connection pools for the LLM providers
+    open_http_clients()
+    # One embedding model, vector store and LLM client set per process, warmed up before serving
+    await asyncio.to_thread(services.load)
+    # Newest locally trained urgency model (absent until train_urgency_model.py has run)
+    urgency_model.load()
+    # Newest local priority-score model (absent until train_priority_model.py has run)
+    priority_model.load()
+    # Durable background enrichment for async complaint submissions
+    if Config.JOB_WORKER_ENABLED:
+        job_queue.start()
+    # Answers to the quick-response chips, regenerated in the background when outdated
+    if Config.QUICK_ANSWERS_ENABLED:
+        quick_answers.start()
+    yield
+    await quick_answers.stop()
+    await backfill_runner.stop()
+    await job_queue.stop()
+    await close_http_clients()
+
 
 app = FastAPI(
     title="GrievanceBot API", 
     description="AI-powered Government Complaint Management System",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - Allow frontend to access backend
@@ -41,3 +78,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """LLM call latency histograms, token, cost, error, fallback and cache counters, service load times and RSS (Prometheus text format)"""
+    if not Config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(llm_metrics.prometheus() + services.prometheus(), media_type="text/plain; version=0.0.4")
@@ -110,6 +110,7 @@ class ComplaintInDB(ComplaintBase):
     contact_email: Optional[str] = None
     priority: Optional[str] = "medium"
     priority_score: Optional[int] = 50
+    priority_source: Optional[str] = None  # 'llm', 'local' or 'fallback'
     status: str = "pending"
     assigned_department: Optional[str] = None
     ai_response: Optional[str] = None
@@ -126,7 +127,9 @@ class ComplaintInDB(ComplaintBase):
     vector_db_id: Optional[str] = None
     rag_summary: Optional[str] = None
     rag_department: Optional[str] = None
+    rag_department_source: Optional[str] = None  # 'llm', 'local' or 'fallback'
     rag_urgency: Optional[str] = None
+    rag_urgency_source: Optional[str] = None  # 'llm', 'local' or 'fallback'
     rag_location: Optional[str] = None
     rag_color: Optional[str] = None
     rag_emoji: Optional[str] = None
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,10 +11,163 @@ class Config:
     
     # Embedding model configuration
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    # Run a warm-up encode once the shared services are built at startup (app/registry.py)
+    SERVICE_WARMUP_ENABLED = os.getenv("SERVICE_WARMUP_ENABLED", "true").lower() == "true"
+    # Texts encoded and written to the vector store per batch by bulk ingest (add_documents, backfill)
+    VECTOR_BATCH_SIZE = int(os.getenv("VECTOR_BATCH_SIZE", "64"))
+    # Persist the in-memory vector store fallback (used when ChromaDB is unavailable) to memory-mapped files
+    VECTOR_FALLBACK_PERSIST = os.getenv("VECTOR_FALLBACK_PERSIST", "true").lower() == "true"
+    # Approximate search for the fallback store: "ivf" (inverted file, app/vector_store/ivf_index.py) or "none" (exact)
+    VECTOR_ANN_INDEX = os.getenv("VECTOR_ANN_INDEX", "none").lower()
+    # Inverted lists (0 = sqrt of the corpus size at training time) and lists scanned per query
+    VECTOR_ANN_NLIST = int(os.getenv("VECTOR_ANN_NLIST", "0"))
+    VECTOR_ANN_NPROBE = int(os.getenv("VECTOR_ANN_NPROBE", "16"))
+    # Below this many documents exact search is fast enough and the index is not built
+    VECTOR_ANN_MIN_TRAIN = int(os.getenv("VECTOR_ANN_MIN_TRAIN", "20000"))
     
     # Gemini model configuration
     GEMINI_MODEL = "gemini-2.0-flash"
+
+    # Complaint analysis mode: "single" sends one structured JSON prompt for
+    # summary/urgency/department/location/relevance, "multi" keeps one call per field
+    ANALYSIS_MODE = os.getenv("LLM_ANALYSIS_MODE", "single").lower()
+
+    # LLM response cache (in-process LRU + MongoDB "llm_cache" collection)
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_PERSISTENT = os.getenv("LLM_CACHE_PERSISTENT", "true").lower() == "true"
+
+    # Pooled keep-alive HTTP clients for Groq/Fireworks/Gemini REST calls (one pool per provider)
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "50"))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+    LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "30"))
+    LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+
+    # Per-call timeouts (seconds) for the complaint analysis prompts
+    LLM_TIMEOUT_CATEGORY = float(os.getenv("LLM_TIMEOUT_CATEGORY", "10"))
+    LLM_TIMEOUT_PRIORITY = float(os.getenv("LLM_TIMEOUT_PRIORITY", "10"))
+    LLM_TIMEOUT_RESPONSE = float(os.getenv("LLM_TIMEOUT_RESPONSE", "20"))
+    LLM_TIMEOUT_CHAT = float(os.getenv("LLM_TIMEOUT_CHAT", "20"))
+
+    # Local provider stand-in (python run_llm_stub.py): when LLM_STUB_URL is set, Groq,
+    # Fireworks and Gemini requests go to the stub and missing API keys default to a placeholder
+    LLM_STUB_URL = os.getenv("LLM_STUB_URL", "").rstrip("/")
+    LLM_STUB_API_KEY = "stub"
+    GROQ_API_BASE = f"{LLM_STUB_URL}/groq" if LLM_STUB_URL else "https://api.groq.com"
+    FIREWORKS_API_BASE = f"{LLM_STUB_URL}/fireworks" if LLM_STUB_URL else "https://api.fireworks.ai"
+    GEMINI_API_BASE = f"{LLM_STUB_URL}/gemini" if LLM_STUB_URL else "https://generativelanguage.googleapis.com"
+
+    # Provider routing: EWMA smoothing, circuit breaker and hedged requests
+    LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.2"))
+    LLM_ROUTER_SLOW_FACTOR = float(os.getenv("LLM_ROUTER_SLOW_FACTOR", "2.0"))
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "3.0"))
+    LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.25"))
     
+    # Per-provider/model rate limits (requests and tokens per minute, 0 = unlimited). Calls wait
+    # in a bounded FIFO queue for up to LLM_RATE_LIMIT_MAX_WAIT seconds (or the call's timeout);
+    # 429/503 responses are retried after Retry-After or exponential backoff with jitter
+    LLM_RATE_LIMITS = {
+        "groq": {"rpm": float(os.getenv("GROQ_RPM", "30")), "tpm": float(os.getenv("GROQ_TPM", "6000"))},
+        "fireworks": {"rpm": float(os.getenv("FIREWORKS_RPM", "600")), "tpm": float(os.getenv("FIREWORKS_TPM", "0"))},
+        "gemini": {"rpm": float(os.getenv("GEMINI_RPM", "1000")), "tpm": float(os.getenv("GEMINI_TPM", "1000000"))}
+    }
+    LLM_RATE_LIMIT_MAX_QUEUE = int(os.getenv("LLM_RATE_LIMIT_MAX_QUEUE", "100"))
+    LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "10"))
+    LLM_RATE_LIMIT_MAX_RETRIES = int(os.getenv("LLM_RATE_LIMIT_MAX_RETRIES", "3"))
+    LLM_RATE_LIMIT_BACKOFF_BASE = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_BASE", "0.5"))
+    LLM_RATE_LIMIT_BACKOFF_MAX = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_MAX", "20"))
+    
+    # Cross-request micro-batching of the structured analysis prompt: flush after
+    # LLM_BATCH_MAX_ITEMS complaints or LLM_BATCH_MAX_WAIT_MS after the first one
+    LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "true").lower() == "true"
+    LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "8"))
+    LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "50"))
+
+    # LLM call metrics (GET /metrics and GET /admin/llm/metrics). Prices are USD per million
+    # input/output tokens; LLM_PRICING_JSON overrides or extends them, e.g. {"model": {"input": 1, "output": 2}}
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    LLM_PRICING = {
+        "llama-3.1-70b-versatile": {"input": 0.59, "output": 0.79},
+        "accounts/fireworks/models/llama-v3p1-70b-instruct": {"input": 0.9, "output": 0.9},
+        "gemini-2.0-flash": {"input": 0.1, "output": 0.4},
+        **json.loads(os.getenv("LLM_PRICING_JSON") or "{}")
+    }
+
+    # Long-document mode: texts above LONG_DOCUMENT_THRESHOLD_CHARS are split into
+    # token-bounded chunks, summarized concurrently, and classified from the merged
+    # summary (reduced until it fits in LONG_DOCUMENT_SUMMARY_TARGET_CHARS). With the
+    # single analysis prompt map-reduce only pays off for very long texts; in "multi"
+    # mode every prompt re-reads the text, so a much lower threshold saves tokens.
+    LONG_DOCUMENT_THRESHOLD_CHARS = int(os.getenv("LONG_DOCUMENT_THRESHOLD_CHARS", "60000"))
+    LONG_DOCUMENT_SUMMARY_TARGET_CHARS = int(os.getenv("LONG_DOCUMENT_SUMMARY_TARGET_CHARS", "8000"))
+    LONG_DOCUMENT_CHUNK_TOKENS = int(os.getenv("LONG_DOCUMENT_CHUNK_TOKENS", "1500"))
+    LONG_DOCUMENT_CHUNK_OVERLAP_TOKENS = int(os.getenv("LONG_DOCUMENT_CHUNK_OVERLAP_TOKENS", "100"))
+    LONG_DOCUMENT_CONCURRENCY = int(os.getenv("LONG_DOCUMENT_CONCURRENCY", "8"))
+
+    # Complaint submission: "sync" analyzes inline, "async" returns 202 and enriches in the
+    # MongoDB-backed job worker (lease = visibility timeout before another worker retries)
+    COMPLAINT_SUBMISSION_MODE = os.getenv("COMPLAINT_SUBMISSION_MODE", "sync").lower()
+    JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+    JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+    # Semantic answer cache for general chat questions: a question whose MiniLM embedding has
+    # cosine similarity >= THRESHOLD to a cached one gets that answer (user name filled into slots)
+    CHAT_SEMANTIC_CACHE_ENABLED = os.getenv("CHAT_SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    CHAT_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("CHAT_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+    CHAT_SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("CHAT_SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+    CHAT_SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+    CHAT_SEMANTIC_CACHE_MAX_WORDS = int(os.getenv("CHAT_SEMANTIC_CACHE_MAX_WORDS", "25"))
+
+    # Chat status/tracking/count questions answered from MongoDB: a complaint id, or an intent whose
+    # exemplar similarity is >= MIN_SIMILARITY and beats open-ended questions by MARGIN
+    CHAT_INTENT_ENABLED = os.getenv("CHAT_INTENT_ENABLED", "true").lower() == "true"
+    CHAT_INTENT_MIN_SIMILARITY = float(os.getenv("CHAT_INTENT_MIN_SIMILARITY", "0.5"))
+    CHAT_INTENT_MARGIN = float(os.getenv("CHAT_INTENT_MARGIN", "0.05"))
+
+    # Precomputed answers to the /chat/quick-responses chips (stored in the "quick_answers" collection)
+    QUICK_ANSWERS_ENABLED = os.getenv("QUICK_ANSWERS_ENABLED", "true").lower() == "true"
+
+    # Local relevance pre-filter: lexical heuristics plus embedding similarity to civic vs.
+    # non-civic exemplars; only texts inside the margins are sent to the LLM relevance check
+    RELEVANCE_FILTER_ENABLED = os.getenv("RELEVANCE_FILTER_ENABLED", "true").lower() == "true"
+    RELEVANCE_FILTER_ACCEPT_MARGIN = float(os.getenv("RELEVANCE_FILTER_ACCEPT_MARGIN", "0.12"))
+    RELEVANCE_FILTER_REJECT_MARGIN = float(os.getenv("RELEVANCE_FILTER_REJECT_MARGIN", "0.12"))
+    RELEVANCE_FILTER_MIN_WORDS = int(os.getenv("RELEVANCE_FILTER_MIN_WORDS", "2"))
+
+    # Local location extractor: Aho-Corasick match of gazetteer file place names and stored
+    # complaint locations; new locations land in a delta index merged every DELTA_MAX names
+    LOCATION_GAZETTEER_ENABLED = os.getenv("LOCATION_GAZETTEER_ENABLED", "true").lower() == "true"
+    LOCATION_GAZETTEER_PATH = os.getenv("LOCATION_GAZETTEER_PATH", "./data/gazetteer.txt")
+    LOCATION_GAZETTEER_REFRESH_SECONDS = float(os.getenv("LOCATION_GAZETTEER_REFRESH_SECONDS", "60"))
+    LOCATION_GAZETTEER_DELTA_MAX = int(os.getenv("LOCATION_GAZETTEER_DELTA_MAX", "256"))
+
+    # Local department router: answer from embedding prototypes when the top-2
+    # cosine margin is at least DEPARTMENT_ROUTER_MARGIN, otherwise ask the LLM
+    DEPARTMENT_ROUTER_ENABLED = os.getenv("DEPARTMENT_ROUTER_ENABLED", "true").lower() == "true"
+    DEPARTMENT_ROUTER_MARGIN = float(os.getenv("DEPARTMENT_ROUTER_MARGIN", "0.05"))
+    DEPARTMENT_ROUTER_GUIDELINE_WEIGHT = float(os.getenv("DEPARTMENT_ROUTER_GUIDELINE_WEIGHT", "5"))
+    DEPARTMENT_ROUTER_MAX_EXAMPLES = int(os.getenv("DEPARTMENT_ROUTER_MAX_EXAMPLES", "200"))
+
+    # Locally trained models (versioned artifacts written by the retrain CLIs)
+    LOCAL_MODEL_DIR = os.getenv("LOCAL_MODEL_DIR", "./models")
+    URGENCY_MODEL_DIR = os.path.join(LOCAL_MODEL_DIR, "urgency")
+    # Pin an artifact version (e.g. 20250101120000); empty loads the newest one
+    URGENCY_MODEL_VERSION = os.getenv("URGENCY_MODEL_VERSION") or None
+    URGENCY_MODEL_MIN_CONFIDENCE = float(os.getenv("URGENCY_MODEL_MIN_CONFIDENCE", "0.8"))
+    # Priority-score regressor: scores whose ensemble spread exceeds MAX_SPREAD points go to the remote model
+    PRIORITY_MODEL_ENABLED = os.getenv("PRIORITY_MODEL_ENABLED", "true").lower() == "true"
+    PRIORITY_MODEL_DIR = os.path.join(LOCAL_MODEL_DIR, "priority")
+    PRIORITY_MODEL_VERSION = os.getenv("PRIORITY_MODEL_VERSION") or None
+    PRIORITY_MODEL_MAX_SPREAD = float(os.getenv("PRIORITY_MODEL_MAX_SPREAD", "5"))
+
     # Department categories
     DEPARTMENTS = [
         "Transport Department",
@@ -27,6 +181,20 @@ class Config:
         "Education Department",
         "Police Department"
     ]
+
+    # Routing guidelines shown to the LLM for each department
+    DEPARTMENT_GUIDELINES = {
+        "Transport Department": "Roads, traffic, vehicles, parking, public transport",
+        "Municipality": "General civic issues, permits, local governance",
+        "Sanitation Department": "Waste management, cleaning, garbage collection",
+        "Health Department": "Public health, hospitals, disease control, food safety",
+        "Water Department": "Water supply, drainage, sewage, plumbing",
+        "Electricity Department": "Power supply, electrical issues, street lights",
+        "Public Works Department": "Construction, infrastructure, building maintenance",
+        "Environment Department": "Pollution, environmental protection, green spaces",
+        "Education Department": "Schools, educational facilities, academic issues",
+        "Police Department": "Crime, law enforcement, public safety, traffic violations"
+    }
     
     # Urgency levels
     URGENCY_LEVELS = {
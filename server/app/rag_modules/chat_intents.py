@@ -0,0 +1,147 @@
+from typing import Any, Dict, Optional
+import logging
+import re
+import threading
+
+import numpy as np
+
+from app.rag_config import Config
+from app.rag_modules.similarity import top_mean
+
+logger = logging.getLogger(__name__)
+
+COMPLAINT_ID_PATTERN = re.compile(r"\bCMP[0-9A-F]{6}\b", re.IGNORECASE)
+
+INTENT_EXEMPLARS = {
+    "status": [
+        "What's the status of my complaint?",
+        "What is the current status of my complaint?",
+        "Has my complaint been resolved yet?",
+        "Any update on my complaint?",
+        "What happened to the complaint I filed last week?",
+        "Is anyone working on my complaint?",
+        "Is my latest complaint still pending?",
+        "Where is my complaint now?"
+    ],
+    "tracking": [
+        "Show me all my complaints.",
+        "List my complaints and their status.",
+        "Track my complaints.",
+        "Which of my complaints are still open?",
+        "Show my pending complaints.",
+        "What complaints have I submitted?",
+        "Show the complaints I filed recently."
+    ],
+    "count": [
+        "How many complaints have I filed?",
+        "How many of my complaints are resolved?",
+        "How many complaints do I have pending?",
+        "What is the total number of complaints I submitted?",
+        "Count my open complaints."
+    ],
+    # Open-ended questions that share words with the intents above; these go to the LLM
+    "other": [
+        "How long does it take to resolve complaints?",
+        "How do I submit a new complaint?",
+        "Can I update my complaint details?",
+        "Which department handles my type of issue?",
+        "How is priority determined?",
+        "What documents should I attach?",
+        "How do I contact support?",
+        "Why was my complaint rejected and what can I do about it?",
+        "How can I escalate a complaint that is taking too long?",
+        "Can I withdraw a complaint I submitted?",
+        "What should I do if the problem comes back after it was resolved?",
+        "The road near my house is full of potholes, what should I do?"
+    ]
+}
+
+# An intent only counts when the question also uses its vocabulary
+INTENT_PATTERNS = {
+    "status": re.compile(r"\b(status|progress|update|updates|happened|resolved|pending|where is|still|working on|news)\b", re.IGNORECASE),
+    "tracking": re.compile(r"\b(track|list|show|all|open|active|filed|submitted)\b", re.IGNORECASE),
+    "count": re.compile(r"\b(how many|number of|count|total)\b", re.IGNORECASE)
+}
+ANY_INTENT_PATTERN = re.compile(
+    "|".join(pattern.pattern for pattern in INTENT_PATTERNS.values()) + r"|" + COMPLAINT_ID_PATTERN.pattern,
+    re.IGNORECASE
+)
+
+
+class ChatIntentClassifier:
+    """Detects chat messages asking about the user's own complaints.
+
+    A complaint id in the message means a status question about that
+    complaint. Otherwise the message embedding is compared with exemplar
+    questions per intent (status, tracking, count) and with open-ended
+    questions that use the same words; an intent is returned only when it
+    beats the open-ended exemplars by ``margin`` and the message contains the
+    intent's vocabulary. Everything else is left to the LLM.
+    """
+
+    def __init__(self,
+                 min_similarity: float = Config.CHAT_INTENT_MIN_SIMILARITY,
+                 margin: float = Config.CHAT_INTENT_MARGIN,
+                 max_words: int = Config.CHAT_SEMANTIC_CACHE_MAX_WORDS):
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.max_words = max_words
+        self._exemplars: Optional[Dict[str, np.ndarray]] = None
+        self._build_lock = threading.Lock()
+        self._stats = {"status": 0, "tracking": 0, "count": 0, "escalated": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self._exemplars is not None
+
+    def ensure_built(self, encoder) -> None:
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                self._exemplars = {
+                    intent: np.asarray(encoder.encode(questions, normalize_embeddings=True), dtype=np.float32)
+                    for intent, questions in INTENT_EXEMPLARS.items()
+                }
+
+    def is_candidate(self, text: str) -> bool:
+        """Cheap lexical pre-check; only candidates need an embedding."""
+        return len(text.split()) <= self.max_words and ANY_INTENT_PATTERN.search(text) is not None
+
+    def classify(self, text: str, embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """``{"intent", "complaint_id", "confidence"}`` for status/tracking/count questions, else None."""
+        result = self._classify(text, embedding)
+        self._stats[result["intent"] if result else "escalated"] += 1
+        return result
+
+    def _classify(self, text: str, embedding: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+        if not self.is_candidate(text):
+            return None
+
+        complaint_id = COMPLAINT_ID_PATTERN.search(text)
+        if complaint_id:
+            return {"intent": "status", "complaint_id": complaint_id.group(0).upper(), "confidence": 1.0}
+
+        if embedding is None or not self.ready:
+            return None
+
+        scores = {intent: top_mean(matrix @ embedding) for intent, matrix in self._exemplars.items()}
+        other = scores.pop("other")
+        intent, score = max(scores.items(), key=lambda item: item[1])
+        if score < self.min_similarity or score - other < self.margin or not INTENT_PATTERNS[intent].search(text):
+            return None
+        return {"intent": intent, "complaint_id": None, "confidence": round(score, 3)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = sum(self._stats.values())
+        answered = total - self._stats["escalated"]
+        return {
+            **self._stats,
+            "local_fraction": round(answered / total, 4) if total else 0.0,
+            "min_similarity": self.min_similarity,
+            "margin": self.margin
+        }
+
+
+# Process-wide classifier; exemplar embeddings are built on first use with the chat embedding model
+chat_intent_classifier = ChatIntentClassifier()
@@ -0,0 +1,174 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DepartmentRoute(NamedTuple):
+    department: str
+    score: float
+    margin: float
+    confident: bool
+    embedding: np.ndarray
+
+
+def load_labeled_complaints(limit: Optional[int] = None) -> List[Tuple[str, str, str]]:
+    """(complaint id, text, department) for stored complaints the LLM already routed.
+
+    Departments chosen by the router itself or defaulted after an LLM failure
+    are skipped so the prototypes never learn from their own output.
+    """
+    from app.db import complaints_collection
+
+    cursor = complaints_collection.find(
+        {"rag_department": {"$in": Config.DEPARTMENTS}, "rag_department_source": {"$nin": ["local", "fallback"]}},
+        {"id": 1, "title": 1, "description": 1, "rag_department": 1}
+    ).sort("created_at", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    labeled = []
+    for complaint in cursor:
+        text = f"{complaint.get('title') or ''} {complaint.get('description') or ''}".strip()
+        if text:
+            labeled.append((str(complaint.get("id") or complaint["_id"]), text, complaint["rag_department"]))
+    return labeled
+
+
+class DepartmentRouter:
+    """Nearest-prototype department classifier on sentence embeddings.
+
+    Each department's prototype is the normalized mean of its guideline
+    description (weighted as several examples) and the embeddings of
+    historical complaints labeled with it. A complaint is answered locally only
+    when the best prototype beats the runner-up by at least ``margin``;
+    otherwise the caller escalates to the LLM.
+    """
+
+    def __init__(self,
+                 margin: float = Config.DEPARTMENT_ROUTER_MARGIN,
+                 guideline_weight: float = Config.DEPARTMENT_ROUTER_GUIDELINE_WEIGHT,
+                 max_examples: int = Config.DEPARTMENT_ROUTER_MAX_EXAMPLES):
+        self.margin = margin
+        self.guideline_weight = guideline_weight
+        self.max_examples = max_examples
+        self.encoder = None
+        self.departments: List[str] = list(Config.DEPARTMENTS)
+        self._sums: Optional[np.ndarray] = None
+        self._counts: Optional[np.ndarray] = None
+        self._prototypes: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._stats = {"local": 0, "escalated": 0}
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._prototypes is not None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.encoder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    def build(self, encoder, labeled: Optional[Iterable[Tuple[str, str]]] = None) -> None:
+        """Build prototypes from the guidelines plus ``labeled`` (text, department) pairs.
+
+        When ``labeled`` is None the most recent LLM-routed complaints are loaded from MongoDB.
+        """
+        started = time.perf_counter()
+        self.encoder = encoder
+        if labeled is None:
+            try:
+                labeled = [(text, department) for _, text, department in load_labeled_complaints()]
+            except Exception as e:
+                logger.warning(f"Could not load labeled complaints for department prototypes: {str(e)}")
+                labeled = []
+
+        guidelines = [f"{name}: {Config.DEPARTMENT_GUIDELINES.get(name, name)}" for name in self.departments]
+        sums = self.encode(guidelines) * self.guideline_weight
+        counts = np.full(len(self.departments), self.guideline_weight, dtype=np.float32)
+
+        per_department: Dict[str, List[str]] = {name: [] for name in self.departments}
+        for text, department in labeled:
+            examples = per_department.get(department)
+            if examples is not None and len(examples) < self.max_examples:
+                examples.append(text)
+
+        texts = [text for name in self.departments for text in per_department[name]]
+        if texts:
+            rows = [self.departments.index(name) for name in self.departments for _ in per_department[name]]
+            np.add.at(sums, rows, self.encode(texts))
+            np.add.at(counts, rows, 1)
+
+        with self._lock:
+            self._sums, self._counts = sums, counts
+            self._prototypes = self._normalize(sums)
+            self.built_at = time.time()
+
+        logger.info(
+            "Built department prototypes from %d labeled complaints in %.0f ms",
+            len(texts),
+            (time.perf_counter() - started) * 1000
+        )
+
+    def ensure_built(self, encoder) -> None:
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                self.build(encoder)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def route(self, text: str, embedding: Optional[np.ndarray] = None, record: bool = True) -> DepartmentRoute:
+        """Score ``text`` against every prototype; ``confident`` is False when the top-2 margin is too small."""
+        if embedding is None:
+            embedding = self.encode([text])[0]
+        scores = self._prototypes @ embedding
+        second, best = np.argpartition(scores, -2)[-2:]
+        if scores[second] > scores[best]:
+            best, second = second, best
+        margin = float(scores[best] - scores[second])
+        confident = margin >= self.margin
+
+        if record:
+            self._stats["local" if confident else "escalated"] += 1
+
+        return DepartmentRoute(self.departments[best], float(scores[best]), margin, confident, embedding)
+
+    def learn(self, embedding: np.ndarray, department: str) -> None:
+        """Fold an LLM-labeled complaint into its department prototype."""
+        if department not in self.departments or not self.ready:
+            return
+        index = self.departments.index(department)
+        with self._lock:
+            if self._counts[index] - self.guideline_weight >= self.max_examples:
+                return
+            self._sums[index] += embedding
+            self._counts[index] += 1
+            self._prototypes[index] = self._sums[index] / max(float(np.linalg.norm(self._sums[index])), 1e-12)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._stats["local"] + self._stats["escalated"]
+        return {
+            **self._stats,
+            "local_fraction": round(self._stats["local"] / total, 4) if total else 0.0,
+            "margin_threshold": self.margin,
+            "examples_per_department": (
+                {name: int(count - self.guideline_weight) for name, count in zip(self.departments, self._counts)}
+                if self.ready else {}
+            ),
+            "built_at": self.built_at
+        }
+
+
+# Process-wide router; prototypes are built on first use with the pipeline's embedding model
+department_router = DepartmentRouter()
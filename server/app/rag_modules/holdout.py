@@ -0,0 +1,7 @@
+import hashlib
+
+
+def in_holdout(complaint_id: str, fraction: float) -> bool:
+    """Deterministic train/test split by complaint id, shared by the local-model training and evaluation scripts."""
+    bucket = int(hashlib.md5(complaint_id.encode("utf-8")).hexdigest(), 16) % 1000
+    return bucket < fraction * 1000
@@ -0,0 +1,287 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+import os
+import re
+import threading
+import time
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Form values that name no place, or only a kind of place
+GENERIC_LOCATIONS = {"none", "na", "n a", "nil", "unknown", "not specified", "location not specified", "no location",
+                     "here", "home", "my home", "my house", "india", "city", "town", "village", "local area"}
+GENERIC_WORDS = {"the", "a", "an", "of", "in", "at", "on", "near", "opposite", "behind", "my", "our", "area", "road",
+                 "street", "lane", "main", "market", "park", "school", "hospital", "station", "colony", "house",
+                 "office", "city", "town", "village", "block", "sector", "ward", "no", "number"}
+
+
+def normalize_location(text: str) -> str:
+    """Lowercase, punctuation to spaces, single-spaced: the form both patterns and texts are matched in.
+
+    Initials are joined so "M.G. Road" and "MG Road" normalize alike.
+    """
+    spaced = " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+    return re.sub(r"\b([a-z]) (?=[a-z]\b)", r"\1", spaced)
+
+
+def is_specific_location(value: str) -> bool:
+    normalized = normalize_location(value)
+    words = normalized.split()
+    return (
+        4 <= len(normalized) <= 60
+        and len(words) <= 6
+        and normalized not in GENERIC_LOCATIONS
+        and any(word not in GENERIC_WORDS and not word.isdigit() for word in words)
+    )
+
+
+def load_gazetteer_file(path: str) -> List[str]:
+    """Place names from the gazetteer file, one per line; blank lines and ``#`` comments are skipped."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_complaint_locations(since: Optional[datetime] = None) -> Tuple[List[str], Optional[datetime]]:
+    """Distinct ``location`` values of stored complaints (created after ``since``) and the newest ``created_at`` seen."""
+    from app.db import complaints_collection
+
+    query: Dict[str, Any] = {"location": {"$nin": [None, ""]}}
+    if since is not None:
+        query["created_at"] = {"$gt": since}
+    latest = since
+    locations = set()
+    for complaint in complaints_collection.find(query, {"location": 1, "created_at": 1}):
+        locations.add(complaint["location"].strip())
+        created_at = complaint.get("created_at")
+        if isinstance(created_at, datetime) and (latest is None or created_at > latest):
+            latest = created_at
+    return sorted(locations), latest
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over characters: every occurrence of every pattern in one pass over the text."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[int]] = [None]
+        self._output_link: List[int] = [0]
+        self._lengths: List[int] = []
+        self._linked = True
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, pattern: str) -> int:
+        """Insert ``pattern`` into the trie and return its index (existing patterns keep theirs)."""
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._output_link.append(0)
+            node = next_node
+        if self._output[node] is None:
+            self._output[node] = len(self._lengths)
+            self._lengths.append(len(pattern))
+            self._linked = False
+        return self._output[node]
+
+    def _link(self) -> None:
+        """Breadth-first failure and output links; linear in the total pattern length."""
+        queue = deque()
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            self._output_link[node] = 0
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                target = self._fail[child]
+                self._output_link[child] = target if self._output[target] is not None else self._output_link[target]
+                queue.append(child)
+        self._linked = True
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield ``(start, end, pattern index)`` for every match."""
+        if not self._linked:
+            self._link()
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            match = node if self._output[node] is not None else self._output_link[node]
+            while match:
+                index = self._output[match]
+                yield position + 1 - self._lengths[index], position + 1, index
+                match = self._output_link[match]
+
+
+class LocationGazetteer:
+    """Finds known place names in complaint text so the location prompt can be skipped.
+
+    Patterns come from the gazetteer file and the ``location`` values of stored
+    complaints. New locations go into a small delta automaton that is cheap to
+    relink; it is merged into the main automaton once it holds ``delta_max``
+    patterns. The longest whole-word match wins; texts without one go to the LLM.
+    """
+
+    def __init__(self,
+                 path: str = Config.LOCATION_GAZETTEER_PATH,
+                 refresh_seconds: float = Config.LOCATION_GAZETTEER_REFRESH_SECONDS,
+                 delta_max: int = Config.LOCATION_GAZETTEER_DELTA_MAX):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.delta_max = delta_max
+        self._names: Dict[str, str] = {}
+        self._main = AhoCorasick()
+        self._main_names: List[str] = []
+        self._delta = AhoCorasick()
+        self._delta_names: List[str] = []
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._latest_complaint: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._stats = {"local": 0, "escalated": 0, "merges": 0}
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, complaint_locations: Optional[Iterable[str]] = None) -> None:
+        """Index the gazetteer file plus ``complaint_locations`` (loaded from MongoDB when None)."""
+        started = time.perf_counter()
+        latest = None
+        if complaint_locations is None:
+            try:
+                complaint_locations, latest = load_complaint_locations()
+            except Exception as e:
+                logger.warning(f"Could not load complaint locations for the gazetteer: {str(e)}")
+                complaint_locations = []
+
+        # Gazetteer entries are curated; free-text form values must name a specific place
+        names: Dict[str, str] = {normalize_location(name): name for name in load_gazetteer_file(self.path)}
+        for value in complaint_locations:
+            if is_specific_location(value):
+                names.setdefault(normalize_location(value), value.strip())
+        names.pop("", None)
+
+        main, main_names = self._compile(names)
+        with self._lock:
+            self._names = names
+            self._main, self._main_names = main, main_names
+            self._delta, self._delta_names = AhoCorasick(), []
+            self._latest_complaint = latest
+            self._refreshed_at = time.monotonic()
+            self.built_at = time.time()
+
+        logger.info(f"Built location gazetteer with {len(names)} place names in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @staticmethod
+    def _compile(names: Dict[str, str]) -> Tuple[AhoCorasick, List[str]]:
+        automaton = AhoCorasick()
+        canonical: List[str] = []
+        for normalized, name in names.items():
+            automaton.add(normalized)
+            canonical.append(name)
+        return automaton, canonical
+
+    def ensure_built(self) -> None:
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                self.build()
+
+    def learn(self, values: Iterable[str]) -> int:
+        """Add new place names (e.g. a just-submitted complaint's location); returns how many were new."""
+        added = 0
+        with self._lock:
+            if not self.ready:
+                return 0
+            for value in values:
+                if not value or not is_specific_location(value):
+                    continue
+                normalized = normalize_location(value)
+                if normalized in self._names:
+                    continue
+                self._names[normalized] = value.strip()
+                if self._delta.add(normalized) == len(self._delta_names):
+                    self._delta_names.append(value.strip())
+                added += 1
+
+            if len(self._delta_names) >= self.delta_max:
+                self._main, self._main_names = self._compile(self._names)
+                self._delta, self._delta_names = AhoCorasick(), []
+                self._stats["merges"] += 1
+        return added
+
+    def refresh(self) -> None:
+        """Pick up locations of complaints stored since the last refresh (other workers included)."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another thread is already refreshing
+        try:
+            self._refreshed_at = time.monotonic()
+            locations, latest = load_complaint_locations(since=self._latest_complaint)
+            if latest is not None:
+                self._latest_complaint = latest
+            added = self.learn(locations)
+        except Exception as e:
+            logger.warning(f"Location gazetteer refresh failed: {str(e)}")
+            return
+        finally:
+            self._refresh_lock.release()
+        if added:
+            logger.info(f"Added {added} new place names to the location gazetteer")
+
+    def match(self, text: str, record: bool = True) -> Optional[str]:
+        """The longest known place name occurring in ``text`` as whole words, or None."""
+        if self.ready and time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+
+        normalized = normalize_location(text)
+        best: Optional[Tuple[int, int, str]] = None
+        with self._lock:
+            for automaton, names in ((self._main, self._main_names), (self._delta, self._delta_names)):
+                for start, end, index in automaton.find_all(normalized):
+                    whole_words = (start == 0 or normalized[start - 1] == " ") and (
+                        end == len(normalized) or normalized[end] == " "
+                    )
+                    if whole_words and (best is None or (end - start, -start) > (best[1] - best[0], -best[0])):
+                        best = (start, end, names[index])
+
+        if record:
+            self._stats["local" if best else "escalated"] += 1
+        return best[2] if best else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._stats["local"] + self._stats["escalated"]
+        return {
+            **self._stats,
+            "local_fraction": round(self._stats["local"] / total, 4) if total else 0.0,
+            "place_names": len(self._names),
+            "delta_place_names": len(self._delta_names),
+            "gazetteer_path": self.path,
+            "built_at": self.built_at
+        }
+
+
+# Process-wide gazetteer, built on first use and refreshed as complaints arrive
+location_gazetteer = LocationGazetteer()
@@ -1,12 +1,19 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import logging
 import os
 import uuid
 from datetime import datetime
 
+import numpy as np
+
 from app.utils.document_processor import DocumentProcessor
 from app.vector_store.chroma_store import ChromaVectorStore
 from app.llm.gemini_client import GeminiClient
+from app.rag_modules.department_router import DepartmentRoute, department_router
+from app.rag_modules.location_gazetteer import location_gazetteer
+from app.rag_modules.relevance_filter import relevance_filter
+from app.rag_modules.urgency_model import urgency_model
 from app.rag_config import Config
 
 logger = logging.getLogger(__name__)
@@ -14,38 +21,142 @@ logger = logging.getLogger(__name__)
 class RAGPipeline:
     """Main RAG pipeline for complaint processing."""
     
-    def __init__(self):
+    def __init__(self, vector_store: Optional[ChromaVectorStore] = None, llm_client: Optional[GeminiClient] = None):
         self.document_processor = DocumentProcessor()
-        self.vector_store = ChromaVectorStore()
-        self.llm_client = GeminiClient()
+        self.vector_store = vector_store if vector_store is not None else ChromaVectorStore()
+        self.llm_client = llm_client if llm_client is not None else GeminiClient()
         
         # Ensure upload directory exists
         os.makedirs(Config.UPLOAD_DIR, exist_ok=True)
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Normalized sentence embedding shared by the local models (None if encoding fails)."""
+        try:
+            encoder = self.vector_store.embedding_model
+            return np.asarray(encoder.encode([text], normalize_embeddings=True)[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Embedding for local analysis failed, deferring to the LLM: {str(e)}")
+            return None
+
+    def _local_relevance(self, text: str) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """Local relevance decision (None when ambiguous) and the text's embedding for reuse."""
+        if not Config.RELEVANCE_FILTER_ENABLED:
+            return None, None
+        embedding = self._embed(text)
+        try:
+            if embedding is not None:
+                relevance_filter.ensure_built(self.vector_store.embedding_model)
+            return relevance_filter.check(text, embedding), embedding
+        except Exception as e:
+            logger.warning(f"Local relevance check failed, deferring to the LLM: {str(e)}")
+            return None, embedding
+
+    def _local_analysis(self, text: str, embedding: Optional[np.ndarray] = None) -> Tuple[Dict[str, Any], Optional[DepartmentRoute]]:
+        """Answer what the local models are confident about; the rest is left to the LLM."""
+        known: Dict[str, Any] = {}
+        route = None
+        if Config.LOCATION_GAZETTEER_ENABLED:
+            try:
+                location_gazetteer.ensure_built()
+                location = location_gazetteer.match(text)
+                if location:
+                    known["location"] = location
+            except Exception as e:
+                logger.warning(f"Gazetteer location match failed, deferring to the LLM: {str(e)}")
+
+        if not (Config.DEPARTMENT_ROUTER_ENABLED or urgency_model.loaded):
+            return known, route
+
+        try:
+            encoder = self.vector_store.embedding_model
+            if embedding is None:
+                embedding = np.asarray(encoder.encode([text], normalize_embeddings=True)[0], dtype=np.float32)
+
+            if Config.DEPARTMENT_ROUTER_ENABLED:
+                department_router.ensure_built(encoder)
+                route = department_router.route(text, embedding=embedding)
+                if route.confident:
+                    known["department"] = route.department
+
+            if urgency_model.loaded:
+                urgency, _, confident = urgency_model.predict(embedding, text)
+                if confident:
+                    known["urgency"] = urgency
+        except Exception as e:
+            logger.warning(f"Local analysis failed, deferring to the LLM: {str(e)}")
+
+        return known, route
+
+    def _rejected_result(self, text: str, relevance: Dict[str, Any]) -> Dict[str, Any]:
+        """Result for a submission rejected as irrelevant before any classification prompt ran."""
+        words = text.split()
+        summary = " ".join(words[:60]) + ("..." if len(words) > 60 else "")
+        result = self.llm_client._build_result(summary, "Low", "Municipality", "Location not specified")
+        result["sources"] = {"urgency": "fallback", "department": "fallback"}
+        result["relevance"] = relevance
+        return result
+
+    async def _analyze(self, cleaned_text: str) -> Dict[str, Any]:
+        """Check relevance first, then run the LLM analysis for the fields the local models left open.
+
+        Clear junk is rejected locally; in "multi" mode ambiguous text gets the LLM relevance
+        prompt before the four classification prompts (the "single" prompt answers relevance
+        in the same call). Long documents are classified from their map-reduce summary; in
+        both modes an ambiguous one is first judged from its head, so irrelevant uploads are
+        rejected before any chunk is summarized.
+        """
+        relevance, embedding = await asyncio.to_thread(self._local_relevance, cleaned_text)
+        long_document = len(cleaned_text) > Config.LONG_DOCUMENT_THRESHOLD_CHARS
+        if relevance is None and long_document:
+            relevance = await self.llm_client.assess_relevance(cleaned_text[:Config.LONG_DOCUMENT_SUMMARY_TARGET_CHARS])
+        elif relevance is None and Config.ANALYSIS_MODE == "multi":
+            relevance = await self.llm_client.assess_relevance(cleaned_text)
+        if relevance is not None and not relevance["is_relevant"]:
+            return self._rejected_result(cleaned_text, relevance)
+
+        analysis_text = cleaned_text
+        if long_document:
+            analysis_text = await self.llm_client.condense_long_document(cleaned_text)
+            embedding = None
+
+        known, route = await asyncio.to_thread(self._local_analysis, analysis_text, embedding)
+        if relevance is not None:
+            known["relevance"] = relevance
+
+        llm_result = await self.llm_client.process_complaint(analysis_text, include_relevance=True, known=known)
+
+        if route and not route.confident and llm_result["sources"]["department"] == "llm":
+            # Escalated complaints become new labeled examples for their department
+            # (never the default returned when the LLM failed)
+            department_router.learn(route.embedding, llm_result["department"])
+        return llm_result
     
-    def process_uploaded_file(self, file_path: str, filename: str) -> Dict[str, Any]:
+    async def process_uploaded_file(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Process an uploaded complaint file through the complete RAG pipeline."""
         try:
             logger.info(f"Processing file: {filename}")
             
-            # Step 1: Extract text from document
-            raw_text = self.document_processor.extract_text(file_path)
+            # Step 1: Extract text from document (PDF/OCR parsing is CPU bound)
+            raw_text = await asyncio.to_thread(self.document_processor.extract_text, file_path)
             cleaned_text = self.document_processor.clean_text(raw_text)
             
             if not cleaned_text.strip():
                 raise ValueError("No text content found in the document")
             
             # Step 2: Process with LLM for classification and summarization
-            llm_result = self.llm_client.process_complaint(cleaned_text)
-            relevance = self.llm_client.assess_relevance(cleaned_text)
+            llm_result = await self._analyze(cleaned_text)
+            relevance = llm_result["relevance"]
 
             base_response = {
                 "document_id": None,
                 "filename": filename,
                 "summary": llm_result["summary"],
                 "urgency": llm_result["urgency"],
+                "urgency_source": llm_result["sources"]["urgency"],
                 "color": llm_result["color"],
                 "emoji": llm_result["emoji"],
                 "department": llm_result["department"],
+                "department_source": llm_result["sources"]["department"],
                 "location": llm_result["location"],
                 "text_length": len(cleaned_text),
                 "upload_date": datetime.now().isoformat(),
@@ -79,7 +190,8 @@ class RAGPipeline:
                 "relevance_category": base_response["relevance_category"]
             }
             
-            doc_id = self.vector_store.add_document(
+            doc_id = await asyncio.to_thread(
+                self.vector_store.add_document,
                 text=cleaned_text,
                 metadata=metadata
             )
@@ -94,11 +206,16 @@ class RAGPipeline:
             logger.error(f"Error processing file {filename}: {str(e)}")
             raise
 
-    def process_text_complaint(self,
-                               title: str,
-                               description: str,
-                               metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Process a text-based complaint through the RAG pipeline."""
+    async def process_text_complaint(self,
+                                     title: str,
+                                     description: str,
+                                     metadata: Optional[Dict[str, Any]] = None,
+                                     document_id: Optional[str] = None) -> Dict[str, Any]:
+        """Process a text-based complaint through the RAG pipeline.
+
+        A stable ``document_id`` makes the vector store write an upsert, so
+        reprocessing the same complaint does not add a second document.
+        """
         try:
             combined_text = f"{title.strip()} {description.strip()}".strip()
 
@@ -111,8 +228,8 @@ class RAGPipeline:
                 raise ValueError("No meaningful content found in the complaint text")
 
             # Process with LLM for classification and summarization
-            llm_result = self.llm_client.process_complaint(cleaned_text)
-            relevance = self.llm_client.assess_relevance(cleaned_text)
+            llm_result = await self._analyze(cleaned_text)
+            relevance = llm_result["relevance"]
 
             base_metadata = {
                 "filename": f"text_submission_{uuid.uuid4().hex}.txt",
@@ -135,9 +252,11 @@ class RAGPipeline:
                 "document_id": None,
                 "summary": llm_result["summary"],
                 "urgency": llm_result["urgency"],
+                "urgency_source": llm_result["sources"]["urgency"],
                 "color": llm_result["color"],
                 "emoji": llm_result["emoji"],
                 "department": llm_result["department"],
+                "department_source": llm_result["sources"]["department"],
                 "location": llm_result["location"],
                 "text_length": len(cleaned_text),
                 "metadata": base_metadata,
@@ -156,9 +275,11 @@ class RAGPipeline:
                 )
                 return result
 
-            doc_id = self.vector_store.add_document(
+            doc_id = await asyncio.to_thread(
+                self.vector_store.add_document,
                 text=cleaned_text,
-                metadata=base_metadata
+                metadata=base_metadata,
+                doc_id=document_id
             )
 
             result["document_id"] = doc_id
@@ -0,0 +1,194 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import glob
+import json
+import logging
+import os
+
+import numpy as np
+
+from app.rag_config import Config
+from app.rag_modules.urgency_model import keyword_features
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_URGENCIES = ["low", "medium", "high", "critical"]
+ARTIFACT_PATTERN = "priority-*.npz"
+
+
+def load_priority_labels(limit: Optional[int] = None) -> List[Tuple[str, str, str, str, int]]:
+    """(complaint id, text, urgency, category, priority score) for complaints scored by the remote model.
+
+    Scores from the local model or the keyword fallback are skipped so the
+    regressor never trains on its own output.
+    """
+    from app.db import complaints_collection
+
+    cursor = complaints_collection.find(
+        {
+            "priority_score": {"$type": "number"},
+            "ai_category": {"$nin": [None, ""]},
+            "priority_source": {"$nin": ["local", "fallback"]}
+        },
+        {"id": 1, "title": 1, "description": 1, "urgency": 1, "ai_category": 1, "priority_score": 1}
+    ).sort("created_at", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    labeled = []
+    for complaint in cursor:
+        text = f"{complaint.get('title') or ''} {complaint.get('description') or ''}".strip()
+        if text:
+            labeled.append((
+                str(complaint.get("id") or complaint["_id"]),
+                text,
+                (complaint.get("urgency") or "medium").lower(),
+                complaint["ai_category"],
+                int(complaint["priority_score"])
+            ))
+    return labeled
+
+
+class PriorityModel:
+    """Bootstrap ensemble of ridge regressions predicting the 0-100 priority score.
+
+    Features are the sentence embedding, one-hot urgency and category, and the
+    keyword features of the urgency model. Trained offline by
+    ``train_priority_model.py`` on the scores the remote model assigned to
+    stored complaints and saved as a versioned ``.npz`` artifact. The spread of
+    the ensemble members' predictions is the uncertainty: above ``max_spread``
+    points the remote model scores the complaint instead.
+    """
+
+    def __init__(self,
+                 model_dir: str = Config.PRIORITY_MODEL_DIR,
+                 max_spread: float = Config.PRIORITY_MODEL_MAX_SPREAD):
+        self.model_dir = model_dir
+        self.max_spread = max_spread
+        self.categories: List[str] = []
+        self.weights: Optional[np.ndarray] = None
+        self.feature_mean: Optional[np.ndarray] = None
+        self.feature_std: Optional[np.ndarray] = None
+        self.metadata: Dict[str, Any] = {}
+        self._stats = {"local": 0, "escalated": 0}
+
+    @property
+    def loaded(self) -> bool:
+        return self.weights is not None
+
+    def _features(self, embeddings: np.ndarray, texts: List[str], urgencies: List[str], categories: List[str]) -> np.ndarray:
+        keywords = (keyword_features(texts) - self.feature_mean) / self.feature_std
+        urgency = np.array([[value == level for level in PRIORITY_URGENCIES] for value in urgencies], dtype=np.float32)
+        category = np.array([[value == known for known in self.categories] for value in categories], dtype=np.float32)
+        bias = np.ones((len(texts), 1), dtype=np.float32)
+        return np.hstack([np.asarray(embeddings, dtype=np.float32), keywords, urgency, category, bias])
+
+    def fit(self,
+            embeddings: np.ndarray,
+            texts: List[str],
+            urgencies: List[str],
+            categories: List[str],
+            scores: List[int],
+            members: int = 8,
+            l2: float = 1.0,
+            seed: int = 0) -> "PriorityModel":
+        """Closed-form ridge regression on ``members`` bootstrap resamples (the bias is not regularized)."""
+        keywords = keyword_features(texts)
+        self.feature_mean = keywords.mean(axis=0)
+        self.feature_std = np.maximum(keywords.std(axis=0), 1e-6)
+        self.categories = sorted(set(categories))
+
+        X = self._features(embeddings, texts, urgencies, categories).astype(np.float64)
+        y = np.asarray(scores, dtype=np.float64)
+        penalty = l2 * np.eye(X.shape[1])
+        penalty[-1, -1] = 0.0
+
+        rng = np.random.default_rng(seed)
+        weights = []
+        for _ in range(members):
+            sample = rng.integers(0, len(y), len(y))
+            Xs, ys = X[sample], y[sample]
+            weights.append(np.linalg.solve(Xs.T @ Xs + penalty, Xs.T @ ys))
+        self.weights = np.stack(weights, axis=1).astype(np.float32)
+        return self
+
+    def predict_members(self, embeddings: np.ndarray, texts: List[str], urgencies: List[str], categories: List[str]) -> np.ndarray:
+        """Every ensemble member's prediction, shape (complaints, members)."""
+        return self._features(embeddings, texts, urgencies, categories) @ self.weights
+
+    def predict(self, embedding: np.ndarray, text: str, urgency: str, category: str) -> Tuple[int, float, bool]:
+        """(score, spread, confident) for one complaint; ``confident`` gates the remote call."""
+        predictions = self.predict_members(embedding[None, :], [text], [(urgency or "medium").lower()], [category])[0]
+        mean = float(predictions.mean())
+        spread = float(predictions.std())
+        # Categories the model never saw have no one-hot weight; leave them to the remote model
+        confident = spread <= self.max_spread and 0.0 <= mean <= 100.0 and category in self.categories
+        self._stats["local" if confident else "escalated"] += 1
+        return int(round(min(100.0, max(0.0, mean)))), spread, confident
+
+    def save(self, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Write a new versioned artifact to ``model_dir`` and return its path."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        self.metadata = {
+            "version": version,
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "trained_at": datetime.utcnow().isoformat(),
+            **(metadata or {})
+        }
+        path = os.path.join(self.model_dir, f"priority-{version}.npz")
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as handle:
+            np.savez(
+                handle,
+                weights=self.weights,
+                feature_mean=self.feature_mean,
+                feature_std=self.feature_std,
+                categories=np.array(self.categories),
+                metadata=np.array(json.dumps(self.metadata))
+            )
+        os.replace(temp_path, path)
+        return path
+
+    def load(self, version: Optional[str] = Config.PRIORITY_MODEL_VERSION) -> bool:
+        """Load a pinned artifact version, or the newest one in ``model_dir``."""
+        if version:
+            path = os.path.join(self.model_dir, f"priority-{version}.npz")
+        else:
+            artifacts = sorted(glob.glob(os.path.join(self.model_dir, ARTIFACT_PATTERN)))
+            if not artifacts:
+                logger.info(f"No priority model artifact in {self.model_dir}; priority scores stay with the remote model")
+                return False
+            path = artifacts[-1]
+
+        try:
+            with np.load(path) as artifact:
+                metadata = json.loads(str(artifact["metadata"]))
+                if metadata.get("embedding_model") != Config.EMBEDDING_MODEL:
+                    logger.warning(f"Priority model {path} was trained on {metadata.get('embedding_model')}, skipping")
+                    return False
+                self.weights = artifact["weights"]
+                self.feature_mean = artifact["feature_mean"]
+                self.feature_std = artifact["feature_std"]
+                self.categories = [str(label) for label in artifact["categories"]]
+                self.metadata = metadata
+        except Exception as e:
+            logger.error(f"Failed to load priority model {path}: {str(e)}")
+            return False
+
+        logger.info(f"Loaded priority model version {self.metadata.get('version')} from {path}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._stats["local"] + self._stats["escalated"]
+        return {
+            **self._stats,
+            "local_fraction": round(self._stats["local"] / total, 4) if total else 0.0,
+            "max_spread": self.max_spread,
+            "loaded": self.loaded,
+            "metadata": self.metadata
+        }
+
+
+# Process-wide model, loaded from the newest artifact at startup
+priority_model = PriorityModel()
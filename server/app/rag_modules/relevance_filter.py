@@ -0,0 +1,168 @@
+from typing import Any, Dict, Optional
+import logging
+import re
+import threading
+
+import numpy as np
+
+from app.ai_service import CRITICAL_KEYWORDS
+from app.rag_config import Config
+from app.rag_modules.similarity import top_mean
+
+logger = logging.getLogger(__name__)
+
+CIVIC_EXEMPLARS = [
+    "There is a large pothole on the main road that has caused several accidents.",
+    "Garbage has not been collected from our street for two weeks and it smells terrible.",
+    "The water supply in our area has been cut off for three days without notice.",
+    "Street lights on our lane are not working and it is unsafe to walk at night.",
+    "Sewage is overflowing onto the road near the bus stop.",
+    "The government hospital has no doctors available in the emergency ward.",
+    "An official at the municipal office demanded a bribe to process my permit.",
+    "Illegal dumping of construction waste in the public park.",
+    "Frequent power cuts in our colony for the last month.",
+    "The school building roof is leaking and classrooms are flooded.",
+    "Traffic signal at the junction has been broken for a week causing jams.",
+    "Stray dogs are attacking children near the community center.",
+    "Factory smoke is polluting the air in the residential neighborhood.",
+    "The drainage is blocked and rainwater floods the houses every time it rains.",
+    "My birth certificate application has been pending at the office for months.",
+    "Police are not responding to repeated complaints of theft in our area.",
+    "Mosquito breeding in stagnant water near the market, dengue cases are rising.",
+    "The bridge railing is broken and vehicles could fall into the river.",
+    "Public toilets in the market are dirty and not maintained.",
+    "The bus service on our route has been stopped without any announcement."
+]
+
+NON_CIVIC_EXEMPLARS = [
+    "Curriculum vitae: experienced software engineer with skills in Python and Java, seeking a new role.",
+    "Objective: to obtain a challenging position. Education: B.Tech. Work experience: 5 years.",
+    "I am writing to apply for the job opening at your company, please find my resume attached.",
+    "Huge discount! Buy now and get 50% off on all products, limited time offer.",
+    "Visit our website for the best deals on phones, free shipping on every order.",
+    "Earn money from home, click the link to join our program today.",
+    "Why did the chicken cross the road? To get to the other side!",
+    "Hello, how are you doing today? Just saying hi.",
+    "My biography: I was born in 1990, I enjoy reading, cricket and travelling.",
+    "Please like and share my new music video on social media.",
+    "Test test testing this form.",
+    "Happy birthday to my best friend, have a wonderful day!",
+    "Looking for a roommate, rent is affordable, contact me for details.",
+    "Our restaurant is now open, try our special pizza this weekend.",
+    "What is the capital of France and who won the football match yesterday?",
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+    "I want to invest in cryptocurrency, can someone give me tips?",
+    "Selling a used car in excellent condition, low mileage, best price.",
+    "Here is an essay about the history of the Roman empire.",
+    "Thank you for your service, have a nice day."
+]
+
+# Lexical markers of the submission types the relevance prompt is told to reject
+JUNK_PATTERNS = {
+    "resume": re.compile(r"\b(curriculum vitae|resume|objective\s*:|work experience|skills\s*:|references available|"
+                         r"date of birth|marital status|years of experience)\b", re.IGNORECASE),
+    "advertisement": re.compile(r"(\bbuy now\b|\bdiscount\b|\d+\s*% off|\blimited (time )?offer\b|\bfree shipping\b|"
+                                r"\bcall now\b|\bvisit our\b|\bbest price\b|\bclick (the|this) link\b|https?://)", re.IGNORECASE),
+    "job inquiry": re.compile(r"\b(apply for the (job|position)|job opening|hiring|vacancy|internship)\b", re.IGNORECASE)
+}
+CIVIC_KEYWORDS = sorted({
+    *CRITICAL_KEYWORDS,
+    "complaint", "municipal", "government", "public", "road", "pothole", "garbage", "waste", "water", "sewage",
+    "drain", "electricity", "power", "street light", "streetlight", "traffic", "bus", "hospital", "school",
+    "police", "bribe", "corruption", "pollution", "sanitation", "toilet", "permit", "certificate", "officer",
+    "department", "repair", "not working", "overflow", "stray", "dumping", "supply"
+})
+# Keywords match at word starts, so "potholes" counts and "business" does not
+CIVIC_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in CIVIC_KEYWORDS) + ")", re.IGNORECASE)
+
+
+class RelevanceFilter:
+    """Local first pass of the civic relevance check.
+
+    Combines lexical heuristics (too short, résumé/advert markers, civic
+    keywords) with embedding similarity to civic and non-civic exemplar
+    sentences. Only clear cases are decided locally; ``check`` returns None for
+    ambiguous text, which the caller sends to the LLM.
+    """
+
+    def __init__(self,
+                 accept_margin: float = Config.RELEVANCE_FILTER_ACCEPT_MARGIN,
+                 reject_margin: float = Config.RELEVANCE_FILTER_REJECT_MARGIN,
+                 min_words: int = Config.RELEVANCE_FILTER_MIN_WORDS):
+        self.accept_margin = accept_margin
+        self.reject_margin = reject_margin
+        self.min_words = min_words
+        self._civic: Optional[np.ndarray] = None
+        self._non_civic: Optional[np.ndarray] = None
+        self._build_lock = threading.Lock()
+        self._stats = {"accepted": 0, "rejected": 0, "escalated": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self._civic is not None
+
+    def ensure_built(self, encoder) -> None:
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                civic = np.asarray(encoder.encode(CIVIC_EXEMPLARS, normalize_embeddings=True), dtype=np.float32)
+                self._non_civic = np.asarray(encoder.encode(NON_CIVIC_EXEMPLARS, normalize_embeddings=True), dtype=np.float32)
+                self._civic = civic
+
+    @staticmethod
+    def _decision(is_relevant: bool, confidence: float, category: str, reason: str) -> Dict[str, Any]:
+        # Same shape as GeminiClient.assess_relevance, plus where the decision came from
+        return {
+            "is_relevant": is_relevant,
+            "confidence": round(max(0.0, min(0.99, confidence)), 2),
+            "category": category,
+            "reason": reason,
+            "source": "local"
+        }
+
+    def check(self, text: str, embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Relevance decided locally, or None when the text is ambiguous and needs the LLM."""
+        decision = self._check(text, embedding)
+        if decision is None:
+            self._stats["escalated"] += 1
+        else:
+            self._stats["accepted" if decision["is_relevant"] else "rejected"] += 1
+        return decision
+
+    def _check(self, text: str, embedding: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+        words = re.findall(r"[^\W\d_]{2,}", text)
+        if len(words) < self.min_words:
+            return self._decision(False, 0.95, "too short", "The submission is too short to describe an actionable issue.")
+
+        junk = [label for label, pattern in JUNK_PATTERNS.items() if len(pattern.findall(text)) >= 2]
+        civic_hits = len(set(match.lower() for match in CIVIC_PATTERN.findall(text)))
+        if junk and civic_hits == 0:
+            return self._decision(False, 0.9, junk[0], f"The text reads like a {junk[0]}, not a civic complaint.")
+
+        if embedding is None or not self.ready:
+            return None
+
+        margin = top_mean(self._civic @ embedding) - top_mean(self._non_civic @ embedding)
+        if margin <= -self.reject_margin and civic_hits == 0:
+            return self._decision(False, 0.75 + abs(margin), "non-civic",
+                                  "The text is closest to non-civic submissions and mentions no public issue.")
+        if margin >= self.accept_margin and civic_hits >= 1 and not junk:
+            return self._decision(True, 0.75 + margin, "civic complaint",
+                                  "The text describes an issue for a public department.")
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = sum(self._stats.values())
+        local = self._stats["accepted"] + self._stats["rejected"]
+        return {
+            **self._stats,
+            "local_fraction": round(local / total, 4) if total else 0.0,
+            "accept_margin": self.accept_margin,
+            "reject_margin": self.reject_margin,
+            "min_words": self.min_words
+        }
+
+
+# Process-wide filter; exemplar embeddings are built on first use with the pipeline's embedding model
+relevance_filter = RelevanceFilter()
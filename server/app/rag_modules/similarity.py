@@ -0,0 +1,7 @@
+import numpy as np
+
+
+def top_mean(similarities: np.ndarray, k: int = 3) -> float:
+    """Mean of the ``k`` highest similarities, shared by the exemplar-based local classifiers."""
+    k = min(k, similarities.shape[0])
+    return float(np.sort(similarities)[-k:].mean())
@@ -0,0 +1,197 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import glob
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+from app.ai_service import CRITICAL_KEYWORDS, IMPACT_KEYWORDS
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+URGENCY_CLASSES = ["High", "Medium", "Low"]
+ARTIFACT_PATTERN = "urgency-*.npz"
+
+
+def load_urgency_labels(limit: Optional[int] = None) -> List[Tuple[str, str, str]]:
+    """(complaint id, text, urgency) for stored complaints with an LLM urgency label.
+
+    Urgencies predicted by the local model or defaulted after an LLM failure
+    are skipped so the model never trains on its own output.
+    """
+    from app.db import complaints_collection
+
+    cursor = complaints_collection.find(
+        {"rag_urgency": {"$in": URGENCY_CLASSES}, "rag_urgency_source": {"$nin": ["local", "fallback"]}},
+        {"id": 1, "title": 1, "description": 1, "rag_urgency": 1}
+    ).sort("created_at", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    labeled = []
+    for complaint in cursor:
+        text = f"{complaint.get('title') or ''} {complaint.get('description') or ''}".strip()
+        if text:
+            labeled.append((str(complaint.get("id") or complaint["_id"]), text, complaint["rag_urgency"]))
+    return labeled
+
+
+def keyword_features(texts: List[str]) -> np.ndarray:
+    """Hand-written urgency signals appended to the sentence embedding."""
+    rows = []
+    for text in texts:
+        lowered = text.lower()
+        words = re.findall(r"[a-z']+", lowered)
+        rows.append([
+            sum(keyword in lowered for keyword in CRITICAL_KEYWORDS),
+            sum(keyword in words for keyword in IMPACT_KEYWORDS),
+            text.count("!"),
+            np.log1p(len(words))
+        ])
+    return np.asarray(rows, dtype=np.float32)
+
+
+class UrgencyModel:
+    """Softmax regression over sentence embeddings plus keyword features.
+
+    Trained offline by ``train_urgency_model.py`` from the ``rag_urgency``
+    labels stored on complaints and saved as a versioned ``.npz`` artifact.
+    Predictions below ``min_confidence`` are left to the LLM.
+    """
+
+    def __init__(self,
+                 model_dir: str = Config.URGENCY_MODEL_DIR,
+                 min_confidence: float = Config.URGENCY_MODEL_MIN_CONFIDENCE):
+        self.model_dir = model_dir
+        self.min_confidence = min_confidence
+        self.classes: List[str] = list(URGENCY_CLASSES)
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+        self.feature_mean: Optional[np.ndarray] = None
+        self.feature_std: Optional[np.ndarray] = None
+        self.metadata: Dict[str, Any] = {}
+        self._stats = {"local": 0, "escalated": 0}
+
+    @property
+    def loaded(self) -> bool:
+        return self.weights is not None
+
+    def _features(self, embeddings: np.ndarray, texts: List[str]) -> np.ndarray:
+        keywords = (keyword_features(texts) - self.feature_mean) / self.feature_std
+        return np.hstack([np.asarray(embeddings, dtype=np.float32), keywords])
+
+    def fit(self,
+            embeddings: np.ndarray,
+            texts: List[str],
+            labels: List[str],
+            epochs: int = 500,
+            learning_rate: float = 0.5,
+            l2: float = 1e-3) -> "UrgencyModel":
+        """Full-batch gradient descent with class-balanced weights."""
+        keywords = keyword_features(texts)
+        self.feature_mean = keywords.mean(axis=0)
+        self.feature_std = np.maximum(keywords.std(axis=0), 1e-6)
+
+        X = self._features(embeddings, texts)
+        y = np.array([self.classes.index(label) for label in labels])
+        targets = np.eye(len(self.classes), dtype=np.float32)[y]
+        counts = np.bincount(y, minlength=len(self.classes)).astype(np.float32)
+        sample_weights = (len(y) / (len(self.classes) * np.maximum(counts, 1)))[y][:, None]
+
+        self.weights = np.zeros((X.shape[1], len(self.classes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.classes), dtype=np.float32)
+        for _ in range(epochs):
+            error = (self._softmax(X @ self.weights + self.bias) - targets) * sample_weights / len(y)
+            self.weights -= learning_rate * (X.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, embeddings: np.ndarray, texts: List[str]) -> np.ndarray:
+        return self._softmax(self._features(embeddings, texts) @ self.weights + self.bias)
+
+    def predict(self, embedding: np.ndarray, text: str) -> Tuple[str, float, bool]:
+        """(urgency, confidence, confident) for one complaint; ``confident`` gates the LLM call."""
+        probabilities = self.predict_proba(embedding[None, :], [text])[0]
+        best = int(probabilities.argmax())
+        confidence = float(probabilities[best])
+        confident = confidence >= self.min_confidence
+        self._stats["local" if confident else "escalated"] += 1
+        return self.classes[best], confidence, confident
+
+    def save(self, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Write a new versioned artifact to ``model_dir`` and return its path."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        self.metadata = {
+            "version": version,
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "trained_at": datetime.utcnow().isoformat(),
+            **(metadata or {})
+        }
+        path = os.path.join(self.model_dir, f"urgency-{version}.npz")
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as handle:
+            np.savez(
+                handle,
+                weights=self.weights,
+                bias=self.bias,
+                feature_mean=self.feature_mean,
+                feature_std=self.feature_std,
+                classes=np.array(self.classes),
+                metadata=np.array(json.dumps(self.metadata))
+            )
+        os.replace(temp_path, path)
+        return path
+
+    def load(self, version: Optional[str] = Config.URGENCY_MODEL_VERSION) -> bool:
+        """Load a pinned artifact version, or the newest one in ``model_dir``."""
+        if version:
+            path = os.path.join(self.model_dir, f"urgency-{version}.npz")
+        else:
+            artifacts = sorted(glob.glob(os.path.join(self.model_dir, ARTIFACT_PATTERN)))
+            if not artifacts:
+                logger.info(f"No urgency model artifact in {self.model_dir}; urgency stays with the LLM")
+                return False
+            path = artifacts[-1]
+
+        try:
+            with np.load(path) as artifact:
+                metadata = json.loads(str(artifact["metadata"]))
+                if metadata.get("embedding_model") != Config.EMBEDDING_MODEL:
+                    logger.warning(f"Urgency model {path} was trained on {metadata.get('embedding_model')}, skipping")
+                    return False
+                self.weights = artifact["weights"]
+                self.bias = artifact["bias"]
+                self.feature_mean = artifact["feature_mean"]
+                self.feature_std = artifact["feature_std"]
+                self.classes = [str(label) for label in artifact["classes"]]
+                self.metadata = metadata
+        except Exception as e:
+            logger.error(f"Failed to load urgency model {path}: {str(e)}")
+            return False
+
+        logger.info(f"Loaded urgency model version {self.metadata.get('version')} from {path}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._stats["local"] + self._stats["escalated"]
+        return {
+            **self._stats,
+            "local_fraction": round(self._stats["local"] / total, 4) if total else 0.0,
+            "min_confidence": self.min_confidence,
+            "loaded": self.loaded,
+            "metadata": self.metadata
+        }
+
+
+# Process-wide model, loaded from the newest artifact at startup
+urgency_model = UrgencyModel()
@@ -0,0 +1,202 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from pymongo import UpdateOne
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+# Accepted complaints that never made it into the vector store (e.g. failed or imported ones).
+# Rejected submissions must stay out of the similarity index, and "processing" ones
+# are indexed by their enrichment job.
+BACKFILL_QUERY = {"vector_db_id": {"$in": [None, ""]}, "status": {"$nin": ["rejected", "processing"]}}
+BACKFILL_PROJECTION = {
+    "id": 1, "title": 1, "description": 1, "category": 1, "location": 1,
+    "status": 1, "urgency": 1, "user_id": 1, "created_at": 1
+}
+
+
+def complaint_vector_id(complaint_id: str) -> str:
+    """Vector store id of a complaint, derived from its id so every write of it is an upsert."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"complaint:{complaint_id}"))
+
+
+def complaint_document(complaint: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """(vector id, text, metadata) for a stored complaint, or None when it has no text.
+
+    The vector id is derived from the complaint id, so re-running a backfill
+    overwrites instead of duplicating.
+    """
+    complaint_id = str(complaint.get("id") or complaint["_id"])
+    title = (complaint.get("title") or "").strip()
+    description = (complaint.get("description") or "").strip()
+    text = f"{title}\n\n{description}".strip()
+    if not text:
+        return None
+
+    created_at = complaint.get("created_at")
+    metadata = {
+        "complaint_id": complaint_id,
+        "title": title,
+        "category": complaint.get("category"),
+        "location": complaint.get("location"),
+        "status": complaint.get("status"),
+        "urgency": complaint.get("urgency"),
+        "user_id": complaint.get("user_id"),
+        "upload_date": created_at.isoformat() if isinstance(created_at, datetime) else datetime.now().isoformat(),
+        "source": "backfill"
+    }
+    # Chroma metadata values must be scalars
+    metadata = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                for key, value in metadata.items() if value is not None}
+    return complaint_vector_id(complaint_id), text, metadata
+
+
+def count_pending(complaints_collection=None) -> int:
+    if complaints_collection is None:
+        from app.db import complaints_collection
+    return complaints_collection.count_documents(BACKFILL_QUERY)
+
+
+def backfill_vector_store(vector_store,
+                          batch_size: int = Config.VECTOR_BATCH_SIZE,
+                          limit: Optional[int] = None,
+                          complaints_collection=None,
+                          on_batch: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Stream complaints without a ``vector_db_id`` into the vector store in batches.
+
+    Each batch is encoded and written with ``add_documents`` and the vector
+    ids are then saved back on the complaints. ``docs_per_sec`` covers
+    encoding and vector-store writes; ``overall_docs_per_sec`` includes
+    reading and updating MongoDB.
+    """
+    if complaints_collection is None:
+        from app.db import complaints_collection
+
+    cursor = complaints_collection.find(BACKFILL_QUERY, BACKFILL_PROJECTION).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    stats = {"indexed": 0, "skipped": 0, "batches": 0, "ingest_seconds": 0.0}
+    started = time.perf_counter()
+    batch: List[Tuple[Any, str, str, Dict[str, Any]]] = []
+
+    def flush() -> None:
+        ingest_started = time.perf_counter()
+        ids = vector_store.add_documents(
+            [text for _, _, text, _ in batch],
+            [metadata for _, _, _, metadata in batch],
+            [doc_id for _, doc_id, _, _ in batch],
+            batch_size=batch_size
+        )
+        stats["ingest_seconds"] += time.perf_counter() - ingest_started
+        complaints_collection.bulk_write(
+            [UpdateOne({"_id": key}, {"$set": {"vector_db_id": doc_id}}) for (key, _, _, _), doc_id in zip(batch, ids)],
+            ordered=False
+        )
+        stats["indexed"] += len(batch)
+        stats["batches"] += 1
+        batch.clear()
+        if on_batch is not None:
+            on_batch(stats)
+
+    for complaint in cursor:
+        document = complaint_document(complaint)
+        if document is None:
+            stats["skipped"] += 1
+            continue
+        batch.append((complaint["_id"], *document))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        "batch_size": batch_size,
+        "ingest_seconds": round(stats["ingest_seconds"], 3),
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(stats["indexed"] / stats["ingest_seconds"], 1) if stats["ingest_seconds"] else 0.0,
+        "overall_docs_per_sec": round(stats["indexed"] / elapsed, 1) if elapsed else 0.0
+    })
+    logger.info(
+        f"Backfilled {stats['indexed']} complaints into the vector store "
+        f"({stats['docs_per_sec']} docs/sec, {stats['skipped']} skipped)"
+    )
+    return stats
+
+
+class BackfillRunner:
+    """Runs an admin-triggered backfill in a worker thread, one at a time per process.
+
+    The HTTP request only starts the run; progress after every batch, the
+    final stats or the error are kept for the status endpoint. Overlapping
+    runs in other workers are harmless (vector ids are derived from complaint
+    ids), just wasted encoding.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._cancel = threading.Event()
+        self._started_at: Optional[datetime] = None
+        self._finished_at: Optional[datetime] = None
+        self._progress: Optional[Dict[str, Any]] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _on_batch(self, stats: Dict[str, Any]) -> None:
+        self._progress = dict(stats)
+        if self._cancel.is_set():
+            raise RuntimeError("Backfill cancelled")
+
+    async def _run(self, vector_store, batch_size: int, limit: Optional[int]) -> None:
+        try:
+            self._result = await asyncio.to_thread(
+                backfill_vector_store, vector_store, batch_size, limit, on_batch=self._on_batch
+            )
+        except Exception as e:
+            logger.error(f"Vector store backfill failed: {str(e)}")
+            self._error = str(e)
+        finally:
+            self._finished_at = datetime.utcnow()
+
+    def start(self, vector_store, batch_size: int = Config.VECTOR_BATCH_SIZE, limit: Optional[int] = None) -> bool:
+        """Start a backfill in the background; False if one is already running."""
+        if self.running:
+            return False
+        self._cancel.clear()
+        self._started_at, self._finished_at = datetime.utcnow(), None
+        self._progress = self._result = self._error = None
+        self._task = asyncio.create_task(self._run(vector_store, batch_size, limit))
+        return True
+
+    async def stop(self) -> None:
+        """Stop after the current batch (called on shutdown)."""
+        if self._task is not None:
+            self._cancel.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self._started_at.isoformat() if self._started_at else None,
+            "finished_at": self._finished_at.isoformat() if self._finished_at else None,
+            "progress": self._progress,
+            "result": self._result,
+            "error": self._error
+        }
+
+
+# Process-wide runner behind the admin backfill endpoints
+backfill_runner = BackfillRunner()
@@ -12,6 +12,8 @@ import logging
 from datetime import datetime
 
 from app.rag_modules.pipeline import RAGPipeline
+from app.registry import get_rag_pipeline, get_vector_store
+from app.vector_store.chroma_store import ChromaVectorStore
 from app.auth_utils import get_current_user
 from app.db import complaints_collection
 from app.models import User
@@ -42,9 +44,6 @@ def get_user_value(user: Any, primary_key: str, fallback_keys: Optional[List[str
             return value
     return default
 
-# Initialize RAG Pipeline
-rag_pipeline = RAGPipeline()
-
 # Upload directory
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -84,7 +83,8 @@ def is_allowed_file(filename: str) -> bool:
 @router.post("/upload", response_model=Dict[str, Any])
 async def upload_complaint_document(
     file: UploadFile = File(...),
-    current_user: Any = Depends(get_current_user)
+    current_user: Any = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Upload a complaint document (PDF, DOCX, Image) for RAG processing
@@ -118,7 +118,7 @@ async def upload_complaint_document(
         # Process through RAG pipeline
         try:
             logger.info(f"Starting RAG processing for: {safe_filename}")
-            rag_result = rag_pipeline.process_uploaded_file(file_path, safe_filename)
+            rag_result = await rag_pipeline.process_uploaded_file(file_path, safe_filename)
             logger.info(f"RAG processing completed successfully")
         except Exception as rag_error:
             logger.error(f"RAG pipeline error: {str(rag_error)}", exc_info=True)
@@ -191,7 +191,8 @@ async def upload_complaint_document(
 @router.post("/search", response_model=List[Dict[str, Any]])
 async def search_similar_complaints(
     search_request: SearchRequest,
-    current_user: Any = Depends(get_current_user)
+    current_user: Any = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Search for similar complaints using semantic search (RAG)
@@ -217,7 +218,8 @@ async def search_similar_complaints(
 @router.get("/complaint/{document_id}", response_model=Dict[str, Any])
 async def get_complaint_details(
     document_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Get detailed information about a specific complaint from vector database
@@ -239,7 +241,8 @@ async def get_complaint_details(
 
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_rag_statistics(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Get statistics from RAG vector database
@@ -257,7 +260,8 @@ async def get_rag_statistics(
 @router.post("/analyze-text", response_model=Dict[str, Any])
 async def analyze_complaint_text(
     request: ComplaintTextRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Analyze complaint text and find similar past complaints
@@ -289,7 +293,8 @@ async def analyze_complaint_text(
 @router.post("/add-to-vector-db", response_model=Dict[str, Any])
 async def add_complaint_to_vector_db(
     complaint_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    vector_store: ChromaVectorStore = Depends(get_vector_store)
 ):
     """
     Add an existing text-based complaint to the vector database
@@ -317,8 +322,6 @@ async def add_complaint_to_vector_db(
         }
         
         # Add to vector store
-        from app.vector_store.chroma_store import ChromaVectorStore
-        vector_store = ChromaVectorStore()
         doc_id = vector_store.add_document(text=text, metadata=metadata)
         
         # Update MongoDB with vector_db_id
@@ -344,7 +347,7 @@ async def add_complaint_to_vector_db(
 
 
 @router.get("/health")
-async def rag_health_check():
+async def rag_health_check(rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
     """
     Health check endpoint for RAG service
     """
@@ -375,7 +378,7 @@ class PublicAnalyzeRequest(BaseModel):
 
 
 @router.post("/public/analyze-text", response_model=Dict[str, Any])
-async def public_analyze_text(request: PublicAnalyzeRequest):
+async def public_analyze_text(request: PublicAnalyzeRequest, rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
     """
     Public endpoint to analyze complaint text and find similar complaints
     Used by citizens while filling out complaint forms (no authentication required)
@@ -429,7 +432,7 @@ class PublicComplaintData(BaseModel):
 
 
 @router.post("/public/add-to-vector-db", response_model=Dict[str, Any])
-async def public_add_to_vector_db(complaint: PublicComplaintData):
+async def public_add_to_vector_db(complaint: PublicComplaintData, rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
     """
     Public endpoint to add a complaint to the vector database
     Used after citizen submits a complaint (no authentication required for simplicity)
@@ -0,0 +1,161 @@
+from typing import Any, Dict, Optional
+import logging
+import os
+import sys
+import threading
+import time
+
+from app.rag_config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def resident_memory_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (peak RSS where the current value is unavailable)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class ServiceRegistry:
+    """One embedding model, vector store, Gemini client, AI service and RAG pipeline per process.
+
+    Everything is built on first use, so scripts and background jobs work
+    without the app; the FastAPI lifespan calls ``load`` to build it all at
+    startup and run a warm-up encode. Routes receive the instances through the
+    ``get_*`` dependencies below. Load times and resident memory are kept for
+    ``/metrics`` and the admin status endpoint.
+    """
+
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._load_seconds: Dict[str, float] = {}
+        self._rss_mb: Dict[str, Optional[float]] = {"initial": resident_memory_mb()}
+        self._warmup_ms: Optional[float] = None
+
+    def _get(self, name: str, factory) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = factory()
+                self._load_seconds[name] = round(time.perf_counter() - started, 3)
+                logger.info(f"Loaded {name} in {self._load_seconds[name]:.2f}s")
+            return self._instances[name]
+
+    @property
+    def embedding_model(self):
+        def build():
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(Config.EMBEDDING_MODEL)
+        return self._get("embedding_model", build)
+
+    @property
+    def vector_store(self):
+        def build():
+            from app.vector_store.chroma_store import ChromaVectorStore
+            return ChromaVectorStore(embedding_model=self.embedding_model)
+        return self._get("vector_store", build)
+
+    @property
+    def gemini_client(self):
+        def build():
+            from app.llm.gemini_client import GeminiClient
+            return GeminiClient()
+        return self._get("gemini_client", build)
+
+    @property
+    def ai_service(self):
+        def build():
+            from app.ai_service import AIService
+            return AIService(encoder=self.embedding_model)
+        return self._get("ai_service", build)
+
+    @property
+    def rag_pipeline(self):
+        def build():
+            from app.rag_modules.pipeline import RAGPipeline
+            return RAGPipeline(vector_store=self.vector_store, llm_client=self.gemini_client)
+        return self._get("rag_pipeline", build)
+
+    def warm_up(self) -> float:
+        """Encode a sample sentence so the first request does not pay for lazy initialization; returns milliseconds."""
+        started = time.perf_counter()
+        self.embedding_model.encode(["Warm-up: streetlight not working on the main road"], normalize_embeddings=True)
+        self._warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        return self._warmup_ms
+
+    def load(self, warm_up: bool = Config.SERVICE_WARMUP_ENABLED) -> None:
+        """Build every shared service (blocking; the lifespan runs it in a worker thread)."""
+        started = time.perf_counter()
+        self.embedding_model
+        self._rss_mb["after_embedding_model"] = resident_memory_mb()
+        self.rag_pipeline
+        self.ai_service
+        if warm_up:
+            self.warm_up()
+        self._rss_mb["after_startup"] = resident_memory_mb()
+        logger.info(
+            f"Shared services ready in {time.perf_counter() - started:.2f}s "
+            f"(embedding model {self._load_seconds.get('embedding_model', 0):.2f}s, RSS {self._rss_mb['after_startup']} MB)"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": sorted(self._instances),
+            "load_seconds": dict(self._load_seconds),
+            "warmup_ms": self._warmup_ms,
+            "rss_mb": {**self._rss_mb, "current": resident_memory_mb()},
+            "pid": os.getpid()
+        }
+
+    def prometheus(self) -> str:
+        """Load time and resident memory gauges in Prometheus text format."""
+        lines = ["# HELP service_load_seconds Time taken to build each shared service.",
+                 "# TYPE service_load_seconds gauge"]
+        for name, seconds in sorted(self._load_seconds.items()):
+            lines.append(f'service_load_seconds{{service="{name}"}} {seconds}')
+        rss = resident_memory_mb()
+        if rss is not None:
+            lines += ["# HELP process_resident_memory_bytes Resident memory of the API process.",
+                      "# TYPE process_resident_memory_bytes gauge",
+                      f"process_resident_memory_bytes {int(rss * 1024 * 1024)}"]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, loaded by the FastAPI lifespan
+services = ServiceRegistry()
+
+
+def get_embedding_model():
+    return services.embedding_model
+
+
+def get_vector_store():
+    return services.vector_store
+
+
+def get_gemini_client():
+    return services.gemini_client
+
+
+def get_ai_service():
+    return services.ai_service
+
+
+def get_rag_pipeline():
+    return services.rag_pipeline
@@ -1,6 +1,7 @@
 import os
+import re
 from docx import Document
-from typing import Optional
+from typing import List, Optional
 import logging
 from PIL import Image
 import io
@@ -185,3 +186,51 @@ class DocumentProcessor:
         text = re.sub(r'\s+', ' ', text)
         
         return text.strip()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough LLM token count (about four characters per token for English text)."""
+        return (len(text) + 3) // 4
+
+    @classmethod
+    def chunk_text(cls, text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+        """Split text into sentence-aligned chunks of at most ``max_tokens`` estimated tokens.
+
+        Consecutive chunks share about ``overlap_tokens`` of trailing context so facts
+        straddling a boundary are not lost.
+        """
+        max_chars = max_tokens * 4
+        overlap_chars = overlap_tokens * 4
+
+        sentences = []
+        for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+            # Hard-split run-on "sentences" (OCR output, tables) on word boundaries
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                sentences.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                sentences.append(sentence)
+
+        chunks: List[str] = []
+        current: List[str] = []
+        current_chars = 0
+        for sentence in sentences:
+            if current and current_chars + len(sentence) + 1 > max_chars:
+                chunks.append(' '.join(current))
+                # Carry the last sentences over as overlap
+                carried: List[str] = []
+                carried_chars = 0
+                for previous in reversed(current):
+                    if carried_chars + len(previous) + 1 > overlap_chars or carried_chars + len(previous) + len(sentence) + 2 > max_chars:
+                        break
+                    carried.insert(0, previous)
+                    carried_chars += len(previous) + 1
+                current, current_chars = carried, carried_chars
+            current.append(sentence)
+            current_chars += len(sentence) + 1
+
+        if current:
+            chunks.append(' '.join(current))
+        return chunks
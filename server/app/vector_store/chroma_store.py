@@ -11,24 +11,29 @@ from typing import List, Dict, Any, Optional
 import logging
 import json
 import os
-import numpy as np
 from app.rag_config import Config
+from app.vector_store.matrix_store import MatrixVectorStore
+from app.vector_store.mmap_store import PersistentMatrixStore
+from app.vector_store.ivf_index import IVFIndex
 
 logger = logging.getLogger(__name__)
 
+PERSIST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "chroma_db")
+
 class ChromaVectorStore:
     """Vector store for complaint documents (with fallback to in-memory storage)."""
     
-    def __init__(self, collection_name: str = "complaints"):
+    def __init__(self, collection_name: str = "complaints", embedding_model: Optional[SentenceTransformer] = None):
         self.collection_name = collection_name
-        self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        # Pass the process-wide model (app.registry) to avoid loading another copy of the weights
+        self.embedding_model = embedding_model if embedding_model is not None else SentenceTransformer(Config.EMBEDDING_MODEL)
         
         # Try to use ChromaDB if available, otherwise use in-memory storage
         if CHROMADB_AVAILABLE:
             try:
                 logger.info("Attempting to initialize ChromaDB...")
                 # Create persistent directory if it doesn't exist
-                persist_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "chroma_db")
+                persist_dir = PERSIST_DIR
                 os.makedirs(persist_dir, exist_ok=True)
                 
                 # Use PersistentClient instead of Client
@@ -47,7 +52,23 @@ class ChromaVectorStore:
     
     def _init_simple_store(self):
         """Initialize simple in-memory vector store as fallback."""
-        self.documents = {}  # {doc_id: {"text": str, "embedding": list, "metadata": dict}}
+        self.matrix = MatrixVectorStore()
+        if Config.VECTOR_FALLBACK_PERSIST:
+            # Memory-mapped files survive restarts and are shared by every worker process
+            path = os.path.join(PERSIST_DIR, "fallback", self.collection_name)
+            try:
+                self.matrix = PersistentMatrixStore(path)
+            except Exception as e:
+                logger.warning(f"Could not open the persistent fallback store at {path}: {e}. Vectors will not survive restarts.")
+        self.index = None
+        if Config.VECTOR_ANN_INDEX == "ivf":
+            self.index = IVFIndex(
+                self.matrix,
+                nlist=Config.VECTOR_ANN_NLIST,
+                nprobe=Config.VECTOR_ANN_NPROBE,
+                min_train_size=Config.VECTOR_ANN_MIN_TRAIN,
+                path=os.path.join(self.matrix.path, "ivf") if isinstance(self.matrix, PersistentMatrixStore) else None
+            )
         logger.info(f"✅ Initialized simple vector store for collection: {self.collection_name}")
     
     def add_document(self, 
@@ -59,37 +80,76 @@ class ChromaVectorStore:
             doc_id = str(uuid.uuid4())
         
         # Generate embeddings
-        embedding = self.embedding_model.encode(text).tolist()
+        embedding = self.embedding_model.encode(text)
         
         if self.use_chromadb:
-            # Add to ChromaDB
-            self.collection.add(
-                embeddings=[embedding],
+            # Upsert so re-adding a known id (e.g. a retried job) replaces instead of duplicating
+            self.collection.upsert(
+                embeddings=[embedding.tolist()],
                 documents=[text],
                 metadatas=[metadata],
                 ids=[doc_id]
             )
         else:
             # Add to simple store
-            self.documents[doc_id] = {
-                "text": text,
-                "embedding": embedding,
-                "metadata": metadata
-            }
+            self.matrix.add([doc_id], embedding, [text], [metadata])
         
         logger.info(f"Added document with ID: {doc_id}")
         return doc_id
     
+    def add_documents(self,
+                      texts: List[str],
+                      metadatas: List[Dict[str, Any]],
+                      ids: Optional[List[str]] = None,
+                      batch_size: int = Config.VECTOR_BATCH_SIZE) -> List[str]:
+        """Add many documents, encoding and writing ``batch_size`` at a time.
+
+        Existing ids are overwritten (upsert), so a retried import does not
+        duplicate documents. Returns the document ids in input order.
+        """
+        if len(metadatas) != len(texts) or (ids is not None and len(ids) != len(texts)):
+            raise ValueError("texts, metadatas and ids must have the same length")
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+
+        for start in range(0, len(texts), batch_size):
+            chunk_texts = texts[start:start + batch_size]
+            chunk_ids = ids[start:start + batch_size]
+            chunk_metadatas = metadatas[start:start + batch_size]
+            embeddings = self.embedding_model.encode(
+                chunk_texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+            )
+
+            if self.use_chromadb:
+                self.collection.upsert(
+                    embeddings=embeddings.tolist(),
+                    documents=chunk_texts,
+                    metadatas=chunk_metadatas,
+                    ids=chunk_ids
+                )
+            else:
+                self.matrix.add(chunk_ids, embeddings, chunk_texts, chunk_metadatas)
+
+        logger.info(f"Added {len(ids)} documents in batches of {batch_size}")
+        return ids
+    
     def search_similar(self, 
                       query: str, 
                       n_results: int = 5,
                       filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search for similar documents."""
-        query_embedding = self.embedding_model.encode(query).tolist()
+        return self.search_similar_batch([query], n_results, filter_metadata)[0]
+    
+    def search_similar_batch(self,
+                             queries: List[str],
+                             n_results: int = 5,
+                             filter_metadata: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once (one encode call and one similarity product for all of them)."""
+        query_embeddings = self.embedding_model.encode(queries, convert_to_numpy=True, show_progress_bar=False)
         
         if self.use_chromadb:
             search_kwargs = {
-                "query_embeddings": [query_embedding],
+                "query_embeddings": query_embeddings.tolist(),
                 "n_results": n_results
             }
             
@@ -99,46 +159,36 @@ class ChromaVectorStore:
             results = self.collection.query(**search_kwargs)
             
             # Format results
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'document': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
-                })
+            batches = []
+            for q in range(len(queries)):
+                formatted_results = []
+                for i in range(len(results['ids'][q])):
+                    formatted_results.append({
+                        'id': results['ids'][q][i],
+                        'document': results['documents'][q][i],
+                        'metadata': results['metadatas'][q][i],
+                        'distance': results['distances'][q][i] if 'distances' in results else None
+                    })
+                batches.append(formatted_results)
             
-            return formatted_results
+            return batches
         else:
-            # Simple cosine similarity search
-            query_embedding_np = np.array(query_embedding)
-            results = []
-            
-            for doc_id, doc_data in self.documents.items():
-                # Apply filter if provided
-                if filter_metadata:
-                    match = all(doc_data['metadata'].get(k) == v for k, v in filter_metadata.items())
-                    if not match:
-                        continue
-                
-                # Calculate cosine similarity
-                doc_embedding_np = np.array(doc_data['embedding'])
-                similarity = np.dot(query_embedding_np, doc_embedding_np) / (
-                    np.linalg.norm(query_embedding_np) * np.linalg.norm(doc_embedding_np)
-                )
-                distance = 1 - similarity
-                
-                results.append({
-                    'id': doc_id,
-                    'document': doc_data['text'],
-                    'metadata': doc_data['metadata'],
-                    'distance': float(distance),
-                    'similarity': float(similarity)
-                })
-            
-            # Sort by distance (lower is better) and return top n
-            results.sort(key=lambda x: x['distance'])
-            return results[:n_results]
+            # Cosine similarity against the normalized embedding matrix (or its IVF lists), sorted by distance (lower is better)
+            searcher = self.index if self.index is not None else self.matrix
+            batches = []
+            for matches in searcher.search(query_embeddings, n_results, filter_metadata):
+                formatted_results = []
+                for doc_id, similarity in matches:
+                    text, metadata = self.matrix.get(doc_id)
+                    formatted_results.append({
+                        'id': doc_id,
+                        'document': text,
+                        'metadata': metadata,
+                        'distance': 1 - similarity,
+                        'similarity': similarity
+                    })
+                batches.append(formatted_results)
+            return batches
     
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific document by ID."""
@@ -153,12 +203,12 @@ class ChromaVectorStore:
                     }
                 return None
             else:
-                doc_data = self.documents.get(doc_id)
+                doc_data = self.matrix.get(doc_id)
                 if doc_data:
                     return {
                         'id': doc_id,
-                        'document': doc_data['text'],
-                        'metadata': doc_data['metadata']
+                        'document': doc_data[0],
+                        'metadata': doc_data[1]
                     }
                 return None
         except Exception as e:
@@ -171,8 +221,7 @@ class ChromaVectorStore:
             if self.use_chromadb:
                 self.collection.delete(ids=[doc_id])
             else:
-                if doc_id in self.documents:
-                    del self.documents[doc_id]
+                self.matrix.delete(doc_id)
             logger.info(f"Deleted document with ID: {doc_id}")
             return True
         except Exception as e:
@@ -184,9 +233,14 @@ class ChromaVectorStore:
         if self.use_chromadb:
             count = self.collection.count()
         else:
-            count = len(self.documents)
-        return {
+            count = len(self.matrix)
+        stats = {
             "total_documents": count,
             "collection_name": self.collection_name,
             "backend": "chromadb" if self.use_chromadb else "simple"
         }
+        if not self.use_chromadb:
+            stats["matrix"] = self.matrix.stats()
+            if self.index is not None:
+                stats["ann"] = self.index.stats()
+        return stats
@@ -0,0 +1,295 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.vector_store.matrix_store import MatrixVectorStore, normalize_rows
+from app.vector_store.mmap_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+INDEX_MANIFEST = "ivf.json"
+ASSIGN_CHUNK_ROWS = 65536
+# Retrain the centroids once the corpus has grown this much since the last training
+RETRAIN_GROWTH = 4
+TRAIN_POINTS_PER_LIST = 64
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means: unit-length centroids maximizing cosine similarity to their members."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_lists(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        centroids[filled] = sums
+        # Re-seed empty lists with random members so every list stays in use
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (inverted list number) of every row, computed in chunks."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK_ROWS], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex:
+    """Approximate nearest-neighbour search over a ``MatrixVectorStore`` (inverted file).
+
+    The store's rows are clustered with spherical k-means into ``nlist``
+    lists; a query is scored only against the rows of its ``nprobe`` closest
+    lists, trading recall for latency (``nprobe == nlist`` is exact). New rows
+    are assigned to their nearest centroid on the next search, and the
+    centroids are retrained once the corpus has grown ``RETRAIN_GROWTH``-fold.
+    Below ``min_train_size`` documents, and for metadata-filtered queries,
+    searches go to the exact store.
+
+    With a ``path`` (the persistent store's directory) the centroids and the
+    per-row list assignments are saved there, so restarted or additional
+    workers reuse them instead of re-clustering the corpus.
+    """
+
+    def __init__(self,
+                 store: MatrixVectorStore,
+                 nlist: int = 0,
+                 nprobe: int = 16,
+                 min_train_size: int = 20000,
+                 path: Optional[str] = None,
+                 iterations: int = 10,
+                 seed: int = 0):
+        self.store = store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.path = path
+        self.iterations = iterations
+        self.seed = seed
+        self._lock = threading.RLock()
+        self._centroids: Optional[np.ndarray] = None
+        self._version = 0
+        self._trained_rows = 0
+        self._train_seconds: Optional[float] = None
+        self._manifest_stamp = None
+        self._reset_lists()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            with self._lock:
+                self._load_manifest()
+
+    def _reset_lists(self) -> None:
+        self._store_generation = self.store.generation
+        self._indexed = 0
+        self._lists: List[np.ndarray] = [] if self._centroids is None else [
+            np.zeros(0, dtype=np.int64) for _ in range(len(self._centroids))
+        ]
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    # --- files -------------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _assign_path(self) -> str:
+        return self._file(f"assign-{self._version}-{self._store_generation}.i32")
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._file(INDEX_MANIFEST))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_manifest(self) -> None:
+        """Pick up centroids saved by this or another worker."""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._manifest_stamp:
+            return
+        with open(self._file(INDEX_MANIFEST)) as handle:
+            manifest = json.load(handle)
+        self._centroids = np.load(self._file(f"centroids-{manifest['version']}.npy"))
+        self._version = manifest["version"]
+        self._trained_rows = manifest["trained_rows"]
+        self._manifest_stamp = stamp
+        self._reset_lists()
+
+    def _save_centroids(self) -> None:
+        centroids_path = self._file(f"centroids-{self._version}.npy")
+        np.save(centroids_path + ".tmp.npy", self._centroids)
+        os.replace(centroids_path + ".tmp.npy", centroids_path)
+        temp_path = self._file(INDEX_MANIFEST + ".tmp")
+        with open(temp_path, "w") as handle:
+            json.dump({"version": self._version, "nlist": len(self._centroids),
+                       "dim": self._centroids.shape[1], "trained_rows": self._trained_rows}, handle)
+        os.replace(temp_path, self._file(INDEX_MANIFEST))
+        self._manifest_stamp = self._stamp()
+
+    def _remove_stale_files(self) -> None:
+        current = {INDEX_MANIFEST, "lock", f"centroids-{self._version}.npy", os.path.basename(self._assign_path())}
+        for name in os.listdir(self.path):
+            if name not in current and (name.startswith("assign-") or name.startswith("centroids-")):
+                try:
+                    os.remove(self._file(name))
+                except OSError as e:
+                    logger.warning(f"Could not remove stale index file {name}: {str(e)}")
+
+    # --- building ----------------------------------------------------------
+
+    def train(self) -> None:
+        """(Re)cluster the live rows; every row is reassigned on the next sync."""
+        with self._lock:
+            self.store.refresh()
+            alive = np.flatnonzero(self.store._alive[:self.store._size])
+            nlist = self.nlist or int(math.sqrt(len(alive)))
+            nlist = max(1, min(nlist, len(alive)))
+            rng = np.random.default_rng(self.seed)
+            sample = np.sort(rng.choice(alive, min(len(alive), nlist * TRAIN_POINTS_PER_LIST), replace=False))
+
+            started = time.perf_counter()
+            self._centroids = kmeans(np.asarray(self.store._vectors[sample]), nlist, self.iterations, self.seed)
+            self._train_seconds = round(time.perf_counter() - started, 3)
+            self._version += 1
+            self._trained_rows = len(alive)
+            self._reset_lists()
+            if self.path:
+                self._save_centroids()
+            logger.info(f"Trained IVF index: {nlist} lists from {len(sample)} of {len(alive)} vectors in {self._train_seconds:.2f}s")
+
+    def _maybe_train(self) -> None:
+        live = len(self.store)
+        if self.trained and live < RETRAIN_GROWTH * self._trained_rows:
+            return
+        if not self.trained and live < max(self.min_train_size, 1):
+            return
+        if not self.path:
+            self.train()
+            return
+        with file_lock(self._file("lock")):
+            # Another worker may have trained while we waited for the lock
+            self._load_manifest()
+            if not self.trained or len(self.store) >= RETRAIN_GROWTH * self._trained_rows:
+                self.train()
+            self._remove_stale_files()
+
+    def _add_to_lists(self, first_row: int, labels: np.ndarray) -> None:
+        rows = np.arange(first_row, first_row + len(labels), dtype=np.int64)
+        order = np.argsort(labels, kind="stable")
+        list_ids, starts = np.unique(labels[order], return_index=True)
+        for list_id, members in zip(list_ids, np.split(rows[order], starts[1:])):
+            self._lists[list_id] = np.concatenate((self._lists[list_id], members))
+        self._indexed = first_row + len(labels)
+
+    def _assign(self, start: int, end: int) -> np.ndarray:
+        return assign_lists(self.store._vectors[start:end], self._centroids)
+
+    def sync(self) -> bool:
+        """Bring the lists up to date with the store; False while untrained (exact search)."""
+        with self._lock:
+            self.store.refresh()
+            if self.path:
+                self._load_manifest()
+            self._maybe_train()
+            if not self.trained:
+                return False
+            if self.store.generation != self._store_generation:
+                # Compaction renumbered the rows
+                self._reset_lists()
+
+            size = self.store._size
+            if self._indexed >= size:
+                return True
+            if not self.path:
+                self._add_to_lists(self._indexed, self._assign(self._indexed, size))
+                return True
+
+            # Reuse assignments other workers already saved, then compute and append the rest
+            fresh = self._indexed == 0
+            with file_lock(self._file("lock")):
+                path = self._assign_path()
+                saved_rows = min(os.path.getsize(path) // 4 if os.path.exists(path) else 0, size)
+                if saved_rows > self._indexed:
+                    self._add_to_lists(self._indexed, np.fromfile(
+                        path, dtype=np.int32, count=saved_rows - self._indexed, offset=self._indexed * 4
+                    ))
+                if self._indexed < size:
+                    first_row = self._indexed
+                    labels = self._assign(first_row, size)
+                    if saved_rows == first_row:
+                        with open(path, "ab") as handle:
+                            handle.truncate(first_row * 4)
+                            handle.write(labels.tobytes())
+                    self._add_to_lists(first_row, labels)
+                if fresh:
+                    # Assignments for older centroids or store generations are no longer read
+                    self._remove_stale_files()
+            return True
+
+    # --- searching ---------------------------------------------------------
+
+    def search(self,
+               query_embeddings: np.ndarray,
+               k: int = 5,
+               filter_metadata: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """Top ``k`` (id, cosine similarity) per query row from the ``nprobe`` closest lists."""
+        if filter_metadata or not self.sync():
+            return self.store.search(query_embeddings, k, filter_metadata)
+
+        queries = normalize_rows(query_embeddings)
+        with self._lock:
+            centroids, lists = self._centroids, self._lists
+        vectors, alive, ids = self.store._vectors, self.store._alive, self.store._ids
+        nprobe = max(1, min(nprobe or self.nprobe, len(centroids)))
+
+        centroid_scores = queries @ centroids.T
+        if nprobe < len(centroids):
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(len(centroids)), centroid_scores.shape)
+
+        results = []
+        for query, probe in zip(queries, probes):
+            rows = np.concatenate([lists[list_id] for list_id in probe])
+            rows = rows[alive[rows]]
+            if not len(rows) or k <= 0:
+                results.append([])
+                continue
+            scores = vectors[rows] @ query
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+            top = top[np.argsort(-scores[top])]
+            results.append([(ids[rows[i]], float(scores[i])) for i in top])
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = np.array([len(members) for members in self._lists]) if self._lists else np.zeros(0)
+            return {
+                "type": "ivf",
+                "trained": self.trained,
+                "nlist": 0 if self._centroids is None else len(self._centroids),
+                "nprobe": self.nprobe,
+                "indexed_rows": self._indexed,
+                "trained_rows": self._trained_rows,
+                "train_seconds": self._train_seconds,
+                "largest_list": int(sizes.max()) if len(sizes) else 0,
+                "empty_lists": int((sizes == 0).sum()) if len(sizes) else 0,
+                "path": self.path
+            }
@@ -0,0 +1,190 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row as float32 (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class MatrixVectorStore:
+    """Exact cosine-similarity store backed by one contiguous float32 matrix.
+
+    Embeddings are normalized on insert, so a query is scored against every
+    document with a single matrix product and the top results are picked with
+    ``argpartition``. Ids, texts and metadata live in lists parallel to the
+    matrix rows. The matrix grows by doubling (amortized O(1) appends);
+    deletes only mark the row dead, and ``compact`` drops dead rows once they
+    make up ``compact_ratio`` of the matrix.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024, compact_ratio: float = 0.5):
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self._initial_capacity = initial_capacity
+        self._vectors: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._dead = 0
+        # Bumped whenever row numbers change (compaction), so row-based indexes know to rebuild
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def refresh(self) -> None:
+        """Nothing to pick up for a process-local store."""
+
+    def _reserve(self, rows: int) -> None:
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if self._size + rows <= capacity:
+            return
+        new_capacity = max(self._initial_capacity, capacity)
+        while new_capacity < self._size + rows:
+            new_capacity *= 2
+        vectors = np.empty((new_capacity, self.dim), dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._alive = vectors, alive
+
+    def add(self,
+            ids: Sequence[str],
+            embeddings: np.ndarray,
+            texts: Sequence[str],
+            metadatas: Sequence[Dict[str, Any]]) -> None:
+        """Insert documents; an existing id is replaced (its old row becomes a tombstone)."""
+        embeddings = normalize_rows(embeddings)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {embeddings.shape[1]}")
+
+        # An id repeated within the batch keeps its last occurrence
+        last = {doc_id: index for index, doc_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[index] for index in keep]
+            texts = [texts[index] for index in keep]
+            metadatas = [metadatas[index] for index in keep]
+            embeddings = embeddings[keep]
+
+        for doc_id in ids:
+            if doc_id in self._rows:
+                self.delete(doc_id)
+
+        self._reserve(len(ids))
+        start = self._size
+        self._vectors[start:start + len(ids)] = embeddings
+        self._alive[start:start + len(ids)] = True
+        for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            self._rows[doc_id] = start + offset
+            self._ids.append(doc_id)
+            self._texts.append(text)
+            self._metadatas.append(metadata)
+        self._size += len(ids)
+
+    def delete(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._texts[row] = None
+        self._metadatas[row] = None
+        self._dead += 1
+        if self._dead >= self.compact_ratio * self._size:
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Drop tombstoned rows (row numbers of live documents change)."""
+        if not self._dead:
+            return
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors[:len(keep)] = self._vectors[keep]
+        self._alive[:len(keep)] = True
+        self._alive[len(keep):] = False
+        self._ids = [self._ids[row] for row in keep]
+        self._texts = [self._texts[row] for row in keep]
+        self._metadatas = [self._metadatas[row] for row in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = len(keep)
+        self._dead = 0
+        self._generation += 1
+
+    def get(self, doc_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(text, metadata) of a document, or None."""
+        row = self._rows.get(doc_id)
+        if row is None:
+            return None
+        return self._texts[row], self._metadatas[row]
+
+    def _filter_mask(self, filter_metadata: Dict[str, Any]) -> np.ndarray:
+        return np.fromiter(
+            (metadata is not None and all(metadata.get(key) == value for key, value in filter_metadata.items())
+             for metadata in self._metadatas),
+            dtype=bool,
+            count=self._size
+        )
+
+    def search(self,
+               query_embeddings: np.ndarray,
+               k: int = 5,
+               filter_metadata: Optional[Dict[str, Any]] = None) -> List[List[Tuple[str, float]]]:
+        """Top ``k`` (id, cosine similarity) per query row, best first."""
+        queries = normalize_rows(query_embeddings)
+        if not len(self) or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        scores = queries @ self._vectors[:self._size].T
+        allowed = self._alive[:self._size] if self._dead else None
+        if filter_metadata:
+            mask = self._filter_mask(filter_metadata)
+            allowed = mask if allowed is None else allowed & mask
+        if allowed is not None:
+            scores[:, ~allowed] = -np.inf
+
+        k = min(k, self._size)
+        if k < self._size:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(self._size), (scores.shape[0], self._size))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(self._ids[row], float(score)) for row, score in zip(rows, row_scores) if score != -np.inf]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        return {
+            "documents": len(self),
+            "tombstones": self._dead,
+            "capacity": capacity,
+            "dim": self.dim,
+            "matrix_mb": round(capacity * (self.dim or 0) * 4 / (1024 * 1024), 1)
+        }
@@ -0,0 +1,302 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from app.vector_store.matrix_store import MatrixVectorStore, normalize_rows
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+COMPACT_CHUNK_ROWS = 65536
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive ``flock`` on ``path`` across worker processes (a no-op where flock does not exist)."""
+    with open(path, "a+") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class PersistentMatrixStore(MatrixVectorStore):
+    """``MatrixVectorStore`` persisted to a directory and shared between worker processes.
+
+    Layout of one generation ``g``:
+
+      vectors-g.f32   raw float32 rows, appended; memory-mapped read-only
+      log-g.jsonl     append-only records ``add`` (id, row, text, metadata) and ``delete`` (id)
+      manifest.json   embedding dimension and current generation
+
+    A vector row only counts once its ``add`` record is in the log, so a crash
+    between the two writes leaves an unused row. Opening a store replays the
+    log and maps the vector file; rows are paged in by the OS on first use, so
+    nothing is re-encoded. Writers hold an exclusive ``flock`` and catch up on
+    other workers' appends first; readers pick up new records (and new
+    generations after compaction) on every call. Compaction rewrites live rows
+    into a new generation once tombstones reach ``compact_ratio``.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.5):
+        super().__init__(compact_ratio=compact_ratio)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._thread_lock = threading.RLock()
+        self._generation: Optional[int] = None
+        self._manifest_stamp = None
+        self._log_offset = 0
+        with self._thread_lock:
+            self._load()
+
+    # --- files -------------------------------------------------------------
+
+    def _vectors_path(self, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, f"vectors-{self._generation if generation is None else generation}.f32")
+
+    def _log_path(self, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, f"log-{self._generation if generation is None else generation}.jsonl")
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._manifest_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _write_manifest(self, generation: int) -> None:
+        temp_path = self._manifest_path() + ".tmp"
+        with open(temp_path, "w") as handle:
+            json.dump({"dim": self.dim, "generation": generation}, handle)
+        os.replace(temp_path, self._manifest_path())
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive across threads and (where flock exists) worker processes."""
+        with self._thread_lock:
+            with file_lock(os.path.join(self.path, "lock")):
+                yield
+
+    # --- reading -----------------------------------------------------------
+
+    def _load(self) -> None:
+        """(Re)open the current generation from scratch."""
+        self._vectors = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._rows = {}
+        self._size = self._dead = 0
+        self._log_offset = 0
+        self._manifest_stamp = self._stamp()
+        if self._manifest_stamp is None:
+            self._generation = 0
+            return
+        with open(self._manifest_path()) as handle:
+            manifest = json.load(handle)
+        self.dim = manifest["dim"]
+        self._generation = manifest["generation"]
+        self._replay()
+
+    def _ensure_rows(self, rows: int) -> None:
+        if rows <= self._size:
+            return
+        extra = rows - self._size
+        if rows > len(self._alive):
+            alive = np.zeros(max(rows, 2 * len(self._alive)), dtype=bool)
+            alive[:self._size] = self._alive[:self._size]
+            self._alive = alive
+        self._ids.extend([None] * extra)
+        self._texts.extend([None] * extra)
+        self._metadatas.extend([None] * extra)
+        self._size = rows
+
+    def _replay(self) -> None:
+        """Apply log records written since the last read, then map any new vector rows."""
+        try:
+            with open(self._log_path(), "rb") as handle:
+                handle.seek(self._log_offset)
+                data = handle.read()
+        except FileNotFoundError:
+            data = b""
+
+        # A torn last line (writer crashed mid-append) is left for the next writer to truncate
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            previous = self._rows.pop(record["id"], None)
+            if previous is not None:
+                self._alive[previous] = False
+                self._texts[previous] = self._metadatas[previous] = None
+            if record["op"] == "add":
+                row = record["row"]
+                self._ensure_rows(row + 1)
+                self._rows[record["id"]] = row
+                self._alive[row] = True
+                self._ids[row] = record["id"]
+                self._texts[row] = record["text"]
+                self._metadatas[row] = record["metadata"]
+        self._log_offset += len(complete)
+        self._remap()
+
+    def _remap(self) -> None:
+        row_bytes = (self.dim or 0) * 4
+        if not row_bytes or not os.path.exists(self._vectors_path()):
+            return
+        rows = os.path.getsize(self._vectors_path()) // row_bytes
+        # Rows written without a log record (crash between the two writes) stay dead
+        self._ensure_rows(rows)
+        if rows and (self._vectors is None or self._vectors.shape[0] != rows):
+            self._vectors = np.memmap(self._vectors_path(), dtype=np.float32, mode="r", shape=(rows, self.dim))
+        self._dead = self._size - len(self._rows)
+
+    def refresh(self) -> None:
+        """Pick up other workers' writes: a new generation reloads, new log records are replayed."""
+        with self._thread_lock:
+            if self._stamp() != self._manifest_stamp:
+                self._load()
+                return
+            if self._generation is None or self._manifest_stamp is None:
+                return
+            try:
+                log_size = os.path.getsize(self._log_path())
+            except FileNotFoundError:
+                return
+            if log_size != self._log_offset:
+                self._replay()
+
+    # --- writing -----------------------------------------------------------
+
+    def _append(self, vectors: Optional[np.ndarray], records: List[Dict[str, Any]]) -> None:
+        """Append vector rows then their log records; call with the lock held and state refreshed."""
+        if vectors is not None and len(vectors):
+            row_bytes = self.dim * 4
+            with open(self._vectors_path(), "ab") as handle:
+                size = handle.seek(0, os.SEEK_END)
+                if size % row_bytes:
+                    handle.truncate(size - size % row_bytes)
+                    size -= size % row_bytes
+                first_row = size // row_bytes
+                handle.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            for offset, record in enumerate(record for record in records if record["op"] == "add"):
+                record["row"] = first_row + offset
+
+        with open(self._log_path(), "ab") as handle:
+            # Drop a torn record left by a crashed writer before appending
+            handle.truncate(self._log_offset)
+            handle.write("".join(json.dumps(record, default=str) + "\n" for record in records).encode())
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._replay()
+
+    def add(self,
+            ids: Sequence[str],
+            embeddings: np.ndarray,
+            texts: Sequence[str],
+            metadatas: Sequence[Dict[str, Any]]) -> None:
+        embeddings = normalize_rows(embeddings)
+        with self._locked():
+            self.refresh()
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                self._write_manifest(self._generation)
+                self._manifest_stamp = self._stamp()
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {embeddings.shape[1]}")
+            records = [
+                {"op": "add", "id": doc_id, "text": text, "metadata": metadata}
+                for doc_id, text, metadata in zip(ids, texts, metadatas)
+            ]
+            self._append(embeddings, records)
+        self._maybe_compact()
+
+    def delete(self, doc_id: str) -> bool:
+        with self._locked():
+            self.refresh()
+            if doc_id not in self._rows:
+                return False
+            self._append(None, [{"op": "delete", "id": doc_id}])
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self) -> None:
+        if self._dead and self._dead >= self.compact_ratio * self._size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite live rows into a new generation and switch every worker to it."""
+        with self._locked():
+            self.refresh()
+            if not self._dead:
+                return
+            keep = np.flatnonzero(self._alive[:self._size])
+            generation = self._generation + 1
+            with open(self._vectors_path(generation), "wb") as handle:
+                for start in range(0, len(keep), COMPACT_CHUNK_ROWS):
+                    handle.write(np.ascontiguousarray(self._vectors[keep[start:start + COMPACT_CHUNK_ROWS]]).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            with open(self._log_path(generation), "w") as handle:
+                for row, old_row in enumerate(keep):
+                    handle.write(json.dumps({
+                        "op": "add", "id": self._ids[old_row], "row": row,
+                        "text": self._texts[old_row], "metadata": self._metadatas[old_row]
+                    }, default=str) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+            old_vectors, old_log = self._vectors_path(), self._log_path()
+            self._write_manifest(generation)
+            self._vectors = None
+            self._load()
+            for path in (old_vectors, old_log):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    # Still mapped by another process on Windows; removed by a later compaction
+                    logger.warning(f"Could not remove {path} after compaction: {str(e)}")
+            logger.info(f"Compacted vector store {self.path} to generation {generation} ({len(keep)} rows)")
+
+    # --- reads refresh first ----------------------------------------------
+
+    def get(self, doc_id: str):
+        with self._thread_lock:
+            self.refresh()
+            return super().get(doc_id)
+
+    def search(self, query_embeddings: np.ndarray, k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None):
+        with self._thread_lock:
+            self.refresh()
+            return super().search(query_embeddings, k, filter_metadata)
+
+    def __len__(self) -> int:
+        with self._thread_lock:
+            self.refresh()
+            return super().__len__()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "path": self.path,
+            "generation": self._generation,
+            "log_bytes": self._log_offset
+        }
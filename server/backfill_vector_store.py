@@ -0,0 +1,44 @@
+"""
+Index every accepted complaint in MongoDB that has no vector_db_id into the vector store
+
+Streams the complaints from MongoDB (skipping rejected and still-processing
+ones), encodes them with the shared embedding model in batches, writes each
+batch to ChromaDB (or the in-memory fallback) with add_documents, and saves
+the vector ids back on the complaints. Re-running is safe: vector ids are
+derived from complaint ids. Reports throughput in docs/sec.
+
+Usage:
+    python backfill_vector_store.py [--batch-size 64] [--limit N] [--dry-run]
+"""
+import argparse
+
+from app.rag_config import Config
+from app.rag_modules.vector_backfill import backfill_vector_store, count_pending
+from app.registry import services
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill complaints into the vector store")
+    parser.add_argument("--batch-size", type=int, default=Config.VECTOR_BATCH_SIZE, help="Texts encoded and written per batch")
+    parser.add_argument("--limit", type=int, default=None, help="Index at most this many complaints")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the complaints that would be indexed")
+    args = parser.parse_args()
+
+    pending = count_pending()
+    print(f"📊 {pending} complaints without a vector_db_id")
+    if args.dry_run or not pending:
+        return
+
+    vector_store = services.vector_store
+    print(f"📦 Backend: {vector_store.get_collection_stats()['backend']}, batch size {args.batch_size}")
+
+    def progress(stats):
+        print(f"   … {stats['indexed']} indexed ({stats['indexed'] / max(stats['ingest_seconds'], 1e-9):.1f} docs/sec)")
+
+    stats = backfill_vector_store(vector_store, batch_size=args.batch_size, limit=args.limit, on_batch=progress)
+    print(f"✅ Indexed {stats['indexed']} complaints in {stats['batches']} batches, {stats['skipped']} skipped (no text)")
+    print(f"⏱️  {stats['docs_per_sec']} docs/sec encode + write, {stats['overall_docs_per_sec']} docs/sec overall")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: IVF approximate search vs. exact search in the fallback vector store
+
+For each corpus it builds a MatrixVectorStore (exact, the ground truth) and an
+IVFIndex on top of it, then reports the index build time and, for every
+nprobe, recall@k against exact search with single-query p50/p99 latency.
+
+Corpora:
+  synthetic  normalized vectors drawn around --clusters random topic centres
+             (--clusters 0 gives isotropic noise, the worst case for any
+             clustering index); queries come from the same distribution
+  real       complaints from MongoDB encoded with the configured embedding
+             model (--real); --queries of them are held out as queries
+
+Usage:
+    python benchmark_ann_index.py [--sizes 20000,100000,1000000] [--dim 384] [--clusters 500] [--nprobe 1,4,8,16,32,64] [--k 10] [--queries 200] [--nlist 0]
+    python benchmark_ann_index.py --real [--real-limit 50000] [--sizes 0]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.vector_store.ivf_index import IVFIndex
+from app.vector_store.matrix_store import MatrixVectorStore, normalize_rows
+
+
+def synthetic_vectors(rng, size, dim, clusters, noise):
+    if not clusters:
+        return normalize_rows(rng.standard_normal((size, dim)))
+    centres = normalize_rows(rng.standard_normal((clusters, dim)))
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 100000):
+        end = min(size, start + 100000)
+        labels = rng.integers(0, clusters, end - start)
+        chunk = centres[labels] + noise * rng.standard_normal((end - start, dim)).astype(np.float32) / np.sqrt(dim)
+        vectors[start:end] = normalize_rows(chunk)
+    return vectors
+
+
+def complaint_vectors(limit):
+    """Embeddings of stored complaint texts (title + description)."""
+    from app.db import complaints_collection
+    from app.registry import services
+
+    texts = []
+    for complaint in complaints_collection.find({}, {"title": 1, "description": 1}).limit(limit):
+        text = f"{complaint.get('title') or ''}\n\n{complaint.get('description') or ''}".strip()
+        if text:
+            texts.append(text)
+    if not texts:
+        return None
+    print(f"   encoding {len(texts):,} complaints...")
+    return normalize_rows(services.embedding_model.encode(
+        texts, batch_size=128, convert_to_numpy=True, show_progress_bar=False
+    ))
+
+
+def percentiles(samples):
+    return np.percentile(samples, 50) * 1000, np.percentile(samples, 99) * 1000
+
+
+def run(name, vectors, queries, args):
+    print(f"\n📦 {name}: {len(vectors):,} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    store = MatrixVectorStore(dim=vectors.shape[1])
+    for start in range(0, len(vectors), 100000):
+        end = min(len(vectors), start + 100000)
+        store.add([f"doc-{i}" for i in range(start, end)], vectors[start:end], [""] * (end - start), [{}] * (end - start))
+
+    exact, timings = [], []
+    for query in queries:
+        started = time.perf_counter()
+        exact.append({doc_id for doc_id, _ in store.search(query, args.k)[0]})
+        timings.append(time.perf_counter() - started)
+    exact_p50, exact_p99 = percentiles(timings)
+    print(f"   exact:        p50 {exact_p50:7.2f} ms, p99 {exact_p99:7.2f} ms")
+
+    index = IVFIndex(store, nlist=args.nlist, min_train_size=0, seed=args.seed)
+    started = time.perf_counter()
+    index.sync()
+    stats = index.stats()
+    print(f"   ivf build:    {time.perf_counter() - started:.2f}s ({stats['nlist']} lists, k-means {stats['train_seconds']:.2f}s, "
+          f"largest list {stats['largest_list']:,})")
+
+    for nprobe in [int(value) for value in args.nprobe.split(",")]:
+        if nprobe > stats["nlist"]:
+            continue
+        timings, found = [], 0
+        for query, truth in zip(queries, exact):
+            started = time.perf_counter()
+            result = index.search(query, args.k, nprobe=nprobe)[0]
+            timings.append(time.perf_counter() - started)
+            found += len(truth & {doc_id for doc_id, _ in result})
+        p50, p99 = percentiles(timings)
+        recall = found / max(1, sum(len(truth) for truth in exact))
+        print(f"   nprobe {nprobe:4d}:  p50 {p50:7.2f} ms, p99 {p99:7.2f} ms, "
+              f"recall@{args.k} {recall:.3f} ({exact_p50 / p50:.1f}x faster than exact)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF approximate search against exact search")
+    parser.add_argument("--sizes", default="20000,100000,1000000", help="Comma-separated synthetic corpus sizes (0 to skip)")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic embedding dimension")
+    parser.add_argument("--clusters", type=int, default=500, help="Synthetic topic centres (0 = isotropic)")
+    parser.add_argument("--noise", type=float, default=1.0, help="Spread of synthetic vectors around their centre")
+    parser.add_argument("--nlist", type=int, default=0, help="Inverted lists (0 = sqrt of the corpus size)")
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64", help="Comma-separated nprobe values to sweep")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed per corpus")
+    parser.add_argument("--real", action="store_true", help="Also benchmark embeddings of complaints stored in MongoDB")
+    parser.add_argument("--real-limit", type=int, default=50000, help="Complaints to read for --real")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for size in [int(value) for value in args.sizes.split(",") if int(value)]:
+        vectors = synthetic_vectors(rng, size + args.queries, args.dim, args.clusters, args.noise)
+        run("synthetic", vectors[args.queries:], vectors[:args.queries], args)
+        del vectors
+
+    if args.real:
+        print("\n📥 Loading complaint embeddings")
+        try:
+            vectors = complaint_vectors(args.real_limit)
+        except Exception as e:
+            print(f"❌ Could not load complaints: {str(e)}")
+            return
+        if vectors is None or len(vectors) <= args.queries:
+            print(f"⚠️  Need more than {args.queries} complaints with text for the real-data run")
+            return
+        order = rng.permutation(len(vectors))
+        run("complaints", vectors[order[args.queries:]], vectors[order[:args.queries]], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: direct vs. map-reduce (long-document) complaint analysis
+
+Pads the files in examples/sample_complaints to realistic petition sizes
+(supporting statements from the other samples plus signature pages) and
+runs each through GeminiClient twice:
+
+  direct        process_complaint() on the full text (current path)
+  long-document condense_long_document() map-reduce, then process_complaint()
+                on the merged summary
+
+Documents are compared regardless of LONG_DOCUMENT_THRESHOLD_CHARS so the
+output shows where the threshold should sit. For every run it reports wall-clock latency, number of LLM calls and
+estimated prompt/response tokens (about four characters per token). The LLM
+cache and micro-batching are disabled so each run pays for its own calls.
+
+--simulate replaces Gemini with a latency model (fixed overhead plus time
+per prompt and response token) to compare token usage without an API key;
+its latencies are modelled, not measured.
+
+Usage:
+    python benchmark_long_documents.py [--sizes 5000,20000,60000,150000] [--analysis-mode single|multi] [--simulate]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.rag_config import Config
+from app.utils.document_processor import DocumentProcessor
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "sample_complaints")
+
+
+def load_samples():
+    samples = {}
+    for filename in sorted(os.listdir(SAMPLES_DIR)):
+        try:
+            text = DocumentProcessor.clean_text(DocumentProcessor.extract_text(os.path.join(SAMPLES_DIR, filename)))
+        except Exception as e:
+            print(f"⚠️  Skipping {filename}: {e}")
+            continue
+        if text:
+            samples[filename] = text
+    return samples
+
+
+def pad_document(text: str, others: list, target_chars: int) -> str:
+    """Grow a complaint into a petition: supporting statements, then signature pages."""
+    parts = [text]
+    length = len(text)
+    statement = 1
+    while length < target_chars * 0.6 and others:
+        source = others[statement % len(others)]
+        addition = f"Supporting statement {statement} from a resident of the affected area: {source}"
+        parts.append(addition)
+        length += len(addition) + 1
+        statement += 1
+
+    signature = 1
+    while length < target_chars:
+        addition = (f"Signed: Resident {signature}, House {signature % 97 + 1}, Block {signature % 12 + 1}, "
+                    f"Ward {signature % 8 + 1}. I support this petition.")
+        parts.append(addition)
+        length += len(addition) + 1
+        signature += 1
+    return " ".join(parts)[:target_chars]
+
+
+class CallMeter:
+    """Counts LLM calls and estimated tokens flowing through GeminiClient._call_model."""
+
+    def __init__(self, client, simulate: bool):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self._call_model = client._call_model
+        self._simulate = simulate
+        client._call_model = self
+
+    def reset(self):
+        self.calls = self.prompt_tokens = self.response_tokens = 0
+
+    async def __call__(self, prompt_type: str, prompt: str, response_schema=None) -> str:
+        if self._simulate:
+            response = await self._simulated_response(prompt_type, prompt)
+        else:
+            response = await self._call_model(prompt_type, prompt, response_schema)
+        self.calls += 1
+        self.prompt_tokens += DocumentProcessor.estimate_tokens(prompt)
+        self.response_tokens += DocumentProcessor.estimate_tokens(response)
+        return response
+
+    @staticmethod
+    async def _simulated_response(prompt_type: str, prompt: str) -> str:
+        if prompt_type == "analysis":
+            response = json.dumps({
+                "summary": "Residents report large potholes on Main Street causing vehicle damage and accidents. " * 2,
+                "urgency": "HIGH", "department": "Transport Department",
+                "location": "Main Street between 5th Avenue and 7th Avenue", "is_relevant": True,
+                "confidence": 0.9, "category": "road damage", "reason": "Public road safety hazard."
+            })
+        elif prompt_type == "relevance":
+            response = json.dumps({"is_relevant": True, "confidence": 0.9, "category": "road damage", "reason": "Civic issue."})
+        elif prompt_type in ("summary", "chunk_summary"):
+            response = "Residents report large potholes on Main Street between 5th and 7th Avenue. " * 6
+        else:
+            response = "Transport Department"
+        # Modelled latency: request overhead + prompt processing + token generation
+        await asyncio.sleep(0.3 + DocumentProcessor.estimate_tokens(prompt) * 0.00005
+                            + DocumentProcessor.estimate_tokens(response) * 0.004)
+        return response
+
+
+async def run(client, meter: CallMeter, text: str, long_document: bool):
+    from app.llm.cache import llm_cache
+    llm_cache.clear(persistent=False)
+    meter.reset()
+    started = time.perf_counter()
+    analysis_text = await client.condense_long_document(text) if long_document else text
+    await client.process_complaint(analysis_text, include_relevance=True)
+    return time.perf_counter() - started, meter.calls, meter.prompt_tokens, meter.response_tokens
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark long-document summarization")
+    parser.add_argument("--sizes", default="5000,20000,60000,150000", help="Padded document sizes in characters")
+    parser.add_argument("--analysis-mode", choices=["single", "multi"], default=Config.ANALYSIS_MODE)
+    parser.add_argument("--simulate", action="store_true", help="Model Gemini latency instead of calling the API")
+    args = parser.parse_args()
+
+    Config.ANALYSIS_MODE = args.analysis_mode
+    Config.LLM_BATCH_ENABLED = False
+    if args.simulate and not Config.GOOGLE_API_KEY:
+        Config.GOOGLE_API_KEY = "simulated"
+
+    from app.llm.cache import llm_cache
+    from app.llm.gemini_client import GeminiClient
+    llm_cache.persistent = False
+
+    client = GeminiClient()
+    meter = CallMeter(client, args.simulate)
+
+    samples = load_samples()
+    texts = list(samples.values())
+    print(f"📄 {len(samples)} sample complaints, analysis mode={args.analysis_mode}"
+          f"{' (simulated latency)' if args.simulate else ''}")
+    print(f"{'file':<28} {'chars':>7} {'path':<13} {'latency':>9} {'calls':>6} {'prompt tok':>11} {'output tok':>11}")
+
+    for filename, text in samples.items():
+        others = [other for other in texts if other is not text]
+        for size in [int(value) for value in args.sizes.split(",")]:
+            document = pad_document(text, others, size)
+            paths = [("direct", False)]
+            if len(document) > Config.LONG_DOCUMENT_SUMMARY_TARGET_CHARS:
+                paths.append(("long-document", True))
+            for label, long_document in paths:
+                try:
+                    elapsed, calls, prompt_tokens, response_tokens = await run(client, meter, document, long_document)
+                    print(f"{filename[:28]:<28} {len(document):>7} {label:<13} {elapsed:>8.2f}s {calls:>6} "
+                          f"{prompt_tokens:>11} {response_tokens:>11}")
+                except Exception as e:
+                    print(f"{filename[:28]:<28} {len(document):>7} {label:<13} ❌ {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
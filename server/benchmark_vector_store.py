@@ -0,0 +1,105 @@
+"""
+Benchmark: in-memory vector store fallback, dict loop vs. contiguous matrix
+
+Builds synthetic normalized embeddings (the MiniLM dimension by default) and,
+for each corpus size, measures:
+
+  dict loop  the previous fallback: a dict of float lists scored one document
+             at a time in Python (only up to --legacy-max documents)
+  matrix     MatrixVectorStore: one float32 matrix, a single matrix-vector
+             product per query and argpartition top-k
+
+It reports insert throughput, single-query p50/p99 latency, batched query
+throughput and whether both backends return the same top-k ids.
+1M vectors of dimension 384 need about 1.5 GB for the matrix (3 GB while it
+grows).
+
+Usage:
+    python benchmark_vector_store.py [--sizes 10000,100000,1000000] [--dim 384] [--queries 50] [--k 5] [--batch 32] [--legacy-max 10000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.vector_store.matrix_store import MatrixVectorStore, normalize_rows
+
+
+def legacy_search(documents, query, k):
+    """The dict-based fallback search_similar, kept here as the baseline."""
+    query_np = np.array(query)
+    results = []
+    for doc_id, doc_data in documents.items():
+        doc_np = np.array(doc_data["embedding"])
+        similarity = np.dot(query_np, doc_np) / (np.linalg.norm(query_np) * np.linalg.norm(doc_np))
+        results.append((doc_id, float(similarity)))
+    results.sort(key=lambda item: -item[1])
+    return results[:k]
+
+
+def percentiles(samples):
+    return np.percentile(samples, 50) * 1000, np.percentile(samples, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory vector store fallback")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=50, help="Single queries timed per size")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--batch", type=int, default=32, help="Queries per batched search")
+    parser.add_argument("--legacy-max", type=int, default=10000, help="Largest corpus run through the dict loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = normalize_rows(rng.standard_normal((max(args.queries, args.batch), args.dim)))
+
+    for size in [int(value) for value in args.sizes.split(",")]:
+        print(f"\n📦 {size:,} vectors x {args.dim} dims")
+        vectors = normalize_rows(rng.standard_normal((size, args.dim)))
+        ids = [f"doc-{i}" for i in range(size)]
+
+        store = MatrixVectorStore(dim=args.dim)
+        started = time.perf_counter()
+        for start in range(0, size, 10000):
+            end = min(size, start + 10000)
+            store.add(ids[start:end], vectors[start:end], [""] * (end - start), [{}] * (end - start))
+        insert_seconds = time.perf_counter() - started
+        print(f"   matrix insert: {size / insert_seconds:,.0f} docs/sec ({store.stats()['matrix_mb']} MB)")
+
+        timings = []
+        matrix_top = []
+        for query in queries[:args.queries]:
+            started = time.perf_counter()
+            matrix_top.append([doc_id for doc_id, _ in store.search(query, args.k)[0]])
+            timings.append(time.perf_counter() - started)
+        matrix_p50, p99 = percentiles(timings)
+        print(f"   matrix query:  p50 {matrix_p50:.2f} ms, p99 {p99:.2f} ms")
+
+        started = time.perf_counter()
+        store.search(queries[:args.batch], args.k)
+        batch_seconds = time.perf_counter() - started
+        print(f"   matrix batch of {args.batch}: {batch_seconds * 1000:.1f} ms ({args.batch / batch_seconds:,.0f} queries/sec)")
+
+        if size <= args.legacy_max:
+            documents = {doc_id: {"embedding": vector.tolist()} for doc_id, vector in zip(ids, vectors)}
+            legacy_queries = min(args.queries, 10)
+            timings = []
+            matches = 0
+            for index, query in enumerate(queries[:legacy_queries]):
+                started = time.perf_counter()
+                legacy_top = [doc_id for doc_id, _ in legacy_search(documents, query.tolist(), args.k)]
+                timings.append(time.perf_counter() - started)
+                matches += legacy_top == matrix_top[index]
+            p50, p99 = percentiles(timings)
+            print(f"   dict loop:     p50 {p50:.2f} ms, p99 {p99:.2f} ms "
+                  f"({p50 / matrix_p50:.0f}x slower), same top-{args.k}: {matches}/{legacy_queries}")
+            del documents
+        else:
+            print(f"   dict loop:     skipped (> --legacy-max {args.legacy_max:,})")
+        del store, vectors
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Evaluate the local embedding department router against LLM labels
+
+Loads complaints already routed by the LLM (rag_department, skipping router and
+fallback answers per rag_department_source), holds out a
+deterministic fraction by complaint id, builds the prototypes from the rest
+and reports, for a sweep of margin thresholds, how many held-out complaints
+would be answered locally and how often those local answers agree with the
+LLM label.
+
+Usage:
+    python evaluate_department_router.py [--holdout 0.2] [--margins 0,0.02,0.05,0.1]
+"""
+import argparse
+import time
+
+from sentence_transformers import SentenceTransformer
+
+from app.rag_config import Config
+from app.rag_modules.department_router import DepartmentRouter, load_labeled_complaints
+from app.rag_modules.holdout import in_holdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local department router")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of labeled complaints held out")
+    parser.add_argument("--margins", default="0,0.02,0.05,0.08,0.1,0.15",
+                        help="Comma-separated top-2 margin thresholds to evaluate")
+    args = parser.parse_args()
+
+    labeled = load_labeled_complaints()
+    train = [(text, department) for complaint_id, text, department in labeled if not in_holdout(complaint_id, args.holdout)]
+    test = [(text, department) for complaint_id, text, department in labeled if in_holdout(complaint_id, args.holdout)]
+    print(f"📊 {len(labeled)} LLM-labeled complaints: {len(train)} for prototypes, {len(test)} held out")
+    if not test:
+        print("❌ No held-out complaints to evaluate")
+        return
+
+    router = DepartmentRouter()
+    router.build(SentenceTransformer(Config.EMBEDDING_MODEL), labeled=train)
+
+    started = time.perf_counter()
+    embeddings = router.encode([text for text, _ in test])
+    routes = [router.route(text, embedding=embedding, record=False)
+              for (text, _), embedding in zip(test, embeddings)]
+    elapsed = time.perf_counter() - started
+    print(f"⏱️  Routed {len(test)} complaints in {elapsed * 1000:.0f} ms ({elapsed / len(test) * 1000:.2f} ms each)")
+
+    top1 = sum(route.department == department for route, (_, department) in zip(routes, test))
+    print(f"🎯 Top-1 agreement with LLM labels (no threshold): {top1 / len(test):.1%}")
+    print()
+    print(f"{'margin':>8} {'local':>8} {'local acc':>10} {'overall acc':>12}")
+
+    for margin in [float(value) for value in args.margins.split(",")]:
+        local = [(route, department) for route, (_, department) in zip(routes, test) if route.margin >= margin]
+        correct = sum(route.department == department for route, department in local)
+        # Escalated complaints get the LLM label, so they count as correct overall
+        overall = (correct + len(test) - len(local)) / len(test)
+        local_accuracy = f"{correct / len(local):.1%}" if local else "n/a"
+        print(f"{margin:>8.3f} {len(local) / len(test):>8.1%} {local_accuracy:>10} {overall:>12.1%}")
+
+    print()
+    print(f"Current DEPARTMENT_ROUTER_MARGIN={Config.DEPARTMENT_ROUTER_MARGIN}")
+
+
+if __name__ == "__main__":
+    main()
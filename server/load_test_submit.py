@@ -0,0 +1,93 @@
+"""
+Load test: concurrent complaint submissions vs. /health latency
+
+Fires CONCURRENCY simultaneous POST /complaints/new requests while polling
+/health, then reports how long unrelated requests waited. With a blocking
+submission path /health latency tracks the LLM calls (seconds); with the
+async path it should stay in the low milliseconds.
+
+Set SUBMIT_MODE=async to exercise the 202 Accepted path with background enrichment.
+
+Usage:
+    TEST_EMAIL=user@example.com TEST_PASSWORD=secret python load_test_submit.py
+"""
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+CONCURRENCY = int(os.getenv("CONCURRENCY", "20"))
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", "0.05"))
+SUBMIT_MODE = os.getenv("SUBMIT_MODE")
+
+SAMPLE_COMPLAINT = {
+    "title": "Broken water pipe flooding Main Street",
+    "description": "A water main burst near the Main Street and 5th Avenue junction this morning. "
+                   "The road is flooded and traffic is blocked, please send a repair crew urgently.",
+    "location": "Main Street and 5th Avenue",
+    "urgency": "high",
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        f"{BASE_URL}/auth/login-json",
+        json={"email": os.environ["TEST_EMAIL"], "password": os.environ["TEST_PASSWORD"]},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def submit(client: httpx.AsyncClient, token: str, latencies: list):
+    started = time.perf_counter()
+    response = await client.post(
+        f"{BASE_URL}/complaints/new",
+        data=SAMPLE_COMPLAINT,
+        params={"mode": SUBMIT_MODE} if SUBMIT_MODE else None,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    latencies.append(time.perf_counter() - started)
+    return response.status_code
+
+
+async def poll_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(f"{BASE_URL}/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(HEALTH_INTERVAL)
+
+
+async def main():
+    async with httpx.AsyncClient(timeout=300) as client:
+        token = await login(client)
+
+        health_latencies, submit_latencies = [], []
+        stop = asyncio.Event()
+        health_task = asyncio.create_task(poll_health(client, stop, health_latencies))
+
+        print(f"🚀 Submitting {CONCURRENCY} complaints concurrently to {BASE_URL}...")
+        statuses = await asyncio.gather(*(submit(client, token, submit_latencies) for _ in range(CONCURRENCY)))
+        stop.set()
+        await health_task
+
+    print(f"Submission status codes: {sorted(set(statuses))}")
+    print(f"Submit latency  p50={statistics.median(submit_latencies):.2f}s max={max(submit_latencies):.2f}s")
+    print(
+        f"/health latency p50={percentile(health_latencies, 50) * 1000:.1f}ms "
+        f"p95={percentile(health_latencies, 95) * 1000:.1f}ms "
+        f"max={max(health_latencies) * 1000:.1f}ms over {len(health_latencies)} probes"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
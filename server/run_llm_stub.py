@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Groq, Fireworks and Gemini APIs
+
+Serves OpenAI-compatible chat completions (/groq/..., /fireworks/...) and
+Gemini generateContent/streamGenerateContent (/gemini/...), including SSE
+streaming, so the submit pipeline, chat and load tests run offline:
+
+  stub    canned answers shaped like the real models' replies, with latency
+          drawn from per-provider distributions and injected errors/timeouts
+  record  proxy to the real providers (real API keys required) and append
+          every response to cassette files
+  replay  serve the recorded responses with their recorded latency
+
+Point the API server at it with LLM_STUB_URL=http://localhost:8090. The
+scenario file is JSON, e.g.:
+
+  {"seed": 7,
+   "providers": {"groq": {"latency": {"distribution": "lognormal", "median_ms": 300, "sigma": 0.4},
+                          "error_rate": 0.05, "error_statuses": [429, 503], "retry_after": 2},
+                 "gemini": {"latency": {"distribution": "uniform", "min_ms": 500, "max_ms": 1500},
+                            "timeout_rate": 0.01}},
+   "answers": [{"match": "Respond with only one word", "response": "HIGH"}]}
+
+GET /_stub/stats reports per-provider counters; PUT /_stub/scenario swaps the
+scenario while the stub is running.
+
+Usage:
+    python run_llm_stub.py [--mode stub|record|replay] [--scenario scenario.json] [--cassettes ./cassettes] [--port 8090]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add the server directory to Python path
+server_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, server_dir)
+
+import uvicorn
+
+from app.llm.stub_server import MODES, StubProvider, create_stub_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local LLM provider stub")
+    parser.add_argument("--mode", choices=MODES, default="stub")
+    parser.add_argument("--scenario", help="JSON file with latency, error injection and canned answer settings")
+    parser.add_argument("--cassettes", default="./cassettes", help="Directory for recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as handle:
+            scenario = json.load(handle)
+
+    stub = StubProvider(args.mode, scenario, args.cassettes)
+    print(f"🧪 LLM stub ({args.mode} mode) at http://{args.host}:{args.port}")
+    print(f"📍 Start the API server with LLM_STUB_URL=http://{args.host}:{args.port}")
+    if args.mode != "stub":
+        print(f"📼 Cassettes: {os.path.abspath(args.cassettes)}")
+    print("=" * 50)
+
+    uvicorn.run(create_stub_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
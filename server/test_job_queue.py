@@ -0,0 +1,191 @@
+"""
+Test script for the durable job queue (claim, lease, retry, failure)
+
+Runs against an in-memory stand-in for the MongoDB jobs collection, so no
+database or server is needed.
+
+Usage:
+    python -m pytest test_job_queue.py
+    python test_job_queue.py
+"""
+import asyncio
+import copy
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from app.jobs.job_queue import JobQueue
+
+
+def _matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(document, option) for option in condition):
+                return False
+            continue
+        value = document.get(key)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if operator == "$lt" and not (value is not None and value < operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeJobsCollection:
+    """The subset of a pymongo collection JobQueue uses."""
+
+    def __init__(self):
+        self.documents = []
+        self.fail_updates = 0
+
+    def insert_one(self, document):
+        self.documents.append(copy.deepcopy(document))
+
+    def _update(self, document, update):
+        document.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + amount
+
+    def find_one_and_update(self, query, update, sort=None, return_document=ReturnDocument.BEFORE):
+        candidates = [document for document in self.documents if _matches(document, query)]
+        if sort:
+            key, _ = sort[0]
+            candidates.sort(key=lambda document: document[key])
+        if not candidates:
+            return None
+        self._update(candidates[0], update)
+        return copy.deepcopy(candidates[0])
+
+    def update_one(self, query, update):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise ConnectionError("MongoDB unavailable")
+        for document in self.documents:
+            if _matches(document, query):
+                self._update(document, update)
+                return
+
+    def get(self, job_id):
+        return next(document for document in self.documents if document["_id"] == job_id)
+
+
+def make_queue(collection, **kwargs):
+    options = {"lease_seconds": 30, "max_attempts": 2, "retry_base_seconds": 0, "poll_interval": 0.01, "concurrency": 1}
+    queue = JobQueue(**{**options, **kwargs})
+    queue._collection = collection
+    return queue
+
+
+def test_claim_and_complete():
+    collection = FakeJobsCollection()
+    queue = make_queue(collection)
+    handled = []
+
+    async def handler(job):
+        handled.append(job["payload"]["n"])
+
+    queue.register("demo", handler)
+    job_id = queue.enqueue("demo", {"n": 1})
+
+    job = queue._claim()
+    assert job["_id"] == job_id and job["status"] == JobQueue.RUNNING and job["attempts"] == 1
+    assert queue._claim() is None  # leased to this worker
+
+    asyncio.run(queue._process(job))
+    assert handled == [1]
+    assert collection.get(job_id)["status"] == JobQueue.DONE
+
+
+def test_retry_then_fail_runs_hook():
+    collection = FakeJobsCollection()
+    queue = make_queue(collection)
+    failed = []
+
+    async def handler(job):
+        raise RuntimeError("provider down")
+
+    async def on_failure(job):
+        failed.append(job["_id"])
+
+    queue.register("demo", handler, on_failure=on_failure)
+    job_id = queue.enqueue("demo", {})
+
+    asyncio.run(queue._process(queue._claim()))
+    document = collection.get(job_id)
+    assert document["status"] == JobQueue.QUEUED
+    assert document["last_error"] == "RuntimeError: provider down"
+    assert failed == []
+
+    asyncio.run(queue._process(queue._claim()))
+    assert collection.get(job_id)["status"] == JobQueue.FAILED
+    assert collection.get(job_id)["attempts"] == 2
+    assert failed == [job_id]
+
+
+def test_expired_lease_is_reclaimed():
+    collection = FakeJobsCollection()
+    crashed, survivor = make_queue(collection), make_queue(collection)
+
+    async def handler(job):
+        pass
+
+    crashed.register("demo", handler)
+    survivor.register("demo", handler)
+    job_id = crashed.enqueue("demo", {})
+
+    assert crashed._claim()["worker_id"] == crashed.worker_id
+    assert survivor._claim() is None
+
+    collection.get(job_id)["lease_expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    job = survivor._claim()
+    assert job["worker_id"] == survivor.worker_id and job["attempts"] == 2
+
+    # The crashed worker no longer owns the job and cannot overwrite its state
+    crashed._finish(job_id, JobQueue.DONE)
+    assert collection.get(job_id)["status"] == JobQueue.RUNNING
+
+
+def test_worker_survives_finish_errors():
+    collection = FakeJobsCollection()
+    queue = make_queue(collection)
+    handled = []
+
+    async def handler(job):
+        handled.append(job["_id"])
+
+    queue.register("demo", handler)
+
+    async def run():
+        queue.start()
+        collection.fail_updates = 1  # marking the first job done fails
+        first = queue.enqueue("demo", {})
+        for _ in range(100):
+            if handled:
+                break
+            await asyncio.sleep(0.01)
+        second = queue.enqueue("demo", {})
+        for _ in range(100):
+            if collection.get(second)["status"] == JobQueue.DONE:
+                break
+            await asyncio.sleep(0.01)
+        alive = all(not worker.done() for worker in queue._workers)
+        await queue.stop()
+        return first, second, alive
+
+    first, second, alive = asyncio.run(run())
+    assert alive
+    assert collection.get(first)["status"] == JobQueue.RUNNING  # reclaimed after its lease expires
+    assert collection.get(second)["status"] == JobQueue.DONE
+
+
+if __name__ == "__main__":
+    for test in (test_claim_and_complete, test_retry_then_fail_runs_hook,
+                 test_expired_lease_is_reclaimed, test_worker_survives_finish_errors):
+        test()
+        print(f"✅ {test.__name__}")
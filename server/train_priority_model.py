@@ -0,0 +1,93 @@
+"""
+Retrain the local priority-score model from complaint history in MongoDB
+
+Encodes every complaint whose priority_score came from the remote model with
+the pipeline's embedding model, trains the ridge ensemble on embeddings,
+urgency, category and keyword features, reports held-out mean absolute error
+and how many complaints clear the confidence gate, then writes a new
+versioned artifact to PRIORITY_MODEL_DIR. The server loads the newest
+artifact at startup.
+
+Usage:
+    python train_priority_model.py [--holdout 0.2] [--min-samples 50] [--members 8] [--l2 1.0] [--dry-run]
+"""
+import argparse
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.rag_config import Config
+from app.rag_modules.holdout import in_holdout
+from app.rag_modules.priority_model import PriorityModel, load_priority_labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the local priority-score model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of labeled complaints used for evaluation")
+    parser.add_argument("--min-samples", type=int, default=50, help="Refuse to train on fewer labeled complaints")
+    parser.add_argument("--members", type=int, default=8, help="Bootstrap ensemble size")
+    parser.add_argument("--l2", type=float, default=1.0, help="Ridge regularization strength")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate without writing an artifact")
+    args = parser.parse_args()
+
+    labeled = load_priority_labels()
+    print(f"📊 {len(labeled)} complaints with a remote priority score")
+    if len(labeled) < args.min_samples:
+        print(f"❌ Need at least {args.min_samples} labeled complaints to train")
+        return
+
+    encoder = SentenceTransformer(Config.EMBEDDING_MODEL)
+    started = time.perf_counter()
+    embeddings = np.asarray(
+        encoder.encode([text for _, text, _, _, _ in labeled], batch_size=64, normalize_embeddings=True),
+        dtype=np.float32
+    )
+    print(f"⏱️  Encoded in {time.perf_counter() - started:.1f}s")
+
+    holdout = np.array([in_holdout(complaint_id, args.holdout) for complaint_id, _, _, _, _ in labeled])
+    texts = [text for _, text, _, _, _ in labeled]
+    urgencies = [urgency for _, _, urgency, _, _ in labeled]
+    categories = [category for _, _, _, category, _ in labeled]
+    scores = np.array([score for _, _, _, _, score in labeled], dtype=np.float32)
+
+    def subset(index):
+        return embeddings[index], [texts[i] for i in index], [urgencies[i] for i in index], [categories[i] for i in index]
+
+    model = PriorityModel()
+    train_index = np.flatnonzero(~holdout)
+    test_index = np.flatnonzero(holdout)
+    model.fit(*subset(train_index), scores[train_index], members=args.members, l2=args.l2)
+
+    metrics = {"samples": len(labeled), "members": args.members, "l2": args.l2}
+    if len(test_index):
+        members = model.predict_members(*subset(test_index))
+        predicted = np.clip(members.mean(axis=1), 0, 100)
+        errors = np.abs(predicted - scores[test_index])
+        seen = np.array([categories[i] in model.categories for i in test_index])
+        gated = (members.std(axis=1) <= model.max_spread) & seen
+
+        metrics.update({
+            "holdout_samples": int(len(test_index)),
+            "holdout_mae": round(float(errors.mean()), 2),
+            "holdout_local_fraction": round(float(gated.mean()), 4),
+            "holdout_local_mae": round(float(errors[gated].mean()), 2) if gated.any() else None
+        })
+        print(f"🎯 Held-out MAE: {metrics['holdout_mae']:.1f} points on {len(test_index)} complaints")
+        print(
+            f"🚦 Spread <= {model.max_spread}: {metrics['holdout_local_fraction']:.1%} scored locally, "
+            f"MAE {metrics['holdout_local_mae'] if metrics['holdout_local_mae'] is not None else 'n/a'}"
+        )
+
+    if args.dry_run:
+        print("ℹ️  Dry run, no artifact written")
+        return
+
+    # The shipped model is refit on every labeled complaint
+    model.fit(embeddings, texts, urgencies, categories, scores, members=args.members, l2=args.l2)
+    path = model.save(metrics)
+    print(f"✅ Saved priority model version {model.metadata['version']} to {path}")
+
+
+if __name__ == "__main__":
+    main()
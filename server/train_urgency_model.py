@@ -0,0 +1,87 @@
+"""
+Retrain the local urgency model from complaint history in MongoDB
+
+Encodes every complaint carrying an LLM urgency label (rag_urgency, skipping
+local-model and fallback answers per rag_urgency_source) with the
+pipeline's embedding model, trains the softmax model on embeddings plus
+keyword features, reports held-out accuracy and how many complaints clear
+the confidence gate, then writes a new versioned artifact to
+URGENCY_MODEL_DIR. The server loads the newest artifact at startup.
+
+Usage:
+    python train_urgency_model.py [--holdout 0.2] [--min-samples 30] [--dry-run]
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.rag_config import Config
+from app.rag_modules.holdout import in_holdout
+from app.rag_modules.urgency_model import UrgencyModel, load_urgency_labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the local urgency model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of labeled complaints used for evaluation")
+    parser.add_argument("--min-samples", type=int, default=30, help="Refuse to train on fewer labeled complaints")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate without writing an artifact")
+    args = parser.parse_args()
+
+    labeled = load_urgency_labels()
+    print(f"📊 {len(labeled)} complaints with an LLM urgency label: {dict(Counter(label for _, _, label in labeled))}")
+    if len(labeled) < args.min_samples:
+        print(f"❌ Need at least {args.min_samples} labeled complaints to train")
+        return
+
+    encoder = SentenceTransformer(Config.EMBEDDING_MODEL)
+    started = time.perf_counter()
+    embeddings = np.asarray(
+        encoder.encode([text for _, text, _ in labeled], batch_size=64, normalize_embeddings=True),
+        dtype=np.float32
+    )
+    print(f"⏱️  Encoded in {time.perf_counter() - started:.1f}s")
+
+    holdout = np.array([in_holdout(complaint_id, args.holdout) for complaint_id, _, _ in labeled])
+    texts = [text for _, text, _ in labeled]
+    labels = [label for _, _, label in labeled]
+
+    model = UrgencyModel()
+    train_index = np.flatnonzero(~holdout)
+    test_index = np.flatnonzero(holdout)
+    model.fit(embeddings[train_index], [texts[i] for i in train_index], [labels[i] for i in train_index])
+
+    metrics = {"samples": len(labeled)}
+    if len(test_index):
+        probabilities = model.predict_proba(embeddings[test_index], [texts[i] for i in test_index])
+        predicted = [model.classes[i] for i in probabilities.argmax(axis=1)]
+        expected = [labels[i] for i in test_index]
+        gated = probabilities.max(axis=1) >= model.min_confidence
+        correct = np.array([p == e for p, e in zip(predicted, expected)])
+
+        metrics.update({
+            "holdout_samples": int(len(test_index)),
+            "holdout_accuracy": round(float(correct.mean()), 4),
+            "holdout_local_fraction": round(float(gated.mean()), 4),
+            "holdout_local_accuracy": round(float(correct[gated].mean()), 4) if gated.any() else None
+        })
+        print(f"🎯 Held-out accuracy: {metrics['holdout_accuracy']:.1%} on {len(test_index)} complaints")
+        print(
+            f"🚦 Confidence >= {model.min_confidence}: {metrics['holdout_local_fraction']:.1%} answered locally, "
+            f"accuracy {metrics['holdout_local_accuracy'] if metrics['holdout_local_accuracy'] is not None else 'n/a'}"
+        )
+
+    if args.dry_run:
+        print("ℹ️  Dry run, no artifact written")
+        return
+
+    # The shipped model is refit on every labeled complaint
+    model.fit(embeddings, texts, labels)
+    path = model.save(metrics)
+    print(f"✅ Saved urgency model version {model.metadata['version']} to {path}")
+
+
+if __name__ == "__main__":
+    main()